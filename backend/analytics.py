@@ -0,0 +1,221 @@
+from __future__ import annotations
+import argparse
+import os
+import time
+from collections import defaultdict
+from typing import List, Optional
+
+from sqlalchemy import Connection, Engine, text
+from sqlmodel import create_engine
+
+from audit import configure_sqlite
+from structures import AuditRollup
+
+# === CONFIG ===
+# rollup granularity in seconds; changing it needs a `backfill`
+ROLLUP_BUCKET = int(os.getenv("ROLLUP_BUCKET", "3600"))
+CONF_BINS = 10
+
+GRANULARITY = {"hour": 3600, "day": 86400}
+
+_UPSERT = text(
+    "INSERT INTO auditrollup (bucket, type, classification, conf_bin, count, latency_sum, latency_count)"
+    " VALUES (:bucket, :type, :classification, :conf_bin, :count, :latency_sum, :latency_count)"
+    " ON CONFLICT (bucket, type, classification, conf_bin) DO UPDATE SET"
+    " count = count + excluded.count,"
+    " latency_sum = latency_sum + excluded.latency_sum,"
+    " latency_count = latency_count + excluded.latency_count"
+)
+
+
+def bucket_of(created_at: Optional[float], size: int = ROLLUP_BUCKET) -> int:
+    return int(created_at // size) * size if created_at is not None else 0
+
+
+def conf_bin(confidence: Optional[float]) -> int:
+    if confidence is None:
+        return -1
+    return min(max(int(confidence * CONF_BINS), 0), CONF_BINS - 1)
+
+
+def update_rollups(conn: Connection, rows: List[dict]) -> None:
+    """
+    AuditWriter flush hook: folds a batch of audit records into the
+    rollup table inside the same transaction as their insert.
+    """
+    acc: dict[tuple, list] = defaultdict(lambda: [0, 0.0, 0])
+    for row in rows:
+        key = (
+            bucket_of(row.get("created_at")),
+            row.get("type") or "",
+            row.get("classification") or "",
+            conf_bin(row.get("confidence")),
+        )
+        entry = acc[key]
+        entry[0] += 1
+        if row.get("latency_ms") is not None:
+            entry[1] += row["latency_ms"]
+            entry[2] += 1
+
+    conn.execute(_UPSERT, [
+        {
+            "bucket": bucket, "type": kind, "classification": cls, "conf_bin": b,
+            "count": count, "latency_sum": lat_sum, "latency_count": lat_n,
+        }
+        for (bucket, kind, cls, b), (count, lat_sum, lat_n) in acc.items()
+    ])
+
+
+def backfill(engine: Engine, size: int = ROLLUP_BUCKET) -> int:
+    """Rebuilds the rollups from the whole audit table in one SQL pass."""
+    AuditRollup.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM auditrollup")
+        conn.execute(
+            text(
+                """
+                INSERT INTO auditrollup (bucket, type, classification, conf_bin, count, latency_sum, latency_count)
+                SELECT
+                    COALESCE(CAST(created_at / :size AS INTEGER) * :size, 0),
+                    COALESCE(type, ''),
+                    COALESCE(classification, ''),
+                    CASE
+                        WHEN confidence IS NULL THEN -1
+                        ELSE MAX(MIN(CAST(confidence * :bins AS INTEGER), :bins - 1), 0)
+                    END AS bin,
+                    COUNT(*),
+                    COALESCE(SUM(latency_ms), 0.0),
+                    COUNT(latency_ms)
+                FROM auditing
+                GROUP BY 1, 2, 3, 4
+                """
+            ),
+            {"size": size, "bins": CONF_BINS},
+        )
+        return conn.exec_driver_sql("SELECT COALESCE(SUM(count), 0) FROM auditrollup").scalar_one()
+
+
+def ensure_rollups(engine: Engine) -> int:
+    """Backfills once when audit rows exist but the rollups are empty (first start after upgrade)."""
+    with engine.connect() as conn:
+        has_rollups = conn.exec_driver_sql("SELECT 1 FROM auditrollup LIMIT 1").first()
+        has_audit = conn.exec_driver_sql("SELECT 1 FROM auditing LIMIT 1").first()
+    return backfill(engine) if has_audit and not has_rollups else 0
+
+
+def query(
+    engine: Engine,
+    *,
+    kind: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    granularity: str = "hour",
+) -> dict:
+    """
+    FAKE/REAL counts, rates, mean latency and confidence histograms per
+    media type and time bucket, read from the rollups only. Cost depends
+    on the number of buckets in range, not on the audit table size.
+    """
+    step = max(GRANULARITY[granularity], ROLLUP_BUCKET)
+    clauses, params = ["bucket > 0"], {"step": step}
+    if kind is not None:
+        clauses.append("type = :kind")
+        params["kind"] = kind
+    if since is not None:
+        clauses.append("bucket >= :since")
+        params["since"] = bucket_of(since)
+    if until is not None:
+        clauses.append("bucket < :until")
+        params["until"] = until
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT (bucket / :step) * :step AS start, type, classification, conf_bin,"
+                " SUM(count), SUM(latency_sum), SUM(latency_count)"
+                f" FROM auditrollup WHERE {' AND '.join(clauses)}"
+                " GROUP BY 1, 2, 3, 4 ORDER BY 1, 2"
+            ),
+            params,
+        ).all()
+
+    buckets: dict[tuple, dict] = {}
+    for start, kind_, cls, b, count, lat_sum, lat_n in rows:
+        entry = buckets.setdefault((start, kind_), {
+            "start": start,
+            "type": kind_,
+            "total": 0,
+            "counts": defaultdict(int),
+            "confidence_histogram": defaultdict(lambda: [0] * CONF_BINS),
+            "_lat": [0.0, 0],
+        })
+        label = cls or "UNKNOWN"
+        entry["total"] += count
+        entry["counts"][label] += count
+        if b >= 0:
+            entry["confidence_histogram"][label][b] += count
+        entry["_lat"][0] += lat_sum
+        entry["_lat"][1] += lat_n
+
+    out = []
+    for entry in buckets.values():
+        lat_sum, lat_n = entry.pop("_lat")
+        total = entry["total"]
+        entry["counts"] = dict(entry["counts"])
+        entry["confidence_histogram"] = dict(entry["confidence_histogram"])
+        entry["fake_rate"] = round(entry["counts"].get("FAKE", 0) / total, 4) if total else 0.0
+        entry["real_rate"] = round(entry["counts"].get("REAL", 0) / total, 4) if total else 0.0
+        entry["avg_latency_ms"] = round(lat_sum / lat_n, 2) if lat_n else None
+        out.append(entry)
+    return {"granularity": granularity, "bucket_seconds": step, "buckets": out}
+
+
+def export(engine: Engine, path: str, since: Optional[float] = None, until: Optional[float] = None) -> int:
+    """Bulk export of raw audit rows to Parquet (or CSV by extension) via polars."""
+    import polars as pl
+
+    # explicit, since legacy rows lead with NULLs and break type inference
+    schema = {
+        **{c: pl.Utf8 for c in ("id", "type", "classification", "reason", "ext")},
+        **{c: pl.Float64 for c in ("confidence", "probability", "latency_ms", "created_at")},
+    }
+    clauses, params = ["1 = 1"], {}
+    if since is not None:
+        clauses.append("created_at >= :since")
+        params["since"] = since
+    if until is not None:
+        clauses.append("created_at < :until")
+        params["until"] = until
+
+    with engine.connect() as conn:
+        df = pl.read_database(
+            text(f"SELECT * FROM auditing WHERE {' AND '.join(clauses)}").bindparams(**params),
+            connection=conn,
+            schema_overrides=schema,
+        )
+    if path.endswith(".csv"):
+        df.write_csv(path)
+    else:
+        df.write_parquet(path)
+    return df.height
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit rollups")
+    parser.add_argument("command", choices=["backfill", "export"])
+    parser.add_argument("path", nargs="?", help="output file for export (.parquet or .csv)")
+    parser.add_argument("--db", default="sqlite:///database/audit.db")
+    parser.add_argument("--since", type=float)
+    parser.add_argument("--until", type=float)
+    args = parser.parse_args()
+
+    engine = configure_sqlite(create_engine(args.db))
+    start = time.perf_counter()
+    if args.command == "backfill":
+        n = backfill(engine)
+        print(f"rolled up {n} audit rows in {time.perf_counter() - start:.1f}s")
+    else:
+        if not args.path:
+            parser.error("export needs an output path")
+        n = export(engine, args.path, args.since, args.until)
+        print(f"exported {n} audit rows to {args.path} in {time.perf_counter() - start:.1f}s")
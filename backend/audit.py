@@ -0,0 +1,306 @@
+from __future__ import annotations
+import argparse
+import os
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from sqlalchemy import Connection, Engine, event, insert, inspect
+from sqlmodel import create_engine
+
+from metrics import stage
+from structures import Auditing
+
+# === CONFIG ===
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.5"))
+# flush early once this many records are buffered
+AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "500"))
+# failed flushes in a row before the batch is retried row by row
+AUDIT_MAX_ATTEMPTS = int(os.getenv("AUDIT_MAX_ATTEMPTS", "3"))
+# records kept while the database is failing; the oldest are dropped beyond this
+AUDIT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "100000"))
+# NORMAL is durable across application crashes in WAL mode; only an OS crash
+# or power loss can drop the last few committed transactions
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+FlushHook = Callable[[Connection, List[dict]], None]
+
+
+def configure_sqlite(engine: Engine) -> Engine:
+    """WAL journal, relaxed fsync and a busy timeout on every new connection."""
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cur.execute("PRAGMA busy_timeout=5000")
+        cur.close()
+
+    return engine
+
+
+def parse_number(value) -> Optional[float]:
+    """'87.12%' -> 0.8712, '0.4908' -> 0.4908, None / 'NaN' / junk -> None."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    scale = 100.0 if text.endswith("%") else 1.0
+    try:
+        number = float(text.rstrip("%")) / scale
+    except ValueError:
+        return None
+    return None if number != number else number     # NaN
+
+
+def record(
+    kind: str,
+    *,
+    id: Optional[str] = None,
+    classification: Optional[str] = None,
+    reason: Optional[str] = None,
+    ext: Optional[str] = None,
+    confidence=None,
+    probability=None,
+    latency_ms: Optional[float] = None,
+    created_at: Optional[float] = None,
+) -> dict:
+    """An Auditing row as a plain dict; formatted numbers are parsed."""
+    return {
+        "id": id or uuid.uuid4().hex,
+        "type": kind,
+        "classification": classification,
+        "reason": reason,
+        "ext": ext,
+        "confidence": parse_number(confidence),
+        "probability": parse_number(probability),
+        "latency_ms": latency_ms,
+        "created_at": created_at if created_at is not None else time.time(),
+    }
+
+
+def prediction_record(kind: str, result: dict, **fields) -> dict:
+    """Auditing row for an image / video prediction dict."""
+    return record(
+        kind,
+        classification=result.get("prediction"),
+        confidence=result.get("confidence"),
+        probability=result.get("probability", result.get("probability_fake")),
+        **fields,
+    )
+
+
+def write_records(engine: Engine, rows: List[dict], hooks: List[FlushHook] = ()) -> None:
+    """Inserts rows (and runs the hooks) in one transaction."""
+    if not rows:
+        return
+    with engine.begin() as conn:
+        conn.execute(insert(Auditing.__table__), rows)
+        for hook in hooks:
+            hook(conn, rows)
+
+
+class AuditWriter:
+    """
+    Buffers audit records in memory and writes them from a background
+    thread in one transaction per flush, every `interval` seconds or as
+    soon as `flush_size` records are waiting. `write` never touches the
+    database, so it is safe to call from the event loop.
+
+    A failed flush is put back and retried; after `max_attempts` failures
+    in a row the batch is written row by row and rows that still fail
+    while others succeed are dropped. At most `max_buffer` records are
+    kept, the oldest are dropped first. Drops are counted in `stats`.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        interval: float = AUDIT_FLUSH_INTERVAL,
+        flush_size: int = AUDIT_FLUSH_SIZE,
+        max_attempts: int = AUDIT_MAX_ATTEMPTS,
+        max_buffer: int = AUDIT_MAX_BUFFER,
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.flush_size = flush_size
+        self.max_attempts = max_attempts
+        self.max_buffer = max_buffer
+        self.hooks: List[FlushHook] = []
+
+        self._buffer: List[dict] = []
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._attempts = 0
+
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+
+    def start(self) -> None:
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Flushes whatever is buffered and stops the thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, row: dict) -> None:
+        self.write_many([row])
+
+    def write_many(self, rows: List[dict]) -> None:
+        with self._cond:
+            self._buffer.extend(rows)
+            self._trim()
+            if len(self._buffer) >= self.flush_size:
+                self._cond.notify()
+
+    def _trim(self) -> None:
+        """Drops the oldest records beyond `max_buffer`; call with `_cond` held."""
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._buffer) < self.flush_size:
+                    self._cond.wait(self.interval)
+                rows, self._buffer = self._buffer, []
+                stopping = self._stopping
+            self._flush(rows)
+            if stopping:
+                with self._cond:
+                    rows, self._buffer = self._buffer, []
+                self._flush(rows)
+                return
+
+    def _flush(self, rows: List[dict]) -> None:
+        if not rows:
+            return
+        start = time.perf_counter()
+        try:
+            with stage("audit.flush"):
+                write_records(self.engine, rows, self.hooks)
+        except Exception:
+            self.failures += 1
+            self._attempts += 1
+            if self._attempts >= self.max_attempts:
+                self._attempts = 0
+                rows = self._flush_rows(rows)
+            # keep the records for the next round rather than lose them
+            with self._cond:
+                self._buffer[:0] = rows
+                self._trim()
+            return
+        self._attempts = 0
+        self.last_flush_ms = (time.perf_counter() - start) * 1000.0
+        self.written += len(rows)
+        self.flushes += 1
+
+    def _flush_rows(self, rows: List[dict]) -> List[dict]:
+        """
+        Writes `rows` one by one. Rows that fail while others succeed are
+        bad data and dropped; if none succeeds the database is at fault and
+        all failed rows are returned for a later retry.
+        """
+        failed = []
+        for row in rows:
+            try:
+                write_records(self.engine, [row], self.hooks)
+            except Exception:
+                failed.append(row)
+        written = len(rows) - len(failed)
+        if not written:
+            return failed
+        self.written += written
+        self.flushes += 1
+        self.dropped += len(failed)
+        return []
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "avg_batch": round(self.written / self.flushes, 1) if self.flushes else 0.0,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+# --------------------------------------------------------------------------- #
+#  Migration
+# --------------------------------------------------------------------------- #
+def needs_migration(bind: Engine | Connection) -> bool:
+    insp = inspect(bind)
+    if not insp.has_table("auditing"):
+        return False
+    columns = {c["name"]: c for c in insp.get_columns("auditing")}
+    return "created_at" not in columns or "CHAR" in str(columns["confidence"]["type"]).upper()
+
+
+def migrate(engine: Engine) -> int:
+    """
+    Upgrades an `auditing` table from the original all-text schema: the
+    table is rebuilt with numeric confidence ("87.12%" -> 0.8712), the new
+    probability / latency / timestamp columns and the query indexes.
+    Legacy rows have no timestamp and keep NULL. Returns rows migrated.
+    Safe to run from several processes at once: one migrates, the others
+    wait for the write lock and then find nothing to do.
+    """
+    if not needs_migration(engine):
+        Auditing.__table__.create(engine, checkfirst=True)
+        return 0
+
+    table = Auditing.__table__
+    with engine.begin() as conn:
+        # a no-op write takes SQLite's write lock before the schema is checked again
+        conn.exec_driver_sql("UPDATE auditing SET id = id WHERE 0")
+        if not needs_migration(conn):
+            return 0
+        for index in inspect(conn).get_indexes("auditing"):
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{index["name"]}"')
+        conn.exec_driver_sql("ALTER TABLE auditing RENAME TO auditing_legacy")
+        table.create(conn)
+        conn.exec_driver_sql(
+            """
+            INSERT INTO auditing (id, type, classification, reason, ext, confidence)
+            SELECT id, type, classification, reason, ext,
+                   CASE
+                       WHEN confidence LIKE '%\\%%' ESCAPE '\\'
+                           THEN CAST(REPLACE(confidence, '%', '') AS REAL) / 100.0
+                       WHEN CAST(confidence AS REAL) != 0 OR confidence = '0'
+                           THEN CAST(confidence AS REAL)
+                   END
+            FROM auditing_legacy
+            """
+        )
+        count = conn.exec_driver_sql("SELECT COUNT(*) FROM auditing").scalar_one()
+        conn.exec_driver_sql("DROP TABLE auditing_legacy")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit database maintenance")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--db", default="sqlite:///database/audit.db")
+    args = parser.parse_args()
+
+    engine = configure_sqlite(create_engine(args.db))
+    print(f"migrated {migrate(engine)} audit rows")
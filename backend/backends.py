@@ -0,0 +1,172 @@
+from __future__ import annotations
+import copy
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+# === CONFIG ===
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager")
+ONNX_DIR = os.getenv("ONNX_DIR", "models/onnx")
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", str(os.cpu_count() or 1)))
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "1"))
+
+BACKENDS = ("eager", "int8-dynamic", "int8-static", "onnx")
+
+IMG_SIZE = 160
+VIDEO_FRAMES = 20
+
+
+def example_input(name: str, batch: int = 1, img_size: int = IMG_SIZE, frames: int = VIDEO_FRAMES) -> torch.Tensor:
+    """Fixed, seeded input in the [-1, 1] range the pre-processing produces."""
+    gen = torch.Generator().manual_seed(0)
+    shape = (batch, frames, 3, img_size, img_size) if name == "video" else (batch, 3, img_size, img_size)
+    return torch.rand(shape, generator=gen) * 2 - 1
+
+
+# --------------------------------------------------------------------------- #
+#  Torch int8
+# --------------------------------------------------------------------------- #
+def quantize_dynamic(model: nn.Module) -> nn.Module:
+    """
+    int8 weights for Linear layers, activations quantised on the fly. Only
+    touches the classifier heads / temporal projection; the conv backbone
+    stays fp32, so this is the low-risk, low-gain option.
+    """
+    from torch.ao.quantization import quantize_dynamic as _quantize_dynamic
+
+    return _quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8).eval()
+
+
+def quantize_static(
+    model: nn.Module,
+    name: str,
+    calibration: Optional[torch.Tensor] = None,
+) -> nn.Module:
+    """
+    Post-training static int8 quantisation (FX graph mode, x86 qconfig) of
+    the EfficientNet backbone, which is where nearly all the FLOPs are. The
+    heads stay fp32. Calibrate with real pre-processed faces for production
+    use; the default seeded tensors only keep the pipeline runnable.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    model = copy.deepcopy(model).cpu().eval()
+    if calibration is None:
+        calibration = example_input(name, batch=4)
+    frames = calibration.flatten(0, 1) if name == "video" else calibration
+
+    backbone = model.backbone.model
+    prepared = prepare_fx(backbone, get_default_qconfig_mapping("x86"), (frames[:1],))
+    with torch.no_grad():
+        for chunk in frames.split(8):
+            prepared(chunk)
+    model.backbone.model = convert_fx(prepared)
+    return model
+
+
+# --------------------------------------------------------------------------- #
+#  ONNX Runtime
+# --------------------------------------------------------------------------- #
+class OrtModule(nn.Module):
+    """nn.Module facade over an onnxruntime session so callers need not care."""
+
+    def __init__(self, path: str | Path, intra_op: int = ORT_INTRA_OP_THREADS, inter_op: int = ORT_INTER_OP_THREADS):
+        super().__init__()
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = intra_op
+        opts.inter_op_num_threads = inter_op
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = str(path)
+        self.session = ort.InferenceSession(self.path, opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        arr = np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+        (logits,) = self.session.run(None, {self.input_name: arr})
+        return torch.from_numpy(logits)
+
+
+def export_onnx(model: nn.Module, name: str, path: str | Path) -> Path:
+    """Exports a classifier with dynamic batch (and frame) axes."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    dynamic = {0: "batch", 1: "frames"} if name == "video" else {0: "batch"}
+
+    model = model.cpu().eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (example_input(name),),
+            str(path),
+            input_names=["input"],
+            output_names=["logit"],
+            dynamic_axes={"input": dynamic, "logit": {0: "batch"}},
+            opset_version=17,
+            dynamo=False,
+        )
+    return path
+
+
+def to_onnx(model: nn.Module, name: str, identity: str, onnx_dir: str | Path = ONNX_DIR) -> OrtModule:
+    """Exports once per checkpoint identity and reuses the file afterwards."""
+    path = Path(onnx_dir) / f"{name}-{identity}.onnx"
+    if not path.exists():
+        export_onnx(model, name, path.with_suffix(".tmp"))
+        path.with_suffix(".tmp").replace(path)
+    return OrtModule(path)
+
+
+# --------------------------------------------------------------------------- #
+#  Entry points
+# --------------------------------------------------------------------------- #
+def apply_backend(
+    model: nn.Module,
+    name: str,
+    backend: str = INFERENCE_BACKEND,
+    *,
+    identity: str = "default",
+    calibration: Optional[torch.Tensor] = None,
+) -> nn.Module:
+    """Wraps an eager classifier in the requested CPU inference backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend!r}")
+    if backend == "eager":
+        return model
+    if backend == "int8-dynamic":
+        return quantize_dynamic(model)
+    if backend == "int8-static":
+        return quantize_static(model, name, calibration)
+    return to_onnx(model, name, identity)
+
+
+def check_parity(
+    reference: nn.Module,
+    candidate: nn.Module,
+    inputs: torch.Tensor,
+    batch: int = 4,
+) -> dict:
+    """
+    Compares a backend against the eager model on a fixed tensor set:
+    max / mean absolute probability difference and REAL/FAKE agreement.
+    """
+    ref, cand = [], []
+    with torch.no_grad():
+        for chunk in inputs.split(batch):
+            ref.append(torch.sigmoid(reference(chunk)).view(-1))
+            cand.append(torch.sigmoid(candidate(chunk)).view(-1))
+    ref_p, cand_p = torch.cat(ref), torch.cat(cand)
+    diff = (ref_p - cand_p).abs()
+    return {
+        "samples": int(ref_p.numel()),
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "label_agreement": float(((ref_p >= 0.5) == (cand_p >= 0.5)).float().mean()),
+    }
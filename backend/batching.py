@@ -0,0 +1,174 @@
+from __future__ import annotations
+import asyncio
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from metrics import observe_batch, stage
+
+# === CONFIG ===
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "512"))
+
+
+class BatchingEngine:
+    """
+    Dynamic micro-batcher that sits between the request handlers and a
+    classifier. Faces are queued, grouped into one batch per forward pass
+    (bounded by `max_batch_size` and `max_wait_ms`) and every caller gets
+    back its own fake-probability. `model` may be a zero-argument loader,
+    resolved on the batcher thread at the first forward pass.
+    """
+
+    def __init__(
+        self,
+        model: nn.Module | Callable[[], nn.Module],
+        device: torch.device | str,
+        *,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        max_queue: int = BATCH_MAX_QUEUE,
+    ):
+        self.model = model
+        self.device = device
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max_queue
+
+        self._queue: asyncio.Queue[Tuple[np.ndarray, asyncio.Future]] | None = None
+        self._task: asyncio.Task | None = None
+        # a single thread keeps forward passes serialised; torch still
+        # parallelises inside each pass with its intra-op pool
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batcher")
+
+        self._batches = 0
+        self._items = 0
+        self._sizes: Counter[int] = Counter()
+        self._last_forward_ms = 0.0
+        self._total_forward_ms = 0.0
+
+    # ------------------------------------------------------------------ #
+    #  Lifecycle
+    # ------------------------------------------------------------------ #
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="batching-engine")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # fail whatever is still waiting instead of leaving callers hanging
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("Batching engine stopped"))
+        self._executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------ #
+    #  Public API
+    # ------------------------------------------------------------------ #
+    async def submit(self, face: np.ndarray) -> float:
+        """Queue one pre-processed (H, W, C) face and wait for its prob_fake."""
+        if self._queue is None:
+            raise RuntimeError("Batching engine is not running")
+
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((face, fut))
+        return await fut
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 3) if self._batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._sizes.items())),
+            "last_forward_ms": round(self._last_forward_ms, 3),
+            "avg_forward_ms": round(self._total_forward_ms / self._batches, 3) if self._batches else 0.0,
+        }
+
+    # ------------------------------------------------------------------ #
+    #  Internals
+    # ------------------------------------------------------------------ #
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        assert self._queue is not None
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # drain whatever is already there without yielding
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _forward(self, faces: List[np.ndarray]) -> List[float]:
+        if not isinstance(self.model, nn.Module):
+            self.model = self.model()
+
+        arr = np.stack(faces)                              # (B, H, W, C)
+        tensor = torch.from_numpy(arr).permute(0, 3, 1, 2).float().to(self.device)
+
+        observe_batch("image", len(faces))
+        with torch.no_grad(), stage("image.forward"):
+            logits = self.model(tensor)                    # (B, 1)
+            probs = torch.sigmoid(logits).view(-1).cpu().tolist()
+        return probs
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # drop requests whose caller already went away
+            batch = [(face, fut) for face, fut in batch if not fut.cancelled()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                probs = await loop.run_in_executor(
+                    self._executor, self._forward, [face for face, _ in batch]
+                )
+            except Exception as exc:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+
+            self._last_forward_ms = (time.perf_counter() - start) * 1000.0
+            self._total_forward_ms += self._last_forward_ms
+            self._batches += 1
+            self._items += len(batch)
+            self._sizes[len(batch)] += 1
+
+            for (_, fut), prob in zip(batch, probs):
+                if not fut.done():
+                    fut.set_result(prob)
@@ -0,0 +1,102 @@
+"""
+Hourly FAKE/REAL dashboard query over a synthetic audit table: ad-hoc
+GROUP BY scan of `auditing` versus the rollup tables, plus backfill time
+and the cost the rollup hook adds to an audit flush.
+
+    cd backend
+    python -m benchmarks.bench_analytics --rows 10000000
+"""
+from __future__ import annotations
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import SQLModel, create_engine
+
+import structures  # noqa: F401  (registers the tables)
+from analytics import backfill, query, update_rollups
+from audit import configure_sqlite, record, write_records
+
+SCAN_SQL = """
+SELECT CAST(created_at / 3600 AS INTEGER) * 3600 AS hour, type, classification,
+       COUNT(*), AVG(confidence), AVG(latency_ms)
+FROM auditing
+WHERE created_at >= ?
+GROUP BY 1, 2, 3
+"""
+
+
+def populate(engine, rows: int, days: int) -> None:
+    """Fills `auditing` with `rows` synthetic records spread over `days`, in SQL."""
+    now = time.time()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"""
+            WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < {rows})
+            INSERT INTO auditing (id, type, classification, ext, confidence, probability, latency_ms, created_at)
+            SELECT printf('%032x', i),
+                   CASE i % 3 WHEN 0 THEN 'image' WHEN 1 THEN 'video' ELSE 'news' END,
+                   CASE WHEN abs(random()) % 100 < 30 THEN 'FAKE' ELSE 'REAL' END,
+                   '.jpg',
+                   0.5 + (abs(random()) % 5000) / 10000.0,
+                   (abs(random()) % 10000) / 10000.0,
+                   5 + (abs(random()) % 2000) / 10.0,
+                   {now} - (abs(random()) % {days * 86400})
+            FROM seq
+            """
+        )
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--flush", type=int, default=500, help="records per audit flush")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = configure_sqlite(create_engine(f"sqlite:///{Path(tmp) / 'audit.db'}"))
+        SQLModel.metadata.create_all(engine)
+
+        start = time.perf_counter()
+        populate(engine, args.rows, args.days)
+        print(f"populated {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        backfill(engine)
+        print(f"backfill: {time.perf_counter() - start:.1f}s")
+
+        since = time.time() - 7 * 86400
+        raw = engine.raw_connection()
+        scan = lambda s: raw.cursor().execute(SCAN_SQL, (s,)).fetchall()
+        print(f"{'query':<28} {'ad-hoc scan ms':>15} {'rollup ms':>10}")
+        for label, window in [("last 7 days, hourly", since), ("all time, hourly", 0.0)]:
+            print(f"{label:<28} {timed(lambda: scan(window)):>15.1f} {timed(lambda: query(engine, since=window or None)):>10.1f}")
+        raw.close()
+
+        batch = [
+            record("image", classification=random.choice(["REAL", "FAKE"]), confidence=random.random(), latency_ms=10.0)
+            for _ in range(args.flush)
+        ]
+
+        def flush(hooks):
+            for row in batch:
+                row["id"] = f"{random.getrandbits(128):032x}"
+            write_records(engine, batch, hooks)
+        print(f"flush of {args.flush}: {timed(lambda: flush([])):.1f} ms without rollups, "
+              f"{timed(lambda: flush([update_rollups])):.1f} ms with")
+
+
+if __name__ == "__main__":
+    main()
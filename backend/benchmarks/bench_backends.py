@@ -0,0 +1,70 @@
+"""
+Accuracy parity and throughput of each CPU inference backend against the
+eager fp32 classifiers, on a fixed seeded tensor set.
+
+    cd backend
+    python -m benchmarks.bench_backends --model image --samples 32
+    python -m benchmarks.bench_backends --model video --random-weights --backends eager onnx
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+
+import torch
+
+from backends import BACKENDS, apply_backend, check_parity, example_input
+from pytorch import MODEL_CLASSES, _build_from_checkpoint
+
+CHECKPOINTS = {"image": "models/image_model.pt", "video": "models/video_model.pt"}
+
+
+def throughput(model, inputs: torch.Tensor, batch: int, repeat: int) -> float:
+    with torch.no_grad():
+        model(inputs[:batch])                             # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for chunk in inputs.split(batch):
+                model(chunk)
+    return repeat * inputs.shape[0] / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=sorted(MODEL_CLASSES), default="image")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--samples", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--frames", type=int, default=20, help="frames per video sample")
+    parser.add_argument("--random-weights", action="store_true", help="skip the checkpoints")
+    args = parser.parse_args()
+
+    if args.random_weights:
+        torch.manual_seed(0)
+        eager = MODEL_CLASSES[args.model](pretrained=False).eval()
+    else:
+        eager = _build_from_checkpoint(MODEL_CLASSES[args.model], CHECKPOINTS[args.model], "cpu")
+
+    inputs = example_input(args.model, batch=args.samples, frames=args.frames)
+    unit = "videos/s" if args.model == "video" else "images/s"
+
+    print(f"{'backend':<13} {unit:>10} {'max|dp|':>9} {'mean|dp|':>9} {'agree':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            if backend == "onnx":
+                from backends import to_onnx
+                model = to_onnx(eager, args.model, "bench", onnx_dir=tmp)
+            else:
+                model = apply_backend(eager, args.model, backend)
+
+            parity = check_parity(eager, model, inputs, batch=args.batch)
+            rate = throughput(model, inputs, args.batch, args.repeat)
+            print(
+                f"{backend:<13} {rate:>10.2f} {parity['max_abs_diff']:>9.5f} "
+                f"{parity['mean_abs_diff']:>9.5f} {parity['label_agreement']:>6.2%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Items/sec for N images sent one request at a time to /predict-image versus
+in chunks to /predict-image/batch (and as one zip to /predict-image/archive).
+
+    cd backend
+    uvicorn main:app &
+    python -m benchmarks.bench_batch --url http://127.0.0.1:8000 --items 256 --batch 64
+"""
+from __future__ import annotations
+import argparse
+import io
+import random
+import time
+import zipfile
+
+import httpx
+
+from benchmarks.bench_load import synthetic_image
+
+
+def payloads(n: int) -> list[bytes]:
+    # salt the bytes so the result cache does not answer everything
+    base = synthetic_image()
+    return [base + random.randbytes(8) for _ in range(n)]
+
+
+def single(client: httpx.Client, items: list[bytes], _batch: int) -> int:
+    ok = 0
+    for data in items:
+        r = client.post("/predict-image", files={"file": ("x.jpg", data)})
+        ok += r.status_code == 200
+    return ok
+
+
+def batched(client: httpx.Client, items: list[bytes], batch: int) -> int:
+    ok = 0
+    for start in range(0, len(items), batch):
+        chunk = items[start:start + batch]
+        files = [("files", (f"{start + i}.jpg", data)) for i, data in enumerate(chunk)]
+        r = client.post("/predict-image/batch", files=files)
+        r.raise_for_status()
+        ok += r.json()["succeeded"]
+    return ok
+
+
+def archive(client: httpx.Client, items: list[bytes], _batch: int) -> int:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for i, data in enumerate(items):
+            zf.writestr(f"{i}.jpg", data)
+    r = client.post("/predict-image/archive", files={"file": ("batch.zip", buf.getvalue())})
+    r.raise_for_status()
+    return r.json()["succeeded"]
+
+
+MODES = {"single": single, "batch": batched, "archive": archive}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--items", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=64, help="items per /predict-image/batch request")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'items':>6} {'ok':>6} {'seconds':>9} {'items/s':>9}")
+    with httpx.Client(base_url=args.url, timeout=args.timeout) as client:
+        for name, fn in MODES.items():
+            items = payloads(args.items)
+            start = time.perf_counter()
+            ok = fn(client, items, args.batch)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<10} {args.items:>6} {ok:>6} {elapsed:>9.2f} {args.items / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+`clients.OllamaPool` against local stub Ollama servers: keep-alive versus
+a new connection per request, least-loaded routing between a fast and a
+slow endpoint, failover and circuit breaking when one endpoint returns
+503s or is down, a stalled endpoint bounded by the read timeout, and a
+streamed generation.
+
+    cd backend
+    python -m benchmarks.bench_clients --requests 200
+"""
+from __future__ import annotations
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from clients import BackendUnavailable, OllamaPool
+
+
+class StubOllama:
+    """Minimal /api/embed and /api/generate server with tunable delay and failures."""
+
+    def __init__(self, *, delay: float = 0.0, status: int = 200, dim: int = 8):
+        self.delay = delay
+        self.status = status
+        self.dim = dim
+        self.requests = 0
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"       # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                stub.requests += 1
+                stub.connections.add(self.client_address)
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                time.sleep(stub.delay)
+                if stub.status != 200:
+                    return self._send(stub.status, {"error": "unavailable"})
+                if self.path == "/api/embed":
+                    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                    return self._send(200, {"embeddings": [[0.1] * stub.dim for _ in inputs]})
+                reply = "VERDICT: REAL\nREASON: stub."
+                if body.get("stream"):
+                    lines = [json.dumps({"response": tok, "done": False}) for tok in reply.split(" ")]
+                    payload = ("\n".join(lines) + "\n" + json.dumps({"response": "", "done": True}) + "\n").encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                self._send(200, {"response": reply, "done": True})
+
+            def _send(self, status, obj):
+                data = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def timed(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    n = args.requests
+
+    # 1. connection reuse
+    stub = StubOllama()
+    pool = OllamaPool([stub.url])
+
+    def fresh():
+        with httpx.Client() as c:
+            c.post(stub.url + "/api/embed", json={"model": "m", "input": ["x"]}).json()
+
+    print(f"embed, new connection per call: {timed(fresh, n):.2f} ms")
+    before = len(stub.connections)
+    print(f"embed, pooled keep-alive:       {timed(lambda: pool.embed('m', ['x']), n):.2f} ms "
+          f"({len(stub.connections) - before} connections for {n} calls)")
+    pool.close()
+    stub.close()
+
+    # 2. least-loaded routing
+    fast, slow = StubOllama(delay=0.005), StubOllama(delay=0.05)
+    pool = OllamaPool([fast.url, slow.url])
+    with ThreadPoolExecutor(8) as ex:
+        list(ex.map(lambda _: pool.embed("m", ["x"]), range(n)))
+    print(f"routing with 8 concurrent callers: fast={fast.requests} slow={slow.requests}")
+    pool.close()
+    fast.close()
+    slow.close()
+
+    # 3. failover + breaker
+    good, bad = StubOllama(), StubOllama(status=503)
+    pool = OllamaPool([bad.url, good.url, "http://127.0.0.1:9"], breaker_failures=3, breaker_reset=60)
+    failures = 0
+    for _ in range(n):
+        try:
+            pool.embed("m", ["x"])
+        except BackendUnavailable:
+            failures += 1
+    states = {url.rsplit(":", 1)[1]: e["state"] for url, e in pool.stats().items()}
+    print(f"failover: {failures}/{n} failed, 503 endpoint saw {bad.requests} requests, breakers {states}")
+    pool.close()
+    good.close()
+    bad.close()
+
+    # 4. stalled endpoint
+    stalled = StubOllama(delay=5.0)
+    pool = OllamaPool([stalled.url], read_timeout=0.5, retries=1)
+    start = time.perf_counter()
+    try:
+        pool.generate("m", "hello")
+        outcome = "answered"
+    except BackendUnavailable:
+        outcome = "BackendUnavailable"
+    print(f"stalled endpoint: {outcome} after {time.perf_counter() - start:.2f}s (read timeout 0.5s, 1 retry)")
+    pool.close()
+    stalled.close()
+
+    # 5. streaming
+    stub = StubOllama()
+    pool = OllamaPool([stub.url])
+    chunks = list(pool.generate_stream("m", "hello"))
+    print(f"stream: {len(chunks)} chunks {chunks!r}")
+    print(f"warm-up: {list(pool.warm_up('llm', 'embed').values())}")
+    pool.close()
+    stub.close()
+
+
+if __name__ == "__main__":
+    main()
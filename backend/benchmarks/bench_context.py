@@ -0,0 +1,105 @@
+"""
+Prompt size of the fact-check LLM call: the original context (top 5
+articles cut at 200 characters, no dedup, variables before the rules)
+versus `context.assemble` on synthetic search results where the same
+story is syndicated across sources. Also reports how many leading bytes
+consecutive prompts share, i.e. what the server's prompt cache can reuse.
+
+    cd backend
+    python -m benchmarks.bench_context --claims 200 --budget 400
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+import numpy as np
+
+from context import PROMPT_BODY, PROMPT_PREFIX, assemble, count_tokens
+
+LEGACY_TEMPLATE = """You are a news fact-checker. Analyze the claim against retrieved information from the web.
+
+WEB ARTICLES:
+{web_context}
+
+TRUSTED FACTS:
+{static_context}
+
+CLAIM TO VERIFY:
+{claim}
+
+""" + PROMPT_PREFIX.split("\n\n", 1)[1]
+
+SOURCES = ["reuters.com", "apnews.com", "bbc.com", "thehindu.com", "ndtv.com", "cnn.com", "theguardian.com"]
+FACTS = [
+    "September is historically a weak month for equities; the S&P 500 averages -1.1% since 1950.",
+    "Tariffs on Chinese goods raise U.S. manufacturing costs by 2-5% according to the Federal Reserve.",
+]
+
+
+def synthetic_articles(rng: random.Random, claim: str, n: int = 10) -> list[dict]:
+    stories = [
+        f"{claim} Officials confirmed the figures on {rng.randint(1, 28)} March, citing data released by the ministry "
+        f"and analysts who expect further revisions in the coming quarter as markets digest the change.",
+        f"Unrelated coverage {rng.randint(0, 999)}: local elections, weather warnings and transport strikes continue "
+        f"to dominate regional headlines this week, with several events postponed.",
+        f"Background on {claim.split()[0]}: the institution has adjusted policy {rng.randint(2, 9)} times in the "
+        f"past two years, according to its published statements and minutes.",
+    ]
+    out = []
+    for i in range(n):
+        body = stories[0] if i % 2 == 0 else rng.choice(stories)   # syndicated wire copy
+        if rng.random() < 0.5:
+            body = body.replace("confirmed", "said")               # light edits between outlets
+        out.append({"source": SOURCES[i % len(SOURCES)], "title": f"Headline {i}", "snippet": body})
+    return out
+
+
+def legacy_prompt(claim: str, articles: list[dict]) -> str:
+    web = "\n".join(f"[{a['source']}] {a['title']}: {a['snippet'][:200]}" for a in articles[:5])
+    return LEGACY_TEMPLATE.format(web_context=web, static_context="\n".join(FACTS), claim=claim)
+
+
+def shared_prefix(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=400)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    old_tokens, new_tokens, old_shared, new_shared, times = [], [], [], [], []
+    prev_old = prev_new = ""
+    for i in range(args.claims):
+        claim = f"The Reserve Bank raised the repo rate by {rng.randint(10, 90)} basis points in {rng.randint(2000, 2025)}."
+        articles = synthetic_articles(rng, claim)
+
+        old = legacy_prompt(claim, articles)
+        start = time.perf_counter()
+        variables, _ = assemble(claim, articles, FACTS, budget=args.budget)
+        times.append((time.perf_counter() - start) * 1000.0)
+        new = PROMPT_PREFIX + PROMPT_BODY.format(**variables)
+
+        old_tokens.append(count_tokens(old))
+        new_tokens.append(count_tokens(new))
+        if i:
+            old_shared.append(shared_prefix(prev_old, old))
+            new_shared.append(shared_prefix(prev_new, new))
+        prev_old, prev_new = old, new
+
+    print(f"{'':<28} {'legacy':>10} {'assembled':>10}")
+    print(f"{'prompt tokens (mean)':<28} {np.mean(old_tokens):>10.0f} {np.mean(new_tokens):>10.0f}")
+    print(f"{'shared prefix bytes (mean)':<28} {np.mean(old_shared):>10.0f} {np.mean(new_shared):>10.0f}")
+    print(f"assemble: {np.mean(times):.2f} ms mean, {np.percentile(times, 95):.2f} ms p95")
+
+
+if __name__ == "__main__":
+    main()
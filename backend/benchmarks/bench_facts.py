@@ -0,0 +1,90 @@
+"""
+Trusted-facts ingestion throughput into a temporary Chroma store, with
+deterministic local embeddings that sleep per request to stand in for
+Ollama: the old one `embed_query` per fact path, then `ingest_facts`
+cold, re-run (incremental, nothing embedded) and with 10% of the facts
+edited under --sync.
+
+    cd backend
+    python -m benchmarks.bench_facts --facts 20000 --request-ms 20
+"""
+from __future__ import annotations
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from facts import FACTS_COLLECTION, ingest_facts, read_facts
+
+
+class SlowFakeEmbedding(DeterministicFakeEmbedding):
+    """Deterministic vectors plus a fixed delay per request, like one Ollama round-trip."""
+
+    request_s: float = 0.0
+
+    def embed_documents(self, texts):
+        time.sleep(self.request_s)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.request_s)
+        return super().embed_query(text)
+
+
+def write_facts(path: Path, n: int, edited: float = 0.0) -> None:
+    with path.open("w") as f:
+        for i in range(n):
+            suffix = " (revised)" if i < n * edited else ""
+            f.write(json.dumps({"text": f"Verified fact number {i}: figure {i * 7 % 1000}{suffix}.", "source": "bench"}) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--facts", type=int, default=20000)
+    parser.add_argument("--request-ms", type=float, default=20.0, help="simulated latency per embedding request")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--legacy-sample", type=int, default=500, help="facts timed on the one-by-one path")
+    args = parser.parse_args()
+
+    embeddings = SlowFakeEmbedding(size=768, request_s=args.request_ms / 1000.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        client = chromadb.PersistentClient(path=str(tmp / "chroma"))
+
+        legacy = client.get_or_create_collection("legacy", metadata={"hnsw:space": "cosine"})
+        texts = [f"Legacy fact {i}" for i in range(args.legacy_sample)]
+        start = time.perf_counter()
+        legacy.add(
+            ids=[f"fact_{i}" for i in range(len(texts))],
+            documents=texts,
+            embeddings=[embeddings.embed_query(t) for t in texts],
+        )
+        print(f"{'one embed_query per fact':<28} {len(texts) / (time.perf_counter() - start):>10.1f} docs/s")
+
+        collection = client.get_or_create_collection(FACTS_COLLECTION, metadata={"hnsw:space": "cosine"})
+        path = tmp / "facts.jsonl"
+        write_facts(path, args.facts)
+        runs = [("cold", {}), ("re-run", {})]
+        for label, kw in runs:
+            report = ingest_facts(
+                collection, embeddings, read_facts(path), dataset="bench",
+                batch_size=args.batch_size, concurrency=args.concurrency, **kw,
+            )
+            print(f"{label:<28} {report['docs_per_sec']:>10.1f} docs/s  {report}")
+
+        write_facts(path, args.facts, edited=0.1)
+        report = ingest_facts(
+            collection, embeddings, read_facts(path), dataset="bench",
+            batch_size=args.batch_size, concurrency=args.concurrency, sync=True,
+        )
+        print(f"{'10% edited, --sync':<28} {report['docs_per_sec']:>10.1f} docs/s  {report}")
+        print(f"collection size: {collection.count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+BM25 lexical index at corpus scale: build and save time, on-disk size,
+open time (memory-mapped, so it should stay flat as the corpus grows) and
+query latency, on synthetic facts full of names and numbers.
+
+    cd backend
+    python -m benchmarks.bench_lexical --facts 10000 100000 500000
+"""
+from __future__ import annotations
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from lexical import LexicalIndex
+
+NAMES = ["Reserve Bank", "Federal Reserve", "Tricolor", "First Brands", "S&P 500", "Nifty", "ECB", "IMF"]
+VERBS = ["raised", "cut", "held", "reported", "forecast", "revised"]
+NOUNS = ["rates", "inflation", "growth", "exports", "defaults", "earnings"]
+
+
+def synthetic_facts(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(NAMES)} {rng.choice(VERBS)} {rng.choice(NOUNS)} by {rng.randint(1, 500)} basis points "
+        f"in {rng.randint(1950, 2025)} according to report {i}."
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--facts", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'facts':>9} {'build s':>8} {'size MB':>8} {'open ms':>8} {'query p50 ms':>13} {'p95 ms':>8}")
+    for n in args.facts:
+        texts = synthetic_facts(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "lexical"
+            start = time.perf_counter()
+            index = LexicalIndex(path)
+            index.add([f"fact_{i}" for i in range(n)], texts)
+            index.save()
+            build = time.perf_counter() - start
+            size = sum(f.stat().st_size for f in path.iterdir()) / (1 << 20)
+
+            start = time.perf_counter()
+            index = LexicalIndex(path)
+            opened = (time.perf_counter() - start) * 1000.0
+
+            rng = random.Random(1)
+            times = []
+            for _ in range(args.queries):
+                query = f"{rng.choice(NAMES)} {rng.choice(VERBS)} {rng.randint(1, 500)} basis points {rng.randint(1950, 2025)}"
+                start = time.perf_counter()
+                index.search(query, 10)
+                times.append((time.perf_counter() - start) * 1000.0)
+            p50, p95 = np.percentile(times, [50, 95])
+            print(f"{n:>9} {build:>8.1f} {size:>8.1f} {opened:>8.2f} {p50:>13.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
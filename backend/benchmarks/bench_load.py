@@ -0,0 +1,104 @@
+"""
+Mixed-load latency against a running backend: p50/p99 per endpoint and
+how many requests were shed with 429/503.
+
+    cd backend
+    uvicorn main:app &
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000 --concurrency 32 --duration 30
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import cv2
+import httpx
+import numpy as np
+
+from benchmarks.bench_sampling import make_clip
+
+CLAIM = "The Reserve Bank of India raised the repo rate by 50 basis points today."
+
+
+def synthetic_image(size: int = 512) -> bytes:
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", img)
+    assert ok
+    return buf.tobytes()
+
+
+def synthetic_video(tmp: Path) -> bytes:
+    path = tmp / "clip.mp4"
+    make_clip(path, "mp4v", 120, (640, 360))
+    return path.read_bytes()
+
+
+async def worker(client, mix, payloads, deadline, latencies, statuses):
+    endpoints, weights = zip(*mix.items())
+    while time.monotonic() < deadline:
+        name = random.choices(endpoints, weights)[0]
+        start = time.perf_counter()
+        try:
+            if name == "health":
+                r = await client.get("/")
+            elif name == "image":
+                # salt the bytes so the result cache does not answer everything
+                data = payloads["image"] + random.randbytes(8)
+                r = await client.post("/predict-image", files={"file": ("x.jpg", data)})
+            elif name == "video":
+                r = await client.post("/predict-video", files={"file": ("x.mp4", payloads["video"])})
+            else:
+                r = await client.post("/predict-news", json={"text": CLAIM})
+            status = r.status_code
+        except httpx.HTTPError:
+            status = "error"
+        elapsed = (time.perf_counter() - start) * 1000.0
+        statuses[name][status] += 1
+        if status == 200:
+            latencies[name].append(elapsed)
+
+
+async def run(args) -> None:
+    mix = {"health": args.health, "image": args.image, "video": args.video, "news": args.news}
+    mix = {k: v for k, v in mix.items() if v > 0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        payloads = {"image": synthetic_image(), "video": synthetic_video(Path(tmp))}
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    deadline = time.monotonic() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        await asyncio.gather(*[
+            worker(client, mix, payloads, deadline, latencies, statuses)
+            for _ in range(args.concurrency)
+        ])
+
+    print(f"{'endpoint':<8} {'ok':>6} {'p50 ms':>9} {'p99 ms':>9}  statuses")
+    for name in mix:
+        lat = np.asarray(latencies[name])
+        p50, p99 = np.percentile(lat, [50, 99]) if lat.size else (float("nan"),) * 2
+        print(f"{name:<8} {lat.size:>6} {p50:>9.1f} {p99:>9.1f}  {dict(statuses[name])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--health", type=float, default=4, help="relative weight of GET /")
+    parser.add_argument("--image", type=float, default=4)
+    parser.add_argument("--video", type=float, default=1)
+    parser.add_argument("--news", type=float, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-video decode time of each frame-sampling strategy on synthetic clips.
+
+    cd backend
+    python -m benchmarks.bench_sampling --frames 400 --repeat 5
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from sampling import STRATEGIES, choose_strategy, probe_keyframes, sample_frames
+
+CODECS = {
+    "mp4v": ".mp4",
+    "avc1": ".mp4",
+    "MJPG": ".avi",
+}
+
+
+def make_clip(path: Path, codec: str, n_frames: int, size: tuple[int, int], fps: float = 25.0) -> bool:
+    """Writes a moving-gradient clip; returns False if the codec is unavailable."""
+    w, h = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*codec), fps, (w, h))
+    if not writer.isOpened():
+        return False
+
+    xx, yy = np.meshgrid(np.arange(w), np.arange(h))
+    for i in range(n_frames):
+        frame = np.empty((h, w, 3), dtype=np.uint8)
+        frame[..., 0] = (xx + 3 * i) % 256
+        frame[..., 1] = (yy + 2 * i) % 256
+        frame[..., 2] = (xx + yy + i) % 256
+        cv2.circle(frame, ((5 * i) % w, h // 2), h // 6, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path.exists() and path.stat().st_size > 0
+
+
+def time_strategy(path: Path, strategy: str, num_frames: int, max_seq_len: int, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    got = 0
+    for _ in range(repeat):
+        cap = cv2.VideoCapture(str(path))
+        start = time.perf_counter()
+        keyframes = probe_keyframes(str(path), max_seq_len)
+        frames = sample_frames(cap, num_frames, max_seq_len, strategy=strategy, keyframes=keyframes)
+        best = min(best, time.perf_counter() - start)
+        got = len(frames)
+        cap.release()
+    return best * 1000.0, got
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=400, help="frames per synthetic clip")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--num-frames", type=int, default=20, help="frames sampled per video")
+    parser.add_argument("--max-seq-len", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'codec':<6} {'strategy':<11} {'ms/video':>10} {'frames':>7}")
+        for codec, ext in CODECS.items():
+            path = Path(tmp) / f"clip_{codec}{ext}"
+            if not make_clip(path, codec, args.frames, (args.width, args.height)):
+                print(f"{codec:<6} (codec not available, skipped)")
+                continue
+
+            cap = cv2.VideoCapture(str(path))
+            picked = choose_strategy(
+                cap, args.num_frames, args.max_seq_len, probe_keyframes(str(path), args.max_seq_len),
+            )
+            cap.release()
+
+            for strategy in STRATEGIES:
+                if strategy == "auto":
+                    continue
+                ms, got = time_strategy(path, strategy, args.num_frames, args.max_seq_len, args.repeat)
+                mark = " <- auto" if strategy == picked else ""
+                print(f"{codec:<6} {strategy:<11} {ms:>10.1f} {got:>7}{mark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Memory and throughput of the multi-worker deployments against worker
+count: `uvicorn main:app --workers N` (every worker loads its own models,
+torch sizes its pools to all cores)
+versus `serve.py` with and without shared models. For each it reports
+startup time, process count, RSS and PSS summed over the process tree
+(PSS splits shared pages between the processes mapping them, so it is
+the number that adds up) and /predict-image throughput.
+
+Needs the same environment as the API itself (weights, Ollama).
+
+    cd backend
+    python -m benchmarks.bench_serve --workers 1 2 4 --requests 64
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_load import synthetic_image
+
+MODES = {
+    "uvicorn": lambda n, port: [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(n), "--port", str(port)],
+    "serve --no-share": lambda n, port: [sys.executable, "serve.py", "--workers", str(n), "--port", str(port), "--no-share"],
+    "serve": lambda n, port: [sys.executable, "serve.py", "--workers", str(n), "--port", str(port)],
+}
+
+
+def process_tree(root: int) -> list[int]:
+    children: dict[int, list[int]] = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    pids, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        pids.append(pid)
+        todo.extend(children.get(pid, []))
+    return pids
+
+
+def tree_memory(root: int) -> dict:
+    """RSS and PSS in MB summed over `root` and its descendants."""
+    totals = {"Rss": 0, "Pss": 0}
+    pids = process_tree(root)
+    for pid in pids:
+        try:
+            lines = Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            key, value = line.split(":", 1)
+            if key in totals:
+                totals[key] += int(value.split()[0])
+    return {"processes": len(pids), "rss_mb": totals["Rss"] / 1024, "pss_mb": totals["Pss"] / 1024}
+
+
+def tree_cpu_seconds(root: int) -> float:
+    ticks = 0
+    for pid in process_tree(root):
+        try:
+            fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        ticks += int(fields[11]) + int(fields[12])      # utime + stime
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def settle(root: int, timeout: float = 300.0, idle: float = 0.1) -> None:
+    """
+    Waits until the tree uses under `idle` of a core: processes started in
+    the background (e.g. the job consumers) must not share the timed window.
+    """
+    deadline = time.monotonic() + timeout
+    last = tree_cpu_seconds(root)
+    while time.monotonic() < deadline:
+        time.sleep(1.0)
+        now = tree_cpu_seconds(root)
+        if now - last < idle:
+            return
+        last = now
+
+
+def start(cmd: list[str], workers: int, timeout: float) -> tuple[subprocess.Popen, float]:
+    """Launches `cmd` and waits until every worker has finished its startup."""
+    start_time = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, start_new_session=True,
+    )
+    ready = threading.Event()
+
+    def watch():
+        count = 0
+        for line in proc.stdout:
+            if "Application startup complete" in line:
+                count += 1
+                if count == workers:
+                    ready.set()
+            elif "Application startup failed" in line:
+                print(f"  {line.rstrip()}", file=sys.stderr)
+
+    threading.Thread(target=watch, daemon=True).start()
+    if not ready.wait(timeout):
+        stop(proc)
+        raise RuntimeError(f"{' '.join(cmd)} did not start {workers} workers within {timeout:.0f}s")
+    return proc, time.perf_counter() - start_time
+
+
+def stop(proc: subprocess.Popen) -> None:
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(60)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def drive(url: str, image: bytes, n: int, concurrency: int) -> tuple[float, list[float]]:
+    """`n` /predict-image calls, `concurrency` at a time; salted so the result cache misses."""
+    latencies: list[float] = []
+    todo = iter(range(n))
+
+    async def worker(client: httpx.AsyncClient):
+        for _ in todo:
+            begin = time.perf_counter()
+            r = await client.post("/predict-image", files={"file": ("x.jpg", image + random.randbytes(8))})
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - begin) * 1000.0)
+
+    async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+        begin = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return n / (time.perf_counter() - begin), latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    # one-off startup steps once up front, so uvicorn's workers do not race over them
+    subprocess.run([sys.executable, "serve.py", "--setup-only"], check=True)
+    os.environ["STARTUP_SETUP"] = "0"
+
+    image = synthetic_image(512)
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"{'mode':<18} {'workers':>7} {'startup s':>9} {'procs':>5} {'RSS MB':>8} {'PSS MB':>8} {'img/s':>7} {'p50 ms':>8}")
+    for n in args.workers:
+        for mode in args.modes:
+            proc, startup = start(MODES[mode](n, args.port), n, args.startup_timeout)
+            try:
+                # every worker loads what it lazily loads before timing starts
+                asyncio.run(drive(url, image, 4 * n, 2 * n))
+                settle(proc.pid)
+                throughput, latencies = asyncio.run(drive(url, image, args.requests, 2 * n))
+                mem = tree_memory(proc.pid)
+            finally:
+                stop(proc)
+            print(
+                f"{mode:<18} {n:>7} {startup:>9.1f} {mem['processes']:>5} {mem['rss_mb']:>8.0f} "
+                f"{mem['pss_mb']:>8.0f} {throughput:>7.2f} {np.percentile(latencies, 50):>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Face tracking versus per-frame detection on a synthetic two-person clip:
+detector frames, wall time and how well tracks follow one identity
+(purity) and its box (mean IoU against the ground truth). The "faces"
+are textured patches that a colour-threshold detector finds, so the
+numbers do not depend on the face weights.
+
+    cd backend
+    python -m benchmarks.bench_tracking --frames 48 --detect-every 2 4 8
+    python -m benchmarks.bench_tracking --no-model      # tracking only
+"""
+from __future__ import annotations
+import argparse
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+import torch
+
+from pytorch import VideoClassifier, classify_frames, classify_frames_tracked
+from tracking import build_tracks, iou_matrix
+
+
+class ColorBlobDetector:
+    """YOLO-shaped detector returning the bounding box of every pure-red blob."""
+
+    class _Boxes:
+        def __init__(self, xyxy: torch.Tensor):
+            self.xyxy = xyxy
+
+    class _Result:
+        def __init__(self, boxes):
+            self.boxes = boxes
+
+    def __init__(self):
+        self.calls = 0
+        self.frames = 0
+
+    def __call__(self, frames, **_):
+        frames = frames if isinstance(frames, list) else [frames]
+        self.calls += 1
+        self.frames += len(frames)
+        out = []
+        for f in frames:
+            mask = (f[..., 0] == 255).astype(np.uint8)
+            n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+            boxes = [
+                [x, y, x + w, y + h] for x, y, w, h, area in stats[1:n] if area > 100
+            ]
+            out.append(self._Result(self._Boxes(torch.tensor(boxes, dtype=torch.float32).reshape(-1, 4))))
+        return out
+
+
+def make_frames(n: int, size: tuple[int, int], seed: int = 0):
+    """`n` RGB frames with two moving textured patches, plus their true boxes (n, 2, 4)."""
+    w, h = size
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 200, (h, w, 3), dtype=np.uint8)
+    patches = [rng.integers(0, 255, (90, 70, 3), dtype=np.uint8) for _ in range(2)]
+    for p in patches:
+        p[..., 0] = 255                           # what the detector keys on
+    starts = np.array([[0.1 * w, 0.3 * h], [0.7 * w, 0.2 * h]])
+    velocity = np.array([[0.35 * w, 0.1 * h], [-0.3 * w, 0.25 * h]]) / max(n - 1, 1)
+
+    frames, truth = [], np.zeros((n, 2, 4), dtype=np.float32)
+    for t in range(n):
+        frame = background.copy()
+        for k, p in enumerate(patches):
+            x, y = (starts[k] + velocity[k] * t).astype(int)
+            ph, pw = p.shape[:2]
+            frame[y:y + ph, x:x + pw] = p
+            truth[t, k] = [x, y, x + pw, y + ph]
+        frames.append(frame)
+    return frames, truth
+
+
+def track_quality(tracks, truth: np.ndarray) -> tuple[float, float]:
+    """(identity purity, mean IoU) of all tracked boxes against the true ones."""
+    agree = total = 0
+    ious = []
+    for track in tracks:
+        idx, boxes = track.span()
+        best = [iou_matrix(boxes[j:j + 1], truth[i])[0] for j, i in enumerate(idx)]
+        ids = [int(b.argmax()) for b in best]
+        agree += Counter(ids).most_common(1)[0][1]
+        total += len(ids)
+        ious += [float(b.max()) for b in best]
+    return (agree / total if total else 0.0), (float(np.mean(ious)) if ious else 0.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=48)
+    parser.add_argument("--size", type=int, nargs=2, default=[1280, 720])
+    parser.add_argument("--detect-every", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--no-flow", action="store_true", help="hold boxes still between keyframes")
+    parser.add_argument("--no-model", action="store_true", help="skip the classifier timings")
+    args = parser.parse_args()
+
+    frames, truth = make_frames(args.frames, tuple(args.size))
+
+    print(f"{'detect every':>12} {'detector frames':>16} {'track ms':>9} {'tracks':>7} {'purity':>7} {'IoU':>6}")
+    for k in args.detect_every:
+        detector = ColorBlobDetector()
+        start = time.perf_counter()
+        tracks, _ = build_tracks(frames, face_detector=detector, detect_every=k, flow=not args.no_flow)
+        ms = (time.perf_counter() - start) * 1000.0
+        purity, iou = track_quality(tracks, truth)
+        print(f"{k:>12} {detector.frames:>16} {ms:>9.1f} {len(tracks):>7} {purity:>7.3f} {iou:>6.3f}")
+
+    if args.no_model:
+        return
+    torch.manual_seed(0)
+    model = VideoClassifier(pretrained=False).eval()
+    print(f"\n{'strategy':<28} {'detector frames':>16} {'ms':>9}")
+    for label, fn, kwargs in [
+        ("per-frame, largest box", classify_frames, {"num_frames": args.frames}),
+        ("tracked", classify_frames_tracked, {}),
+    ]:
+        detector = ColorBlobDetector()
+        start = time.perf_counter()
+        fn(frames, model=model, device="cpu", face_detector=detector, **kwargs)
+        ms = (time.perf_counter() - start) * 1000.0
+        print(f"{label:<28} {detector.frames:>16} {ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Offline latency / agreement trade-off of adaptive (early-exit) video
+scoring against the fixed 20-frame baseline.
+
+    cd backend
+    python -m benchmarks.eval_adaptive --videos path/to/clips --margins 0.1 0.2 0.3 0.4
+    python -m benchmarks.eval_adaptive --synthetic 8 --random-weights
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+from benchmarks.bench_sampling import make_clip
+from pytorch import (
+    ModelRegistry,
+    VideoClassifier,
+    classify_frames,
+    classify_frames_adaptive,
+    decode_video,
+)
+
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, (time.perf_counter() - start) * 1000.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=Path, help="directory of clips to evaluate")
+    parser.add_argument("--synthetic", type=int, default=0, help="generate N synthetic clips instead")
+    parser.add_argument("--random-weights", action="store_true")
+    parser.add_argument("--face-weights", default="models/yolov8n-face.pt")
+    parser.add_argument("--max-frames", type=int, default=32)
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.1, 0.2, 0.3, 0.4])
+    args = parser.parse_args()
+
+    if args.random_weights:
+        torch.manual_seed(0)
+        model = VideoClassifier(pretrained=False).eval()
+    else:
+        model = ModelRegistry("cpu").get("video")
+    detector = YOLO(args.face_weights)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.videos:
+            paths = sorted(p for p in args.videos.iterdir() if p.suffix.lower() in VIDEO_EXTS)
+        else:
+            paths = []
+            for i in range(args.synthetic):
+                p = Path(tmp) / f"synthetic_{i}.mp4"
+                make_clip(p, "mp4v", 150 + 25 * i, (640, 360))
+                paths.append(p)
+        if not paths:
+            parser.error("no videos: pass --videos DIR or --synthetic N")
+
+        # baseline: fixed 20 frames, as served today
+        baseline = {}
+        base_ms = []
+        for p in paths:
+            frames = decode_video(p, 20)
+            res, ms = timed(classify_frames, frames, model=model, device="cpu", face_detector=detector)
+            baseline[p] = res
+            base_ms.append(ms)
+
+        print(f"{'mode':<16} {'ms/video':>9} {'frames':>7} {'agree':>7} {'mean|dp|':>9}")
+        print(f"{'fixed-20':<16} {np.mean(base_ms):>9.1f} {20:>7.1f} {1:>7.2%} {0:>9.4f}")
+
+        pools = {p: decode_video(p, args.max_frames) for p in paths}
+        for margin in args.margins:
+            ms_list, used, agree, dp = [], [], [], []
+            for p in paths:
+                res, ms = timed(
+                    classify_frames_adaptive, pools[p],
+                    model=model, device="cpu", face_detector=detector, margin=margin,
+                )
+                ms_list.append(ms)
+                used.append(res["frames_used"])
+                agree.append(res["prediction"] == baseline[p]["prediction"])
+                dp.append(abs(float(res["probability_fake"]) - float(baseline[p]["probability_fake"])))
+            print(
+                f"{f'adaptive m={margin:g}':<16} {np.mean(ms_list):>9.1f} {np.mean(used):>7.1f} "
+                f"{np.mean(agree):>7.2%} {np.mean(dp):>9.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
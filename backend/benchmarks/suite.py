@@ -0,0 +1,347 @@
+"""
+Offline CPU benchmark suite for the detection and RAG hot paths:
+extract_face, guess_image, guess_video and rag_classify on synthetic
+inputs, with optional random weights, a fixed-box face detector and local
+stand-ins for Ollama and DDGS. Writes per-case latency percentiles, per
+stage means (from `metrics.pipeline_stage_seconds`), throughput at several
+concurrency levels and per-case peak / delta RSS as JSON, and can gate on a baseline.
+
+    cd backend
+    python -m benchmarks.suite --random-weights --fake-detector --out results.json
+    python -m benchmarks.suite --random-weights --fake-detector --baseline baseline.json --threshold 0.15
+    python -m benchmarks.suite --quick --only image
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+import psutil
+import torch
+
+import metrics
+from benchmarks.bench_sampling import make_clip
+
+FACE_WEIGHTS = "models/yolov8n-face.pt"
+CHECKPOINTS = {"image": "models/image_model.pt", "video": "models/video_model.pt"}
+
+IMAGE_SIZES = [(320, 240), (1280, 720), (1920, 1080)]
+VIDEO_SPECS = [  # (codec, frames, (w, h))
+    ("mp4v", 120, (640, 360)),
+    ("mp4v", 600, (1280, 720)),
+    ("MJPG", 120, (640, 360)),
+]
+CONCURRENCY = [1, 2, 4]
+CLAIM = "The Reserve Bank of India raised the repo rate by 50 basis points today."
+
+# metric -> whether larger is better; compared against the baseline
+GATED = {"p50_ms": False, "p95_ms": False, "throughput": True}
+
+
+# --------------------------------------------------------------------------- #
+#  Offline stand-ins
+# --------------------------------------------------------------------------- #
+class FixedBoxDetector:
+    """
+    YOLO-shaped face detector that "finds" one centred face per frame, so
+    the pipeline runs its crop path without the face weights.
+    """
+
+    class _Boxes:
+        def __init__(self, xyxy: torch.Tensor):
+            self.xyxy = xyxy
+
+    class _Result:
+        def __init__(self, boxes):
+            self.boxes = boxes
+
+    def __call__(self, frames, **_):
+        out = []
+        for f in frames if isinstance(frames, list) else [frames]:
+            h, w = f.shape[:2]
+            box = torch.tensor([[w * 0.3, h * 0.2, w * 0.7, h * 0.8]])
+            out.append(self._Result(self._Boxes(box)))
+        return out
+
+
+def synthetic_image(size: tuple[int, int], seed: int = 0) -> bytes:
+    w, h = size
+    img = np.random.default_rng(seed).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", img)
+    assert ok
+    return buf.tobytes()
+
+
+def load_models(random_weights: bool):
+    from pytorch import MODEL_CLASSES, _build_from_checkpoint
+
+    models = {}
+    for name, cls in MODEL_CLASSES.items():
+        if random_weights:
+            torch.manual_seed(0)
+            models[name] = cls(pretrained=False).eval()
+        else:
+            models[name] = _build_from_checkpoint(cls, CHECKPOINTS[name], "cpu")
+    return models
+
+
+def setup_rag(tmp: Path, llm_delay: float, search_delay: float) -> None:
+    """Points rag at a temporary Chroma, fake embeddings/LLM and a stub search provider."""
+    import rag
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.language_models import FakeListLLM
+    from search import NewsRetriever, StubSearchProvider
+
+    class SlowFakeLLM(FakeListLLM):
+        def _call(self, *args, **kwargs):
+            time.sleep(llm_delay)
+            return super()._call(*args, **kwargs)
+
+    articles = [
+        {"title": f"Article {i}", "body": "Repo rate decision " * 10, "href": f"https://example.com/news/{i}"}
+        for i in range(10)
+    ]
+    rag.retriever = NewsRetriever(StubSearchProvider(articles, delay=search_delay))
+    rag.init_mcp_resources(
+        llm_override=SlowFakeLLM(responses=["VERDICT: REAL\nREASON: Reported by example.com."]),
+        embeddings_override=DeterministicFakeEmbedding(size=768),
+        persist_dir=str(tmp / "chroma"),
+    )
+    rag.verdict_cache = None      # measure the full path, not cache hits
+
+
+# --------------------------------------------------------------------------- #
+#  Measurement
+# --------------------------------------------------------------------------- #
+def stage_snapshot() -> Dict[str, tuple[int, float]]:
+    with metrics.STAGE_SECONDS._lock:
+        return {key[0]: (sum(counts), total[0]) for key, (counts, total) in metrics.STAGE_SECONDS._values.items()}
+
+
+def measure(
+    fn: Callable[[int], object],
+    *,
+    repeat: int,
+    warmup: int,
+    concurrency: List[int],
+    items: int,
+) -> dict:
+    rss_before = rss_mb()
+    per_case_peak = reset_peak_rss()
+    for i in range(warmup):
+        fn(i)
+
+    before = stage_snapshot()
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        times.append((time.perf_counter() - start) * 1000.0)
+    after = stage_snapshot()
+
+    stages = {}
+    for name, (count, total) in after.items():
+        c0, t0 = before.get(name, (0, 0.0))
+        if count > c0:
+            # mean time the stage adds to one call
+            stages[name] = round((total - t0) * 1000.0 / repeat, 3)
+
+    throughput = {}
+    for n in concurrency:
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            start = time.perf_counter()
+            list(pool.map(fn, range(items)))
+            throughput[str(n)] = round(items / (time.perf_counter() - start), 3)
+
+    arr = np.array(times)
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+        "throughput": throughput,
+        "stages": dict(sorted(stages.items())),
+        # peak of this case alone where the kernel lets us reset the mark, else the RSS after it
+        "rss_mb": round(peak_rss_mb() if per_case_peak else rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def reset_peak_rss() -> bool:
+    """Resets the process's peak-RSS mark (Linux >= 4.0), so `peak_rss_mb` covers what follows."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS since the last `reset_peak_rss` (Linux) or since the process started."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def build_cases(args, tmp: Path) -> Dict[str, Callable[[int], object]]:
+    from pytorch import decode_image, extract_face, guess_image, guess_video
+
+    cases: Dict[str, Callable[[int], object]] = {}
+    needs_models = {"image", "video"} & set(args.only)
+    if needs_models:
+        models = load_models(args.random_weights)
+        if args.fake_detector:
+            detector = FixedBoxDetector()
+        else:
+            from ultralytics import YOLO
+            detector = YOLO(FACE_WEIGHTS)
+
+    if "image" in args.only:
+        for w, h in IMAGE_SIZES:
+            # a few distinct payloads so nothing downstream can memoise
+            images = [synthetic_image((w, h), seed) for seed in range(4)]
+            frames = [decode_image(img) for img in images]
+            cases[f"extract_face/{w}x{h}"] = (
+                lambda i, frames=frames: extract_face(frames[i % len(frames)], face_detector=detector)
+            )
+            cases[f"guess_image/{w}x{h}"] = (
+                lambda i, images=images: guess_image(
+                    model=models["image"], image_path=images[i % len(images)],
+                    device="cpu", face_detector=detector,
+                )
+            )
+
+    if "video" in args.only:
+        for codec, n_frames, (w, h) in VIDEO_SPECS:
+            path = tmp / f"{codec}-{n_frames}-{w}x{h}.{'avi' if codec == 'MJPG' else 'mp4'}"
+            if not make_clip(path, codec, n_frames, (w, h)):
+                print(f"skipping {path.name}: codec unavailable", file=sys.stderr)
+                continue
+            cases[f"guess_video/{codec}/{n_frames}f/{w}x{h}"] = (
+                lambda i, path=path: guess_video(
+                    model=models["video"], video_path=path, device="cpu", face_detector=detector,
+                )
+            )
+
+    if "news" in args.only:
+        import rag
+
+        setup_rag(tmp, args.llm_delay, args.search_delay)
+        # a distinct leading keyword per call keeps the search cache cold
+        cases["rag_classify"] = lambda i: rag.rag_classify(f"Bulletin{i}: {CLAIM}")
+
+    return cases
+
+
+# --------------------------------------------------------------------------- #
+#  Baseline comparison
+# --------------------------------------------------------------------------- #
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Lines describing every gated metric that got worse by more than `threshold`."""
+    regressions = []
+    for case, res in current["cases"].items():
+        base = baseline.get("cases", {}).get(case)
+        if base is None:
+            continue
+        for metric, higher_is_better in GATED.items():
+            now, then = res[metric], base.get(metric)
+            if then is None:
+                continue
+            pairs = (
+                [(f"{metric}@{k}", v, then[k]) for k, v in now.items() if k in then]
+                if isinstance(now, dict) else [(metric, now, then)]
+            )
+            for name, a, b in pairs:
+                if not b:
+                    continue
+                change = (a - b) / b
+                worse = -change if higher_is_better else change
+                if worse > threshold:
+                    regressions.append(f"{case}: {name} {b} -> {a} ({change:+.1%})")
+    return regressions
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "opencv": cv2.__version__,
+        "cpu": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=["image", "video", "news"], default=["image", "video", "news"])
+    parser.add_argument("--random-weights", action="store_true", help="skip the classifier checkpoints")
+    parser.add_argument("--fake-detector", action="store_true", help="fixed centred face box instead of YOLO")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--items", type=int, default=16, help="calls per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY)
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--search-delay", type=float, default=0.02, help="seconds per stub search call")
+    parser.add_argument("--quick", action="store_true", help="3 repeats, 4 items, concurrency 1 and 2")
+    parser.add_argument("--out", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.warmup, args.items, args.concurrency = 3, 1, 4, [1, 2]
+
+    results = {"environment": environment(), "config": vars(args), "cases": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = build_cases(args, Path(tmp))
+        print(f"{'case':<36} {'p50 ms':>9} {'p95 ms':>9} {'best/s':>8} {'rss MB':>8}")
+        for name, fn in cases.items():
+            res = measure(fn, repeat=args.repeat, warmup=args.warmup, concurrency=args.concurrency, items=args.items)
+            results["cases"][name] = res
+            print(f"{name:<36} {res['p50_ms']:>9.1f} {res['p95_ms']:>9.1f} "
+                  f"{max(res['throughput'].values()):>8.2f} {res['rss_mb']:>8.0f}")
+    # per-case marks are reset, so the run's peak is the largest of them
+    results["peak_rss_mb"] = max([peak_rss_mb(), *(r["rss_mb"] for r in results["cases"].values())])
+
+    Path(args.out).write_text(json.dumps(results, indent=2))
+    print(f"wrote {args.out}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
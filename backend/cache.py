@@ -0,0 +1,158 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import xxhash
+from sqlalchemy import Engine
+from sqlmodel import Session, delete
+
+from structures import PredictionCache
+
+# === CONFIG ===
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+RESULT_CACHE_PERSIST = os.getenv("RESULT_CACHE_PERSIST", "1") == "1"
+
+
+def content_hash(data: bytes) -> str:
+    """Content address of an upload."""
+    return xxhash.xxh3_128_hexdigest(data)
+
+
+def weights_identity(*paths: str | Path) -> str:
+    """
+    Cheap identity of a set of weight files, built from path, size and
+    mtime. Taken when the weights are loaded (see `ModelRegistry.identity`),
+    so a restart with a replaced checkpoint changes the key and old
+    entries simply stop matching.
+    """
+    h = xxhash.xxh3_64()
+    for p in paths:
+        try:
+            st = os.stat(p)
+            h.update(f"{p}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except OSError:
+            h.update(f"{p}:missing;".encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier prediction cache keyed by (kind, weights identity, content hash).
+
+    - in-process LRU bounded by `max_entries`, entries expire after `ttl` s
+    - optional persistent tier in the audit SQLite database
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = RESULT_CACHE_SIZE,
+        ttl: float = RESULT_CACHE_TTL,
+        engine: Optional[Engine] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.engine = engine if RESULT_CACHE_PERSIST else None
+
+        self._lru: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._models: dict[str, str] = {}
+        self._counters = {"hits": 0, "persistent_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def _key(kind: str, model_id: str, digest: str) -> str:
+        return f"{kind}:{model_id}:{digest}"
+
+    def get(self, kind: str, model_id: str, digest: str) -> Optional[dict]:
+        self._check_model(kind, model_id)
+        key = self._key(kind, model_id, digest)
+        now = time.time()
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                created, result = entry
+                if now - created <= self.ttl:
+                    self._lru.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return dict(result)
+                del self._lru[key]
+                self._counters["expired"] += 1
+
+        if self.engine is not None:
+            with Session(self.engine) as session:
+                row = session.get(PredictionCache, key)
+                if row is not None and now - row.created_at <= self.ttl:
+                    result = json.loads(row.result)
+                    self._remember(key, row.created_at, result)
+                    with self._lock:
+                        self._counters["persistent_hits"] += 1
+                    return dict(result)
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, kind: str, model_id: str, digest: str, result: dict) -> None:
+        key = self._key(kind, model_id, digest)
+        now = time.time()
+        self._remember(key, now, dict(result))
+
+        if self.engine is not None:
+            with Session(self.engine) as session:
+                session.merge(PredictionCache(
+                    key=key,
+                    kind=kind,
+                    model_id=model_id,
+                    result=json.dumps(result),
+                    created_at=now,
+                ))
+                session.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["persistent_hits"] + self._counters["misses"]
+            hits = self._counters["hits"] + self._counters["persistent_hits"]
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._lru),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "persistent": self.engine is not None,
+            }
+
+    def _remember(self, key: str, created: float, result: dict) -> None:
+        with self._lock:
+            self._lru[key] = (created, result)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _check_model(self, kind: str, model_id: str) -> None:
+        """Drop every entry of `kind` made by other weights once they change."""
+        with self._lock:
+            previous = self._models.get(kind)
+            self._models[kind] = model_id
+            if previous == model_id:
+                return
+            prefix = f"{kind}:"
+            stale = [k for k in self._lru if k.startswith(prefix) and not k.startswith(f"{prefix}{model_id}:")]
+            for k in stale:
+                del self._lru[k]
+            self._counters["evictions"] += len(stale)
+
+        if self.engine is not None:
+            with Session(self.engine) as session:
+                session.exec(delete(PredictionCache).where(
+                    PredictionCache.kind == kind,
+                    PredictionCache.model_id != model_id,
+                ))
+                session.commit()
@@ -0,0 +1,362 @@
+from __future__ import annotations
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+# === CONFIG ===
+# comma separated; requests go to the least loaded healthy endpoint
+OLLAMA_URLS = [u.strip().rstrip("/") for u in os.getenv("OLLAMA_URLS", "http://localhost:11434").split(",") if u.strip()]
+CLIENT_CONNECT_TIMEOUT = float(os.getenv("CLIENT_CONNECT_TIMEOUT", "2"))
+# per read; a streamed generation may take longer in total
+CLIENT_READ_TIMEOUT = float(os.getenv("CLIENT_READ_TIMEOUT", "60"))
+CLIENT_RETRIES = int(os.getenv("CLIENT_RETRIES", "2"))
+CLIENT_BACKOFF = float(os.getenv("CLIENT_BACKOFF", "0.2"))
+CLIENT_POOL_SIZE = int(os.getenv("CLIENT_POOL_SIZE", "16"))
+# consecutive failures that open a backend's breaker, and seconds until it is retried
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "30"))
+# how long Ollama keeps a model loaded after the last request
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+RETRY_STATUS = {429, 502, 503, 504}
+# raised on our side (e.g. no free connection in the local pool): retried,
+# but say nothing about the endpoint's health
+LOCAL_ERRORS = (httpx.PoolTimeout, httpx.UnsupportedProtocol, httpx.LocalProtocolError)
+
+
+class BackendUnavailable(RuntimeError):
+    """No endpoint could serve the request (all breakers open or retries used up)."""
+
+
+class CircuitBreaker:
+    """
+    Closed until `failures` consecutive errors, then open (fail fast) for
+    `reset` seconds, then half-open: one trial call closes it again or
+    re-opens it.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self._lock = threading.Lock()
+        self._errors = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self._opened_at >= self.reset else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self._errors = 0
+            self._opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """Ends a half-open trial that proved nothing either way (cancelled, bad reply)."""
+        with self._lock:
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._errors += 1
+            if self._trial or self._errors >= self.failures:
+                if self._opened_at is None or self._trial:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+def backoff(attempt: int, base: float = CLIENT_BACKOFF) -> float:
+    """Exponential delay with full jitter, so retrying clients do not move in lockstep."""
+    return random.uniform(0, base * 2 ** attempt)
+
+
+class Endpoint:
+    def __init__(self, url: str, breaker: CircuitBreaker):
+        self.url = url
+        self.breaker = breaker
+        self.in_flight = 0
+        self.latency = 0.0          # EWMA, seconds
+        self.requests = 0
+        self.errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000.0, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "breaker_opened": self.breaker.opened,
+        }
+
+
+class OllamaPool:
+    """
+    Keep-alive HTTP client for one or more Ollama servers. Each call goes
+    to the healthy endpoint with the fewest requests in flight (then the
+    lowest recent latency); connection errors, timeouts and 5xx replies
+    are retried with jittered backoff on the next best endpoint, and feed
+    that endpoint's circuit breaker.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str] = OLLAMA_URLS,
+        *,
+        connect_timeout: float = CLIENT_CONNECT_TIMEOUT,
+        read_timeout: float = CLIENT_READ_TIMEOUT,
+        retries: int = CLIENT_RETRIES,
+        pool_size: int = CLIENT_POOL_SIZE,
+        breaker_failures: int = BREAKER_FAILURES,
+        breaker_reset: float = BREAKER_RESET,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+    ):
+        if not urls:
+            raise ValueError("At least one Ollama URL is required")
+        self.endpoints = [Endpoint(u, CircuitBreaker(breaker_failures, breaker_reset)) for u in urls]
+        self.retries = retries
+        self.keep_alive = keep_alive
+        self._lock = threading.Lock()
+        self.client = httpx.Client(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    def close(self) -> None:
+        self.client.close()
+
+    # ---- routing ---- #
+    def _pick(self, exclude: Sequence[Endpoint] = ()) -> Optional[Endpoint]:
+        with self._lock:
+            candidates = sorted(
+                (e for e in self.endpoints if e not in exclude),
+                key=lambda e: (e.in_flight, e.latency),
+            )
+        for endpoint in candidates:
+            if endpoint.breaker.allow():
+                return endpoint
+        return None
+
+    @contextmanager
+    def _track(self, endpoint: Endpoint) -> Iterator[None]:
+        with self._lock:
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            if _is_retryable(exc) and not isinstance(exc, LOCAL_ERRORS):
+                with self._lock:
+                    endpoint.errors += 1
+                endpoint.breaker.failure()
+            elif isinstance(exc, httpx.HTTPStatusError):
+                endpoint.breaker.success()      # a 4xx: the endpoint answered, the request was bad
+            else:
+                endpoint.breaker.release()
+            raise
+        except BaseException:
+            # cancelled, e.g. a stream closed when the client disconnects;
+            # must not leave a half-open trial claimed forever
+            endpoint.breaker.release()
+            raise
+        else:
+            endpoint.breaker.success()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                endpoint.latency = elapsed if endpoint.latency == 0 else 0.8 * endpoint.latency + 0.2 * elapsed
+        finally:
+            with self._lock:
+                endpoint.in_flight -= 1
+
+    def _attempts(self) -> Iterator[Endpoint]:
+        """Endpoints to try in turn, with a jittered pause before each retry."""
+        tried: List[Endpoint] = []
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(backoff(attempt - 1))
+            endpoint = self._pick(exclude=tried) or self._pick()
+            if endpoint is None:
+                raise BackendUnavailable("All Ollama endpoints are unavailable (circuit open)")
+            tried.append(endpoint)
+            yield endpoint
+
+    def post(self, path: str, payload: dict, read_timeout: Optional[float] = None) -> dict:
+        """`read_timeout` overrides the client's per-attempt read timeout for this call."""
+        last: Optional[Exception] = None
+        timeout = self.client.timeout if read_timeout is None else httpx.Timeout(
+            read_timeout, connect=self.client.timeout.connect,
+        )
+        for endpoint in self._attempts():
+            try:
+                with self._track(endpoint):
+                    resp = self.client.post(endpoint.url + path, json=payload, timeout=timeout)
+                    _raise_retryable(resp)
+            except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                last = exc
+                continue
+            # other 4xx: the server is fine, the request is not; no retry
+            return _checked(resp).json()
+        raise BackendUnavailable(f"Ollama request {path} failed after {self.retries + 1} attempts: {last}")
+
+    def stream(self, path: str, payload: dict) -> Iterator[dict]:
+        """NDJSON stream; retried only until the first line arrives."""
+        last: Optional[Exception] = None
+        for endpoint in self._attempts():
+            started = False
+            try:
+                with self._track(endpoint):
+                    with self.client.stream("POST", endpoint.url + path, json=payload) as resp:
+                        _raise_retryable(resp)
+                        _checked(resp)
+                        for line in resp.iter_lines():
+                            if line:
+                                started = True
+                                yield json.loads(line)
+                return
+            except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                if started or not _is_retryable(exc):
+                    raise
+                last = exc
+        raise BackendUnavailable(f"Ollama stream {path} failed after {self.retries + 1} attempts: {last}")
+
+    # ---- Ollama API ---- #
+    def embed(self, model: str, texts: List[str], read_timeout: Optional[float] = None) -> List[List[float]]:
+        return self.post(
+            "/api/embed", {"model": model, "input": texts, "keep_alive": self.keep_alive}, read_timeout,
+        )["embeddings"]
+
+    def generate(self, model: str, prompt: str, options: Optional[dict] = None) -> str:
+        return self.post("/api/generate", {
+            "model": model, "prompt": prompt, "stream": False,
+            "options": options or {}, "keep_alive": self.keep_alive,
+        })["response"]
+
+    def generate_stream(self, model: str, prompt: str, options: Optional[dict] = None) -> Iterator[str]:
+        for part in self.stream("/api/generate", {
+            "model": model, "prompt": prompt, "stream": True,
+            "options": options or {}, "keep_alive": self.keep_alive,
+        }):
+            if part.get("response"):
+                yield part["response"]
+
+    def warm_up(self, llm_model: Optional[str] = None, embed_model: Optional[str] = None) -> Dict[str, str]:
+        """
+        Loads the models on every endpoint (an empty generate / embed loads
+        a model without running it), in parallel. Returns per-endpoint status.
+        """
+
+        def warm(endpoint: Endpoint) -> str:
+            try:
+                if llm_model:
+                    _checked(self.client.post(endpoint.url + "/api/generate", json={
+                        "model": llm_model, "prompt": "", "keep_alive": self.keep_alive,
+                    }))
+                if embed_model:
+                    _checked(self.client.post(endpoint.url + "/api/embed", json={
+                        "model": embed_model, "input": "", "keep_alive": self.keep_alive,
+                    }))
+                return "ok"
+            except Exception as exc:
+                endpoint.breaker.failure()
+                return f"failed: {str(exc)[:100]}"
+
+        with ThreadPoolExecutor(max_workers=len(self.endpoints)) as pool:
+            return dict(zip((e.url for e in self.endpoints), pool.map(warm, self.endpoints)))
+
+    def stats(self) -> dict:
+        return {e.url: e.stats() for e in self.endpoints}
+
+
+def _checked(resp: httpx.Response) -> httpx.Response:
+    if resp.status_code >= 400:
+        resp.read()
+        raise httpx.HTTPStatusError(
+            f"{resp.status_code} from {resp.request.url}: {resp.text[:200]}", request=resp.request, response=resp,
+        )
+    return resp
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _raise_retryable(resp: httpx.Response) -> None:
+    """Overload / server errors count against the endpoint and are retried elsewhere."""
+    if resp.status_code in RETRY_STATUS or resp.status_code >= 500:
+        _checked(resp)
+
+
+# --------------------------------------------------------------------------- #
+#  LangChain adapters
+# --------------------------------------------------------------------------- #
+class PooledOllamaEmbeddings(Embeddings):
+    """
+    `OllamaEmbeddings` replacement that goes through an `OllamaPool`.
+    `query_timeout` bounds each attempt of `embed_query` (a single claim on
+    the request path) more tightly than bulk `embed_documents`.
+    """
+
+    def __init__(self, pool: OllamaPool, model: str, query_timeout: Optional[float] = None):
+        self.pool = pool
+        self.model = model
+        self.query_timeout = query_timeout
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.pool.embed(self.model, list(texts)) if texts else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.pool.embed(self.model, [text], self.query_timeout)[0]
+
+
+class PooledOllamaLLM(LLM):
+    """`OllamaLLM` replacement that goes through an `OllamaPool`; supports streaming."""
+
+    pool: Any
+    model: str
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-pooled"
+
+    def _options(self, stop: Optional[List[str]]) -> dict:
+        return {"temperature": self.temperature, **({"stop": stop} if stop else {})}
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        return self.pool.generate(self.model, prompt, self._options(stop))
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> Iterator[GenerationChunk]:
+        for text in self.pool.generate_stream(self.model, prompt, self._options(stop)):
+            chunk = GenerationChunk(text=text)
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
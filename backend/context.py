@@ -0,0 +1,155 @@
+from __future__ import annotations
+import os
+import re
+from typing import Dict, List, Sequence, Tuple
+
+from lexical import LexicalIndex, tokenize
+
+# === CONFIG ===
+# prompt tokens left for web snippets + trusted facts after the fixed prompt text
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "400"))
+# longest single web snippet, in tokens
+SNIPPET_MAX_TOKENS = int(os.getenv("SNIPPET_MAX_TOKENS", "60"))
+# word-shingle Jaccard similarity above which two snippets count as duplicates
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.6"))
+
+# Static instruction prefix. It has no template variables, so it is
+# byte-identical on every call and the LLM server can reuse its KV cache;
+# everything request-specific comes after it.
+PROMPT_PREFIX = """You are a news fact-checker. Analyze the claim against the retrieved web articles and trusted facts below.
+
+Rules:
+1. If web articles from credible sources confirm the claim with specific details, return REAL
+2. If web articles contradict the claim, if the claim is absurd/impossible, or if no credible sources found for a significant claim, return FAKE
+3. If there is insufficient information to verify, return UNVERIFIED
+4. Be especially skeptical of sensational claims about celebrities, disasters, or unlikely events
+5. Consider the plausibility of the claim itself
+
+Respond ONLY in this format:
+VERDICT: [REAL/FAKE/UNVERIFIED]
+REASON: [One sentence explanation with source if available]
+"""
+
+PROMPT_BODY = """
+WEB ARTICLES:
+{web_context}
+
+TRUSTED FACTS:
+{static_context}
+
+CLAIM TO VERIFY:
+{claim}
+"""
+
+NO_ARTICLES = "No recent web articles found."
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokenizer-free estimate of the LLM's token count: one per punctuation
+    mark and per started 6 characters of each word. Close enough to budget
+    context and compare requests without loading the model's tokenizer.
+    """
+    return sum(max(1, (len(p) + 5) // 6) for p in _PIECES.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cuts `text` on a word boundary to about `max_tokens` tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words, used, out = text.split(), 0, []
+    for word in words:
+        cost = count_tokens(word)
+        if used + cost > max_tokens:
+            break
+        out.append(word)
+        used += cost
+    return " ".join(out).rstrip(",;:") + "…"
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = tokenize(text)
+    if len(words) < n:
+        return {tuple(words)}
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def dedupe(texts: Sequence[str], threshold: float = DEDUP_SIMILARITY) -> List[int]:
+    """Indices of `texts` to keep: the first of every group of near-duplicates."""
+    kept: List[Tuple[int, set]] = []
+    for i, text in enumerate(texts):
+        sh = _shingles(text)
+        if any(len(sh & other) / max(len(sh | other), 1) >= threshold for _, other in kept):
+            continue
+        kept.append((i, sh))
+    return [i for i, _ in kept]
+
+
+def rank(claim: str, texts: Sequence[str]) -> List[int]:
+    """Indices of `texts`, most relevant to the claim (BM25) first; ties keep input order."""
+    index = LexicalIndex()
+    index.add([str(i) for i in range(len(texts))], list(texts))
+    scores = {int(doc_id): score for doc_id, score in index.search(claim, len(texts))}
+    return sorted(range(len(texts)), key=lambda i: (-scores.get(i, 0.0), i))
+
+
+def assemble(
+    claim: str,
+    articles: Sequence[Dict],
+    facts: Sequence[str],
+    *,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    snippet_tokens: int = SNIPPET_MAX_TOKENS,
+) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Prompt variables for `PROMPT_BODY`. Trusted facts are packed first,
+    then web snippets: near-duplicates across sources are dropped, the
+    rest ranked by relevance to the claim, capped at `snippet_tokens` each
+    and added while they fit in `budget`. Returns the variables and
+    counters (articles in / deduped / used, context tokens).
+    """
+    used = 0
+    fact_lines = []
+    for fact in facts:
+        cost = count_tokens(fact)
+        if used + cost > budget:
+            break
+        fact_lines.append(fact)
+        used += cost
+
+    lines = [
+        f"[{a.get('source', 'unknown')}] {a.get('title', '')}: {a.get('snippet', '')}".strip()
+        for a in articles
+    ]
+    unique = dedupe([f"{a.get('title', '')} {a.get('snippet', '')}" for a in articles])
+    order = [unique[i] for i in rank(claim, [lines[i] for i in unique])]
+
+    web_lines = []
+    for i in order:
+        line = truncate_tokens(lines[i], snippet_tokens)
+        cost = count_tokens(line)
+        if used + cost > budget:
+            continue
+        web_lines.append(line)
+        used += cost
+
+    variables = {
+        "web_context": "\n".join(web_lines) or NO_ARTICLES,
+        "static_context": "\n".join(fact_lines),
+        "claim": claim,
+    }
+    return variables, {
+        "articles": len(articles),
+        "duplicates": len(articles) - len(unique),
+        "articles_used": len(web_lines),
+        "context_tokens": used,
+    }
+
+
+PREFIX_TOKENS = count_tokens(PROMPT_PREFIX)
+
+
+def prompt_tokens(variables: Dict[str, str]) -> int:
+    return PREFIX_TOKENS + count_tokens(PROMPT_BODY.format(**variables))
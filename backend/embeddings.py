@@ -0,0 +1,154 @@
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+import xxhash
+
+from metrics import observe_batch
+
+# === CONFIG ===
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "8192"))
+# opt-in: faces of ONE clip within this Hamming distance of 64-bit pHashes
+# share a backbone pass. Never used across uploads: pHash ignores the blending
+# artifacts the detector looks for. 0 shares exact duplicates only
+EMBED_HASH_DISTANCE = int(os.getenv("EMBED_HASH_DISTANCE", "0"))
+
+
+def content_hash(face: np.ndarray) -> int:
+    """Exact hash of a pre-processed face: equal only for identical pixels."""
+    return xxhash.xxh3_128_intdigest(np.ascontiguousarray(face).tobytes())
+
+
+def phash(face: np.ndarray) -> np.uint64:
+    """
+    64-bit DCT perceptual hash of a pre-processed (H, W, C) face in [-1, 1].
+    """
+    gray = cv2.cvtColor(((face + 1.0) * 127.5).astype(np.float32), cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])          # skip the DC term
+    return np.packbits(bits).view(">u8")[0].astype(np.uint64)
+
+
+def hamming(a: np.ndarray, b: np.ndarray | np.uint64) -> np.ndarray:
+    return np.bitwise_count(np.bitwise_xor(a, b))
+
+
+class EmbeddingCache:
+    """
+    LRU cache of per-face backbone embeddings keyed by exact content hash,
+    shared across uploads. `max_distance` only applies within one clip
+    (see `embed_faces`).
+    """
+
+    def __init__(
+        self,
+        capacity: int = EMBED_CACHE_SIZE,
+        max_distance: int = EMBED_HASH_DISTANCE,
+    ):
+        self.capacity = capacity
+        self.max_distance = max_distance
+
+        self._entries: OrderedDict[int, torch.Tensor] = OrderedDict()
+        self._model_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.skipped = 0
+
+    def bind(self, model_id: str) -> None:
+        """Embeddings belong to one set of backbone weights; reset on change."""
+        with self._lock:
+            if model_id != self._model_id:
+                self._entries.clear()
+                self._model_id = model_id
+
+    def lookup(self, key: int) -> Optional[torch.Tensor]:
+        with self._lock:
+            emb = self._entries.get(key)
+            if emb is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return emb.clone()
+
+    def insert(self, key: int, emb: torch.Tensor) -> None:
+        with self._lock:
+            self._entries[key] = emb.detach().float().cpu()
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "backbone_skipped": self.skipped,
+        }
+
+
+def embed_faces(
+    faces: np.ndarray,
+    model: torch.nn.Module,
+    device: torch.device | str,
+    cache: EmbeddingCache,
+) -> Tuple[torch.Tensor, int]:
+    """
+    Backbone features for (T, H, W, C) faces, reusing cached embeddings for
+    faces seen before (exact pixels) and running the backbone once per
+    group of identical faces within the clip, or of near-identical ones
+    with `cache.max_distance` > 0. Returns ((T, dim) features, number of
+    backbone evaluations skipped).
+    """
+    n = len(faces)
+    keys = [content_hash(f) for f in faces]
+    feats: list[Optional[torch.Tensor]] = [cache.lookup(k) for k in keys]
+
+    # group the misses: each one reuses an earlier representative of this clip
+    missing = [i for i in range(n) if feats[i] is None]
+    reps: list[int] = []
+    owner: dict[int, int] = {}
+    by_key: dict[int, int] = {}
+    hashes = np.array([phash(f) for f in faces], dtype=np.uint64) if cache.max_distance > 0 else None
+    for i in missing:
+        if keys[i] in by_key:
+            owner[i] = by_key[keys[i]]
+            continue
+        if hashes is not None and reps:
+            dist = hamming(hashes[reps], hashes[i])
+            j = int(dist.argmin())
+            if dist[j] <= cache.max_distance:
+                owner[i] = reps[j]
+                continue
+        reps.append(i)
+        owner[i] = by_key[keys[i]] = i
+
+    if reps:
+        observe_batch("video-backbone", len(reps))
+        batch = torch.from_numpy(np.ascontiguousarray(faces[reps])).permute(0, 3, 1, 2).float().to(device)
+        with torch.no_grad():
+            computed = model.extract_features(batch).cpu()
+        by_rep = dict(zip(reps, computed))
+        for i, rep in zip(reps, computed):
+            cache.insert(keys[i], rep)
+        for i in missing:
+            feats[i] = by_rep[owner[i]]
+
+    skipped = n - len(reps)
+    cache.skipped += skipped
+    return torch.stack(feats).to(device), skipped
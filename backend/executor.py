@@ -0,0 +1,172 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+import numpy as np
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+# === CONFIG ===
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", str(min(4, os.cpu_count() or 1))))
+# 0 keeps OpenCV decoding on the inference threads
+DECODE_PROCESSES = int(os.getenv("DECODE_PROCESSES", "0"))
+# SQLite lookups (result cache) kept apart from the inference threads
+IO_THREADS = int(os.getenv("IO_THREADS", "4"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "2"))
+ADMISSION_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT", "30"))
+
+# endpoint -> (max running, max waiting)
+ENDPOINT_LIMITS = {
+    "image": (int(os.getenv("LIMIT_IMAGE", "32")), int(os.getenv("QUEUE_IMAGE", "128"))),
+    "video": (int(os.getenv("LIMIT_VIDEO", "2")), int(os.getenv("QUEUE_VIDEO", "8"))),
+    "news": (int(os.getenv("LIMIT_NEWS", "4")), int(os.getenv("QUEUE_NEWS", "16"))),
+}
+
+
+class Admission:
+    """
+    Per-endpoint concurrency limit with a bounded waiting room.
+
+    - `max_running` requests execute at once
+    - up to `max_waiting` more wait for a slot; beyond that -> 429
+    - a waiter that cannot get a slot within `timeout` s -> 503
+    Both carry Retry-After so clients back off instead of piling up.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_running: int,
+        max_waiting: int,
+        *,
+        timeout: float = ADMISSION_TIMEOUT,
+        retry_after: int = RETRY_AFTER_SECONDS,
+    ):
+        self.name = name
+        self.max_running = max_running
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self._sem = asyncio.Semaphore(max_running)
+        self._running = 0
+        self._waiting = 0
+        self._rejected = {429: 0, 503: 0}
+        self._latencies: deque[float] = deque(maxlen=4096)
+
+    def _reject(self, status: int, detail: str) -> HTTPException:
+        self._rejected[status] += 1
+        return HTTPException(
+            status_code=status,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._running + self._waiting >= self.max_running + self.max_waiting:
+            raise self._reject(429, f"Too many pending {self.name} requests")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._reject(503, f"{self.name} workers saturated") from None
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+            self._running -= 1
+            self._sem.release()
+
+    def stats(self) -> dict:
+        lat = np.fromiter(self._latencies, dtype=np.float64)
+        p50, p99 = (np.percentile(lat, [50, 99]) * 1000.0).tolist() if lat.size else (0.0, 0.0)
+        return {
+            "running": self._running,
+            "waiting": self._waiting,
+            "max_running": self.max_running,
+            "max_waiting": self.max_waiting,
+            "rejected_429": self._rejected[429],
+            "rejected_503": self._rejected[503],
+            "completed": len(self._latencies),
+            "p50_ms": round(p50, 2),
+            "p99_ms": round(p99, 2),
+        }
+
+
+class ExecutionLayer:
+    """
+    Keeps blocking work off the event loop.
+
+    - `run`: thread pool for torch inference, which releases the GIL in its
+      kernels; YOLO is not thread-safe, so detector calls are serialised
+      (see `pytorch.SerializedDetector`)
+    - `run_decode`: process pool for OpenCV decoding when DECODE_PROCESSES > 0,
+      otherwise the same thread pool
+    - `run_io`: small thread pool for SQLite reads/writes, so they neither
+      block the loop nor queue behind inference
+    """
+
+    def __init__(
+        self,
+        threads: int = INFERENCE_THREADS,
+        processes: int = DECODE_PROCESSES,
+        limits: dict[str, tuple[int, int]] = ENDPOINT_LIMITS,
+    ):
+        self.n_threads = threads
+        self.n_processes = processes
+        self.threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="inference")
+        self.io = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="io")
+        # spawn, not fork: forking a process that already runs torch/OpenMP
+        # threads can deadlock the child
+        self.processes: Optional[Executor] = (
+            ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            if processes > 0 else None
+        )
+        self.admission = {
+            name: Admission(name, running, waiting)
+            for name, (running, waiting) in limits.items()
+        }
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.threads, partial(fn, *args, **kwargs))
+
+    async def run_decode(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        pool = self.processes or self.threads
+        return await loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+
+    async def run_io(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io, partial(fn, *args, **kwargs))
+
+    def slot(self, endpoint: str):
+        return self.admission[endpoint].slot()
+
+    def shutdown(self) -> None:
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        self.io.shutdown(wait=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "threads": self.n_threads,
+            "decode_processes": self.n_processes,
+            "endpoints": {name: adm.stats() for name, adm in self.admission.items()},
+        }
@@ -0,0 +1,247 @@
+from __future__ import annotations
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import xxhash
+
+# === CONFIG ===
+FACTS_COLLECTION = os.getenv("FACTS_COLLECTION", "trusted_facts")
+# documents per `embed_documents` call (one Ollama request)
+FACTS_BATCH_SIZE = int(os.getenv("FACTS_BATCH_SIZE", "64"))
+# embedding requests in flight at once
+FACTS_CONCURRENCY = int(os.getenv("FACTS_CONCURRENCY", "4"))
+
+# record keys that are not copied into the Chroma metadata
+RESERVED = {"id", "text", "fact", "delete"}
+
+
+def fact_id(text: str, dataset: str = "") -> str:
+    """
+    Stable id from the whitespace-normalised text, so re-ingesting a fact
+    is a no-op. Scoped by `dataset`: the same text in two datasets is two
+    facts, so neither dataset's sync or deletes touch the other's copy.
+    """
+    key = " ".join(text.split())
+    return "fact_" + xxhash.xxh3_128_hexdigest(f"{dataset}\x00{key}".encode() if dataset else key.encode())
+
+
+def read_facts(path: str | Path) -> Iterator[dict]:
+    """
+    Streams fact records from JSONL (one object per line) or CSV (header
+    row). The text is read from `text` (or `fact`); a truthy `delete`
+    marks the fact for removal; other scalar fields become metadata.
+    """
+    path = Path(path)
+    with path.open(newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            rows: Iterable[dict] = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            text = (row.get("text") or row.get("fact") or "").strip()
+            if not text:
+                continue
+            delete = str(row.get("delete", "")).strip().lower() in {"1", "true", "yes"}
+            meta = {
+                k: v for k, v in row.items()
+                if k not in RESERVED and isinstance(v, (str, int, float, bool)) and v != ""
+            }
+            yield {"id": fact_id(text), "text": text, "delete": delete, "metadata": meta}
+
+
+def _chunks(items: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    chunk: List[dict] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest_facts(
+    collection,
+    embeddings,
+    records: Iterable[dict],
+    *,
+    dataset: str,
+    version: Optional[str] = None,
+    batch_size: int = FACTS_BATCH_SIZE,
+    concurrency: int = FACTS_CONCURRENCY,
+    sync: bool = False,
+    lexical=None,
+) -> Dict[str, float]:
+    """
+    Incrementally loads fact records (see `read_facts`) into `collection`.
+
+    Ids are hashes of `dataset` and content (see `fact_id`): facts already
+    stored only get their metadata refreshed (tagged with `version`) and
+    are never re-embedded. Records apply in input order; within a chunk
+    the last record for a fact wins. New facts are embedded `batch_size` at a time through
+    `embed_documents`, with at most `concurrency` batches in flight, and
+    upserted in input order. With `sync`, facts of `dataset` that were not
+    part of this `version` are deleted afterwards, so the collection
+    mirrors the input exactly. A `lexical.LexicalIndex` passed as
+    `lexical` gets the same upserts and deletes and is saved at the end.
+    Returns counters and docs/sec.
+    """
+    version = version or str(time.time_ns())
+    stats = {"read": 0, "embedded": 0, "unchanged": 0, "deleted": 0}
+    start = time.perf_counter()
+
+    def embed(batch: List[dict]):
+        return batch, embeddings.embed_documents([r["text"] for r in batch])
+
+    def upsert(batch: List[dict], vectors) -> None:
+        collection.upsert(
+            ids=[r["id"] for r in batch],
+            documents=[r["text"] for r in batch],
+            embeddings=vectors,
+            metadatas=[r["metadata"] for r in batch],
+        )
+        if lexical is not None:
+            lexical.add([r["id"] for r in batch], [r["text"] for r in batch])
+        stats["embedded"] += len(batch)
+
+    def remove(ids: List[str]) -> None:
+        collection.delete(ids=ids)
+        if lexical is not None:
+            lexical.remove(ids)
+        stats["deleted"] += len(ids)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="facts-embed") as pool:
+        pending = []
+        for chunk in _chunks(records, batch_size):
+            stats["read"] += len(chunk)
+            latest: Dict[str, dict] = {}
+            for r in chunk:
+                r["id"] = fact_id(r["text"], dataset)
+                r["metadata"] = {**r["metadata"], "dataset": dataset, "version": version}
+                latest[r["id"]] = r
+
+            removals = [fid for fid, r in latest.items() if r["delete"]]
+            if removals:
+                # earlier chunks' upserts land first, or they would re-add these
+                while pending:
+                    upsert(*pending.pop(0).result())
+                remove(removals)
+
+            # split off what is already stored
+            live = [r for r in latest.values() if not r["delete"]]
+            existing = set(collection.get(ids=[r["id"] for r in live], include=[])["ids"]) if live else set()
+            known = [r for r in live if r["id"] in existing]
+            if known:
+                collection.update(ids=[r["id"] for r in known], metadatas=[r["metadata"] for r in known])
+                stats["unchanged"] += len(known)
+
+            new = [r for r in live if r["id"] not in existing]
+            if new:
+                pending.append(pool.submit(embed, new))
+            # bounded: wait for the oldest batch before reading further ahead
+            while len(pending) >= concurrency:
+                upsert(*pending.pop(0).result())
+        for future in pending:
+            upsert(*future.result())
+
+    if sync:
+        stale = collection.get(
+            where={"$and": [{"dataset": dataset}, {"version": {"$ne": version}}]}, include=[],
+        )["ids"]
+        if stale:
+            remove(stale)
+    if lexical is not None:
+        lexical.save()
+
+    seconds = time.perf_counter() - start
+    return {
+        **stats,
+        "seconds": round(seconds, 3),
+        "docs_per_sec": round(stats["read"] / seconds, 1) if seconds else 0.0,
+        "version": version,
+    }
+
+
+def delete_facts(
+    collection,
+    *,
+    ids: Iterable[str] = (),
+    dataset: Optional[str] = None,
+    version: Optional[str] = None,
+    lexical=None,
+) -> int:
+    """Removes facts by id, or a whole `dataset` (optionally one `version` of it)."""
+    ids = list(ids)
+    if dataset is not None:
+        where = {"dataset": dataset} if version is None else {"$and": [{"dataset": dataset}, {"version": version}]}
+        ids += collection.get(where=where, include=[])["ids"]
+    if ids:
+        collection.delete(ids=ids)
+        if lexical is not None:
+            lexical.remove(ids)
+            lexical.save()
+    return len(ids)
+
+
+def versions(collection) -> Dict[str, Dict[str, int]]:
+    """Fact count per dataset and version."""
+    out: Dict[str, Dict[str, int]] = {}
+    for meta in collection.get(include=["metadatas"])["metadatas"]:
+        meta = meta or {}
+        per = out.setdefault(str(meta.get("dataset", "")), {})
+        key = str(meta.get("version", ""))
+        per[key] = per.get(key, 0) + 1
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load verified facts into the trusted-facts collection")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("ingest", help="upsert facts from a .jsonl or .csv file")
+    load.add_argument("path")
+    load.add_argument("--dataset", help="defaults to the file name")
+    load.add_argument("--version")
+    load.add_argument("--sync", action="store_true", help="delete facts of the dataset missing from the file")
+    load.add_argument("--batch-size", type=int, default=FACTS_BATCH_SIZE)
+    load.add_argument("--concurrency", type=int, default=FACTS_CONCURRENCY)
+    load.add_argument("--fake-embeddings", action="store_true", help="deterministic local embeddings instead of Ollama")
+    drop = sub.add_parser("delete", help="remove a dataset (or one version of it)")
+    drop.add_argument("dataset")
+    drop.add_argument("--version")
+    sub.add_parser("versions", help="fact counts per dataset and version")
+    for p in sub.choices.values():
+        p.add_argument("--persist-dir", default=os.getenv("CHROMA_PERSIST_DIR", "./database"))
+    args = parser.parse_args()
+
+    import chromadb
+
+    from lexical import LexicalIndex
+
+    client = chromadb.PersistentClient(path=args.persist_dir)
+    collection = client.get_or_create_collection(name=FACTS_COLLECTION, metadata={"hnsw:space": "cosine"})
+    lexical = LexicalIndex(Path(args.persist_dir) / "lexical")
+
+    if args.command == "ingest":
+        if args.fake_embeddings:
+            from langchain_core.embeddings import DeterministicFakeEmbedding
+            embeddings = DeterministicFakeEmbedding(size=768)
+        else:
+            from clients import OllamaPool, PooledOllamaEmbeddings
+            from rag import EMBEDDINGS
+            embeddings = PooledOllamaEmbeddings(OllamaPool(), EMBEDDINGS)
+        report = ingest_facts(
+            collection, embeddings, read_facts(args.path),
+            dataset=args.dataset or Path(args.path).stem, version=args.version, sync=args.sync,
+            batch_size=args.batch_size, concurrency=args.concurrency, lexical=lexical,
+        )
+        print(json.dumps(report))
+    elif args.command == "delete":
+        print(f"deleted {delete_facts(collection, dataset=args.dataset, version=args.version, lexical=lexical)} facts")
+    else:
+        print(json.dumps(versions(collection), indent=2))
@@ -0,0 +1,183 @@
+from __future__ import annotations
+import os
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import xxhash
+from fastapi import HTTPException, UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.responses import JSONResponse
+
+# === CONFIG ===
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1 << 20)))          # 1 MiB
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(20 << 20)))             # 20 MiB
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_BYTES", str(500 << 20)))            # 500 MiB
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(1 << 30)))              # 1 GiB
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "256"))
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+# room for multipart boundaries and part headers on top of the file itself
+MULTIPART_SLACK = 64 << 10
+
+
+@dataclass
+class Upload:
+    """A fully received upload, hashed while it streamed in."""
+    digest: str
+    size: int
+    data: Optional[bytes] = None        # set for in-memory ingest
+    path: Optional[Path] = None         # set for on-disk ingest
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+
+
+def _check_declared_size(file: UploadFile, limit: int) -> None:
+    if file.size is not None and file.size > limit:
+        raise _too_large(limit)
+
+
+async def read_upload(
+    file: UploadFile,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Upload:
+    """Reads an upload into memory chunk by chunk, hashing as it goes."""
+    _check_declared_size(file, max_bytes)
+
+    hasher = xxhash.xxh3_128()
+    buf = bytearray()
+    while chunk := await file.read(chunk_size):
+        if len(buf) + len(chunk) > max_bytes:
+            raise _too_large(max_bytes)
+        hasher.update(chunk)
+        buf += chunk
+    return Upload(digest=hasher.hexdigest(), size=len(buf), data=bytes(buf))
+
+
+async def save_upload(
+    file: UploadFile,
+    dest: Path,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Upload:
+    """
+    Streams an upload to `dest` chunk by chunk, hashing as it goes, so at
+    most one chunk is held in memory. A partial file is removed if the
+    limit is hit.
+    """
+    _check_declared_size(file, max_bytes)
+
+    hasher = xxhash.xxh3_128()
+    size = 0
+    try:
+        with open(dest, "wb") as f:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+                hasher.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return Upload(digest=hasher.hexdigest(), size=size, path=dest)
+
+
+def read_archive(
+    path: Path,
+    exts: set[str] = IMAGE_EXTS,
+    max_items: int = MAX_BATCH_ITEMS,
+    max_entry_bytes: int = MAX_IMAGE_BYTES,
+) -> List[Tuple[str, Upload]]:
+    """
+    (name, Upload) of every file in a zip archive whose extension is in
+    `exts`, in archive order. Entry count and declared sizes are checked
+    before anything is decompressed.
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Upload is not a zip archive")
+
+    with archive:
+        entries = [
+            info for info in archive.infolist()
+            if not info.is_dir() and Path(info.filename).suffix.lower() in exts
+        ]
+        if len(entries) > max_items:
+            raise HTTPException(status_code=413, detail=f"Archive has more than {max_items} items")
+        for info in entries:
+            if info.file_size > max_entry_bytes:
+                raise HTTPException(status_code=413, detail=f"{info.filename} exceeds {max_entry_bytes} bytes")
+        items = []
+        for info in entries:
+            data = archive.read(info)
+            items.append((info.filename, Upload(digest=xxhash.xxh3_128_hexdigest(data), size=len(data), data=data)))
+        return items
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects uploads larger than the limit for their path with 413: at once
+    when the declared Content-Length is too big, otherwise (chunked bodies)
+    as soon as the bytes received pass it, before the rest is parsed or
+    spooled.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        limit += MULTIPART_SLACK
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        too_large = False
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            if too_large:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # the app sees a disconnect and stops reading
+                    too_large = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal started
+            if too_large and not started:
+                return          # replaced by the 413 below
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large or started:
+                raise
+        if too_large and not started:
+            await self._reject(scope, receive, send, limit)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, limit: int) -> None:
+        response = JSONResponse(
+            {"detail": f"Upload exceeds {limit - MULTIPART_SLACK} bytes"}, status_code=413
+        )
+        await response(scope, receive, send)
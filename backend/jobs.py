@@ -0,0 +1,393 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import Engine, func, text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from structures import Job
+
+# === CONFIG ===
+JOB_DIR = Path(os.getenv("JOB_DIR", "private/jobs"))
+# worker processes started by the API process, which then also recovers the
+# queue at startup. Only one process may own the consumers: with several API
+# processes (`uvicorn --workers N`) keep 0 and run `python -m jobs` instead
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_LONG_POLL_MAX = float(os.getenv("JOB_LONG_POLL_MAX", "30"))
+# queued jobs beyond this are refused with 429
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "1000"))
+# a job that was running when its worker died is retried this many times
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+TERMINAL = {"done", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the running job was cancelled."""
+
+
+class JobQueue:
+    """
+    Persistent video job queue in the audit SQLite database. Any number of
+    processes may share it: a job is claimed with a single conditional
+    UPDATE, so exactly one worker gets it.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        # readers (status polls) must not block the writer and vice versa
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        SQLModel.metadata.create_all(engine, tables=[Job.__table__])
+
+    # ---- API side ---- #
+    def submit(
+        self,
+        path: Path,
+        *,
+        digest: str,
+        model_id: str,
+        ext: Optional[str] = None,
+        result: Optional[dict] = None,
+        job_id: Optional[str] = None,
+    ) -> Job:
+        """Queues a job, or records it as done straight away when `result` is known."""
+        now = time.time()
+        job = Job(
+            id=job_id or uuid.uuid4().hex,
+            status="queued" if result is None else "done",
+            path=str(path),
+            ext=ext,
+            digest=digest,
+            model_id=model_id,
+            result=None if result is None else json.dumps(result),
+            created_at=now,
+            finished_at=None if result is None else now,
+        )
+        with Session(self.engine) as session:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with Session(self.engine) as session:
+            return session.get(Job, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """
+        Long-poll: returns as soon as the job's status or progress differs
+        from when the call started, the job is finished, or `timeout` passes.
+        """
+        job = self.get(job_id)
+        if job is None or job.status in TERMINAL or timeout <= 0:
+            return job
+
+        seen = (job.status, job.progress)
+        deadline = time.monotonic() + min(timeout, JOB_LONG_POLL_MAX)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            job = self.get(job_id)
+            if job is None or (job.status, job.progress) != seen:
+                break
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Queued jobs are cancelled at once; running ones at their next stage."""
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            if job is None or job.status in TERMINAL:
+                return job
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                Path(job.path).unlink(missing_ok=True)
+            else:
+                job.cancel_requested = True
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+
+    def position(self, job: Job) -> Optional[int]:
+        """Jobs ahead of a queued job."""
+        if job.status != "queued":
+            return None
+        with Session(self.engine) as session:
+            return session.exec(
+                select(func.count()).select_from(Job)
+                .where(Job.status == "queued", Job.created_at < job.created_at)
+            ).one()
+
+    def depth(self) -> dict:
+        """Job counts per status and the age of the oldest queued job, for autoscaling."""
+        with Session(self.engine) as session:
+            counts = dict(session.exec(select(Job.status, func.count()).group_by(Job.status)).all())
+            oldest = session.exec(select(func.min(Job.created_at)).where(Job.status == "queued")).one()
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "cancelled": counts.get("cancelled", 0),
+            "oldest_queued_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "max_queued": JOB_MAX_QUEUED,
+        }
+
+    # ---- worker side ---- #
+    def claim(self, worker: str) -> Optional[Job]:
+        token = f"{worker}:{uuid.uuid4().hex[:8]}"
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "UPDATE job SET status = 'running', worker = :token, started_at = :now,"
+                    " attempts = attempts + 1"
+                    " WHERE id = (SELECT id FROM job WHERE status = 'queued' ORDER BY created_at LIMIT 1)"
+                    " AND status = 'queued'"
+                ),
+                {"token": token, "now": time.time()},
+            )
+        with Session(self.engine) as session:
+            return session.exec(select(Job).where(Job.worker == token, Job.status == "running")).first()
+
+    def report(self, job_id: str, **counters) -> None:
+        """Merges progress counters; raises JobCancelled if the job was cancelled."""
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            if job is None or job.cancel_requested:
+                raise JobCancelled(job_id)
+            job.progress = json.dumps({**json.loads(job.progress), **counters})
+            session.add(job)
+            session.commit()
+
+    def _close(self, job_id: str, status: str, *, result: Optional[dict] = None, error: Optional[str] = None) -> Optional[Job]:
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            if job is None or job.status != "running":
+                return job
+            job.status = "cancelled" if job.cancel_requested else status
+            job.result = None if result is None else json.dumps(result)
+            job.error = error
+            job.finished_at = time.time()
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+        Path(job.path).unlink(missing_ok=True)
+        return job
+
+    def finish(self, job_id: str, result: dict) -> Optional[Job]:
+        return self._close(job_id, "done", result=result)
+
+    def fail(self, job_id: str, error: str) -> Optional[Job]:
+        return self._close(job_id, "failed", error=error)
+
+    def cancelled(self, job_id: str) -> Optional[Job]:
+        return self._close(job_id, "cancelled")
+
+    def recover(self, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """
+        Requeues jobs left running by workers that died (e.g. a server
+        restart). Call before starting workers, and only from the one place
+        that owns all consumers of this queue. Jobs that already used
+        `max_attempts` are failed instead of retried forever.
+        """
+        now = time.time()
+        with Session(self.engine) as session:
+            stale = session.exec(select(Job).where(Job.status == "running")).all()
+            for job in stale:
+                if job.cancel_requested:
+                    job.status, job.finished_at = "cancelled", now
+                elif job.attempts >= max_attempts:
+                    job.status, job.finished_at = "failed", now
+                    job.error = f"Worker lost the job {job.attempts} times"
+                else:
+                    job.status, job.worker = "queued", None
+                session.add(job)
+            session.commit()
+            for job in stale:
+                if job.status in TERMINAL:
+                    Path(job.path).unlink(missing_ok=True)
+        return len(stale)
+
+
+def view(job: Job, queue: Optional[JobQueue] = None) -> dict:
+    """Client-facing job status."""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "position": queue.position(job) if queue is not None else None,
+        "progress": json.loads(job.progress),
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# --------------------------------------------------------------------------- #
+#  Worker processes
+# --------------------------------------------------------------------------- #
+def run_worker(
+    name: str,
+    db_url: str,
+    stop,
+    *,
+    face_weights: str,
+    video_weights: str,
+    adaptive: bool = False,
+    max_frames: int = 32,
+    margin: float = 0.3,
+    tracking: bool = False,
+    track_frames: int = 48,
+    models: Optional[dict] = None,
+) -> None:
+    """
+    Worker loop: loads the face detector and video model once, then scores
+    queued jobs until `stop` is set. Runs in its own (spawned) process.
+    `models` are already loaded classifiers (shared memory, see serve.py).
+    """
+    import torch
+    from ultralytics import YOLO
+
+    from analytics import update_rollups
+    from audit import configure_sqlite, prediction_record, write_records
+    from cache import ResultCache
+    from embeddings import EmbeddingCache
+    from pytorch import (
+        LazyVideo,
+        ModelRegistry,
+        classify_frames,
+        classify_frames_adaptive,
+        classify_frames_tracked,
+        decode_video,
+    )
+
+    engine = configure_sqlite(create_engine(db_url, connect_args={"check_same_thread": False}))
+    queue = JobQueue(engine)
+    result_cache = ResultCache(engine=engine)
+    embedding_cache = EmbeddingCache()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    face_detector = YOLO(face_weights)
+    registry = ModelRegistry(device, video_path=video_weights, image_path="", preloaded=models)
+    model = registry.get("video")
+    embedding_cache.bind(registry.identity("video"))
+
+    while not stop.is_set():
+        job = queue.claim(name)
+        if job is None:
+            stop.wait(JOB_POLL_INTERVAL)
+            continue
+
+        try:
+            queue.report(job.id, stage="decoding")
+            if tracking:
+                frames = decode_video(job.path, track_frames)
+                classify, extra = classify_frames_tracked, {}
+            elif adaptive:
+                # decoded stage by stage while scoring
+                frames = LazyVideo(job.path, max_frames)
+                classify, extra = classify_frames_adaptive, {"margin": margin}
+            else:
+                frames = decode_video(job.path, 20)
+                classify, extra = classify_frames, {}
+            decoded = {} if isinstance(frames, LazyVideo) else {"frames_decoded": len(frames)}
+            try:
+                queue.report(job.id, stage="scoring", **decoded)
+                result = classify(
+                    frames,
+                    model=model,
+                    device=device,
+                    face_detector=face_detector,
+                    embedding_cache=embedding_cache,
+                    progress=lambda **counters: queue.report(job.id, **counters),
+                    **extra,
+                )
+            finally:
+                if isinstance(frames, LazyVideo):
+                    frames.close()
+        except JobCancelled:
+            queue.cancelled(job.id)
+            continue
+        except Exception as exc:
+            queue.fail(job.id, str(exc))
+            continue
+
+        job = queue.finish(job.id, result)
+        if job is not None and job.status == "done":
+            result_cache.put("video", job.model_id, job.digest, result)
+            write_records(engine, [prediction_record(
+                "video", result, id=job.id, ext=job.ext,
+                # scoring time, like the sync endpoints; queue wait is in the job row
+                latency_ms=(job.finished_at - job.started_at) * 1000.0,
+            )], [update_rollups])
+
+
+class WorkerPool:
+    """`n` spawned `run_worker` processes sharing one stop event."""
+
+    def __init__(self, n: int, db_url: str, **worker_kwargs):
+        ctx = multiprocessing.get_context("spawn")
+        self.stop_event = ctx.Event()
+        self.processes = [
+            ctx.Process(
+                target=run_worker,
+                args=(f"worker-{os.getpid()}-{i}", db_url, self.stop_event),
+                kwargs=worker_kwargs,
+                daemon=True,
+            )
+            for i in range(n)
+        ]
+
+    def start(self) -> None:
+        for p in self.processes:
+            p.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Running jobs that do not finish in time are requeued by the next `recover`."""
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for p in self.processes:
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.processes),
+            "alive": sum(p.is_alive() for p in self.processes),
+        }
+
+
+if __name__ == "__main__":
+    # standalone workers, e.g. scaled on `GET /jobs` queue depth
+    parser = argparse.ArgumentParser(description="Consume the video job queue")
+    parser.add_argument("--db", default="sqlite:///database/audit.db")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--face-weights", default="models/yolov8n-face.pt")
+    parser.add_argument("--video-weights", default="models/video_model.pt")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--tracking", action="store_true")
+    args = parser.parse_args()
+
+    JobQueue(create_engine(args.db)).recover()
+    pool = WorkerPool(
+        args.workers, args.db,
+        face_weights=args.face_weights, video_weights=args.video_weights, adaptive=args.adaptive,
+        tracking=args.tracking,
+    )
+    pool.start()
+    try:
+        for p in pool.processes:
+            p.join()
+    except KeyboardInterrupt:
+        pool.stop()
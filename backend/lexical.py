@@ -0,0 +1,324 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# === CONFIG ===
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# reciprocal-rank fusion constant: score = sum 1 / (RRF_K + rank)
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# longest term (UTF-8 bytes) kept in the on-disk vocabulary, fixed-width for mmap
+MAX_TERM = 32
+TERM_DTYPE = f"S{MAX_TERM}"
+FILES = ("terms", "offsets", "docs", "tfs", "doc_len", "doc_ids")
+
+STOPWORDS = frozenset({
+    "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "as", "from",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords; numbers are kept, they matter for fact checks."""
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+
+class _Segment:
+    """
+    Immutable CSR inverted index: postings of term i are
+    docs/tfs[offsets[i]:offsets[i + 1]], terms sorted for binary search.
+    Loaded from disk the arrays are read-only memory maps.
+    """
+
+    def __init__(self, terms, offsets, docs, tfs, doc_len, doc_ids):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.doc_ids = doc_ids
+        self.alive = np.ones(len(doc_ids), dtype=bool)
+        self.positions: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def build(cls, doc_ids: Sequence[str], texts: Sequence[str]) -> "_Segment":
+        doc_col, term_col, tf_col = [], [], []
+        doc_len = np.zeros(len(doc_ids), dtype=np.int32)
+        for d, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[d] = len(tokens)
+            encoded = np.array([t.encode() for t in tokens], dtype=TERM_DTYPE)
+            terms, counts = np.unique(encoded, return_counts=True)
+            doc_col.append(np.full(len(terms), d, dtype=np.int32))
+            term_col.append(terms)
+            tf_col.append(counts)
+        return cls.from_postings(
+            np.concatenate(doc_col) if doc_col else np.empty(0, np.int32),
+            np.concatenate(term_col) if term_col else np.empty(0, TERM_DTYPE),
+            np.concatenate(tf_col) if tf_col else np.empty(0, np.int64),
+            doc_len,
+            np.array([d.encode() for d in doc_ids], dtype=bytes) if len(doc_ids) else np.empty(0, "S1"),
+        )
+
+    @classmethod
+    def from_postings(cls, doc_col, term_col, tf_col, doc_len, doc_ids) -> "_Segment":
+        terms, term_idx = np.unique(term_col, return_inverse=True)
+        order = np.lexsort((doc_col, term_idx))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_idx, minlength=len(terms)), out=offsets[1:])
+        return cls(
+            terms.astype(TERM_DTYPE),
+            offsets,
+            doc_col[order].astype(np.int32),
+            np.minimum(tf_col[order], np.iinfo(np.uint16).max).astype(np.uint16),
+            doc_len.astype(np.int32),
+            doc_ids,
+        )
+
+    def postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(doc, term, tf) columns, the inverse of `from_postings`."""
+        term_col = np.repeat(self.terms, np.diff(self.offsets))
+        return np.asarray(self.docs), term_col, np.asarray(self.tfs)
+
+    def lookup(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        term = term.encode()[:MAX_TERM]
+        i = int(np.searchsorted(self.terms, term))
+        if i >= len(self.terms) or self.terms[i] != term:
+            return None
+        s, e = self.offsets[i], self.offsets[i + 1]
+        return self.docs[s:e], self.tfs[s:e]
+
+    def position(self, doc_id: str) -> Optional[int]:
+        if self.positions is None:
+            self.positions = {d.decode(): i for i, d in enumerate(self.doc_ids)}
+        return self.positions.get(doc_id)
+
+
+class LexicalIndex:
+    """
+    BM25 index over the trusted-facts corpus. Persisted as flat numpy
+    arrays in `path` and memory-mapped on open, so startup does not
+    depend on corpus size. Updates go to a small in-memory segment
+    (deletes are tombstones) until `save` merges everything into a new
+    on-disk segment.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None, *, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = Path(path) if path is not None else None
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._base = _Segment.build([], [])
+        self._delta_ids: List[str] = []
+        self._delta_texts: List[str] = []
+        self._delta: Optional[_Segment] = None
+        self.dirty = False
+        self._loaded: Optional[int] = None      # meta.json mtime of the mapped segment
+        if self.path is not None and (self.path / "meta.json").exists():
+            self._load()
+
+    # ---- persistence ---- #
+    def _load(self) -> None:
+        loaded = (self.path / "meta.json").stat().st_mtime_ns
+        arrays = {name: np.load(self.path / f"{name}.npy", mmap_mode="r") for name in FILES}
+        self._base = _Segment(**arrays)
+        self._loaded = loaded
+
+    def refresh(self) -> bool:
+        """
+        Remaps the on-disk segment when another process (`python -m facts
+        ingest`, `lexical rebuild`) saved a newer one. Cheap enough to call
+        per query: one stat. Unsaved local updates are kept instead.
+        """
+        if self.path is None:
+            return False
+        try:
+            if (self.path / "meta.json").stat().st_mtime_ns == self._loaded:
+                return False
+            with self._lock:
+                if self.dirty:
+                    return False
+                self._load()
+        except OSError:
+            return False        # mid-swap: keep the current maps until the next call
+        return True
+
+    def save(self) -> None:
+        """Merges pending updates into one segment and writes it atomically."""
+        with self._lock:
+            if self.path is None or not self.dirty:
+                return
+            segment = self._merged()
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            for name in FILES:
+                np.save(tmp / f"{name}.npy", getattr(segment, name))
+            (tmp / "meta.json").write_text(json.dumps({"count": len(segment.doc_ids), "saved_at": time.time()}))
+            old = self.path.with_name(self.path.name + ".old")
+            shutil.rmtree(old, ignore_errors=True)
+            if self.path.exists():
+                self.path.rename(old)
+            tmp.rename(self.path)
+            shutil.rmtree(old, ignore_errors=True)
+            self._base = segment
+            self._reset_delta()
+            self._load()            # back to read-only maps
+
+    def _merged(self) -> _Segment:
+        parts, offset = [], 0
+        all_ids, all_len = [], []
+        for seg in self._segments():
+            docs, terms, tfs = seg.postings()
+            remap = np.full(len(seg.doc_ids), -1, dtype=np.int64)
+            remap[seg.alive] = np.arange(int(seg.alive.sum())) + offset
+            keep = seg.alive[docs] if len(docs) else np.zeros(0, bool)
+            parts.append((remap[docs[keep]], terms[keep], tfs[keep]))
+            all_ids.append(np.asarray(seg.doc_ids)[seg.alive])
+            all_len.append(np.asarray(seg.doc_len)[seg.alive])
+            offset += int(seg.alive.sum())
+        return _Segment.from_postings(
+            np.concatenate([p[0] for p in parts]).astype(np.int32),
+            np.concatenate([p[1] for p in parts]),
+            np.concatenate([p[2] for p in parts]),
+            np.concatenate(all_len),
+            np.concatenate(all_ids),
+        )
+
+    def _reset_delta(self) -> None:
+        self._delta_ids, self._delta_texts, self._delta = [], [], None
+        self.dirty = False
+
+    def _segments(self) -> List[_Segment]:
+        if self._delta is None and self._delta_ids:
+            self._delta = _Segment.build(self._delta_ids, self._delta_texts)
+        return [self._base] + ([self._delta] if self._delta is not None else [])
+
+    # ---- updates ---- #
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Adds or replaces documents."""
+        with self._lock:
+            self.remove(ids)
+            self._delta_ids.extend(ids)
+            self._delta_texts.extend(texts)
+            self._delta = None
+            self.dirty = True
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            ids = set(ids)
+            if not ids:
+                return
+            for doc_id in ids:
+                i = self._base.position(doc_id)
+                if i is not None and self._base.alive[i]:
+                    self._base.alive[i] = False
+                    self.dirty = True
+            if ids & set(self._delta_ids):
+                keep = [k for k, d in enumerate(self._delta_ids) if d not in ids]
+                self._delta_ids = [self._delta_ids[k] for k in keep]
+                self._delta_texts = [self._delta_texts[k] for k in keep]
+                self._delta = None
+                self.dirty = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(int(seg.alive.sum()) for seg in self._segments())
+
+    # ---- search ---- #
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-`k` (doc id, BM25 score) for a free-text query."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            segments = self._segments()
+            n_docs = sum(int(s.alive.sum()) for s in segments)
+            if not terms or n_docs == 0:
+                return []
+            avgdl = sum(float(np.asarray(s.doc_len)[s.alive].sum()) for s in segments) / n_docs
+
+            hits = [[seg.lookup(t) for seg in segments] for t in terms]
+            candidates = []
+            scores_per_seg = [np.zeros(len(s.doc_ids), dtype=np.float32) for s in segments]
+            for term_hits in hits:
+                df = sum(int(seg.alive[h[0]].sum()) for seg, h in zip(segments, term_hits) if h is not None)
+                if df == 0:
+                    continue
+                idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+                for seg, h, scores in zip(segments, term_hits, scores_per_seg):
+                    if h is None:
+                        continue
+                    docs, tf = np.asarray(h[0]), np.asarray(h[1], dtype=np.float32)
+                    norm = self.k1 * (1 - self.b + self.b * np.asarray(seg.doc_len)[docs] / avgdl)
+                    scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            for seg, scores in zip(segments, scores_per_seg):
+                scores[~seg.alive] = 0.0
+                top = np.flatnonzero(scores)
+                if len(top) > k:
+                    top = top[np.argpartition(-scores[top], k)[:k]]
+                candidates += [(seg.doc_ids[i].decode(), float(scores[i])) for i in top]
+        return sorted(candidates, key=lambda c: -c[1])[:k]
+
+
+def rrf(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[str]:
+    """Reciprocal-rank fusion of several best-first id lists."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda d: -scores[d])
+
+
+def rebuild(index: LexicalIndex, collection, page: int = 5000) -> int:
+    """Replaces the index contents with every document of a Chroma collection."""
+    with index._lock:
+        index._base = _Segment.build([], [])
+        index._reset_delta()
+        offset = 0
+        while True:
+            batch = collection.get(include=["documents"], limit=page, offset=offset)
+            if not batch["ids"]:
+                break
+            index.add(batch["ids"], batch["documents"])
+            offset += len(batch["ids"])
+        index.dirty = True
+        index.save()
+        return len(index)
+
+
+def ensure_synced(index: LexicalIndex, collection) -> int:
+    """Rebuilds from the collection when the document counts disagree (e.g. first start). Returns docs indexed, 0 if in sync."""
+    if len(index) == collection.count():
+        return 0
+    return rebuild(index, collection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 index over the trusted-facts collection")
+    parser.add_argument("command", choices=["rebuild", "search"])
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("--persist-dir", default=os.getenv("CHROMA_PERSIST_DIR", "./database"))
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    index = LexicalIndex(Path(args.persist_dir) / "lexical")
+    if args.command == "rebuild":
+        import chromadb
+        from facts import FACTS_COLLECTION
+
+        collection = chromadb.PersistentClient(path=args.persist_dir).get_or_create_collection(FACTS_COLLECTION)
+        start = time.perf_counter()
+        print(f"indexed {rebuild(index, collection)} facts in {time.perf_counter() - start:.1f}s")
+    else:
+        for doc_id, score in index.search(args.query or "", args.k):
+            print(f"{score:8.3f}  {doc_id}")
@@ -1,43 +1,144 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
+import asyncio
+import json
+import os
+import time
 import uuid
 import torch
-from typing import Annotated
-from sqlmodel import Session, SQLModel, create_engine
+from typing import List, Literal, Optional
+from sqlmodel import SQLModel, create_engine
 from ultralytics import YOLO
 
-from pytorch import load_models, guess_image, guess_video
-from rag import guess_news, init_mcp_resources, vectorstore
-from structures import Auditing, InformationRequest, InformationResponse
+from analytics import ensure_rollups, update_rollups
+from analytics import query as analytics_query
+from audit import AuditWriter, configure_sqlite, migrate, needs_migration, prediction_record, record
+from batching import BatchingEngine
+from executor import ExecutionLayer
+from jobs import JOB_DIR, JOB_MAX_QUEUED, JOB_WORKERS, JobQueue, WorkerPool, view
+import metrics
+from metrics import MetricsMiddleware, register_stats, setup_tracing
+from cache import ResultCache, weights_identity
+from embeddings import EmbeddingCache
+from ingest import (
+    MAX_BATCH_BYTES,
+    MAX_BATCH_ITEMS,
+    MAX_IMAGE_BYTES,
+    MAX_VIDEO_BYTES,
+    UploadLimitMiddleware,
+    read_archive,
+    read_upload,
+    save_upload,
+)
+from pytorch import (
+    ModelRegistry,
+    SerializedDetector,
+    decode_video,
+    classify_frames,
+    classify_frames_tracked,
+    classify_video_adaptive,
+    prepare_image,
+    format_prediction,
+    prepare_images,
+)
+import rag
+from rag import guess_news, stream_news, init_mcp_resources, vectorstore
+from structures import InformationBatchRequest, InformationRequest, InformationResponse
 
 #  Configuration
 DB_URL          = "sqlite:///database/audit.db"
 UPLOAD_DIR      = Path("private")
+FACE_WEIGHTS    = os.getenv("FACE_WEIGHTS", "models/yolov8n-face.pt")
+IMAGE_WEIGHTS   = os.getenv("IMAGE_WEIGHTS", "models/image_model.pt")
+VIDEO_WEIGHTS   = os.getenv("VIDEO_WEIGHTS", "models/video_model.pt")
+# comma separated subset of "image,video" to load at startup instead of lazily
+PRELOAD_MODELS  = [m for m in os.getenv("PRELOAD_MODELS", "").split(",") if m]
+# early-exit video scoring: start small, add frames only near the 0.5 boundary
+VIDEO_ADAPTIVE  = os.getenv("VIDEO_ADAPTIVE", "0") == "1"
+ADAPTIVE_MAX_FRAMES = int(os.getenv("ADAPTIVE_MAX_FRAMES", "32"))
+ADAPTIVE_MARGIN = float(os.getenv("ADAPTIVE_MARGIN", "0.3"))
+# score every face track separately (detector on keyframes only, see tracking.py);
+# takes precedence over VIDEO_ADAPTIVE
+VIDEO_TRACKING  = os.getenv("VIDEO_TRACKING", "0") == "1"
+TRACK_FRAMES    = int(os.getenv("TRACK_FRAMES", "48"))
+# images per face-detector call in the batch endpoints
+IMAGE_BATCH_SIZE = int(os.getenv("IMAGE_BATCH_SIZE", "16"))
+# claims of one /predict-news/batch request checked concurrently
+NEWS_BATCH_CONCURRENCY = int(os.getenv("NEWS_BATCH_CONCURRENCY", "4"))
+# one-off startup steps: tables, rollup backfill, fact seeding and the lexical
+# index rebuild. serve.py runs them once before spawning and turns them off in
+# its workers; with `uvicorn --workers N` run `python serve.py --setup-only` and set 0
+STARTUP_SETUP   = os.getenv("STARTUP_SETUP", "1") == "1"
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 connect_args = {"check_same_thread": False}
-engine = create_engine(DB_URL, connect_args=connect_args, echo=False)
-SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
-        yield session
+engine = configure_sqlite(create_engine(DB_URL, connect_args=connect_args, echo=False))
+if STARTUP_SETUP:
+    # upgrades a legacy auditing table; concurrent runs wait on SQLite's write lock
+    migrate(engine)
+    SQLModel.metadata.create_all(engine)
+    ensure_rollups(engine)
+elif needs_migration(engine):
+    raise RuntimeError("The auditing table predates the current schema; run `python serve.py --setup-only` first")
+audit_writer = AuditWriter(engine)
+audit_writer.hooks.append(update_rollups)
+result_cache = ResultCache(engine=engine)
+job_queue = JobQueue(engine)
+JOB_DIR.mkdir(parents=True, exist_ok=True)
+embedding_cache = EmbeddingCache()
+# classifiers handed over by serve.py (tensors in shared memory), else loaded here
+shared_models: dict = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global image_model, video_model, device, face_detector
+    global registry, device, face_detector, face_identity, image_engine, executor, job_workers
 
+    setup_tracing()
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    face_detector = YOLO("models/yolov8n-face.pt")
-    video_model, image_model = load_models(device=device)
-    init_mcp_resources(device=device) 
+    # one detector for all inference threads, calls serialised
+    face_detector = SerializedDetector(YOLO(FACE_WEIGHTS))
+    face_identity = weights_identity(FACE_WEIGHTS)
+    # classifiers load lazily on first use, see ModelRegistry
+    registry = ModelRegistry(device, video_path=VIDEO_WEIGHTS, image_path=IMAGE_WEIGHTS, preloaded=shared_models)
+    for name in PRELOAD_MODELS:
+        registry.get(name)
+    image_engine = BatchingEngine(lambda: registry.get("image"), device)
+    await image_engine.start()
+    executor = ExecutionLayer()
+    init_mcp_resources(device=device, seed=STARTUP_SETUP)
+    if JOB_WORKERS:
+        # this process owns the consumers: jobs left running by the previous
+        # ones go back on the queue
+        job_queue.recover()
+    job_workers = WorkerPool(
+        JOB_WORKERS,
+        DB_URL,
+        face_weights=FACE_WEIGHTS,
+        video_weights=VIDEO_WEIGHTS,
+        adaptive=VIDEO_ADAPTIVE,
+        max_frames=ADAPTIVE_MAX_FRAMES,
+        margin=ADAPTIVE_MARGIN,
+        tracking=VIDEO_TRACKING,
+        track_frames=TRACK_FRAMES,
+        models=dict(shared_models),
+    )
+    job_workers.start()
+    audit_writer.start()
 
     yield
 
+    job_workers.stop()
+    audit_writer.stop()
+    await image_engine.stop()
+    executor.shutdown()
+    if rag.ollama_pool:
+        rag.ollama_pool.close()
     try:
-        del image_model, video_model, face_detector, device
+        del registry, face_detector, device
         if vectorstore:
             vectorstore.persist()
     except:
@@ -57,39 +158,145 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["key", "filename"],
 )
-
-SessionDep = Annotated[Session, Depends(get_session)]
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/predict-image": MAX_IMAGE_BYTES,
+        "/predict-video": MAX_VIDEO_BYTES,
+        "/predict-image/batch": MAX_BATCH_BYTES,
+        "/predict-image/archive": MAX_BATCH_BYTES,
+        "/predict-video/batch": MAX_BATCH_BYTES,
+        "/jobs/video": MAX_VIDEO_BYTES,
+    },
+)
 
 @app.get("/")
 def index():
     return {"message": "Hello"}
 
 
+@app.get("/stats")
+def stats():
+    return {
+        "image_batching": image_engine.stats(),
+        "result_cache": result_cache.stats(),
+        "executor": executor.stats(),
+        "models": registry.stats(),
+        "process": {"pid": os.getpid(), "torch_threads": torch.get_num_threads()},
+        "embedding_cache": embedding_cache.stats(),
+        "news_search": rag.retriever.stats(),
+        "verdict_cache": rag.verdict_cache.stats() if rag.verdict_cache else None,
+        "ollama": rag.ollama_pool.stats() if rag.ollama_pool else None,
+        "retrieval": {**rag.retrieval_counts, "lexical_docs": len(rag.lexical_index) if rag.lexical_index else 0},
+        "jobs": {**job_queue.depth(), **job_workers.stats()},
+        "audit": audit_writer.stats(),
+    }
+
+
+def _cache_stats() -> dict:
+    caches = {
+        "result": result_cache.stats(),
+        "embedding": embedding_cache.stats(),
+        "news_search": rag.retriever.stats(),
+    }
+    if rag.verdict_cache:
+        caches["verdict"] = rag.verdict_cache.stats()
+    return caches
+
+
+# scrape-time views over counters the components already keep
+register_stats(
+    "cache_hits_total", "Cache hits", "cache",
+    lambda: {name: s["hits"] + s.get("persistent_hits", 0) for name, s in _cache_stats().items()},
+    kind="counter",
+)
+register_stats(
+    "cache_misses_total", "Cache misses", "cache",
+    lambda: {name: s["misses"] for name, s in _cache_stats().items()},
+    kind="counter",
+)
+register_stats(
+    "fact_retrievals_total", "Trusted-fact retrievals by mode, plus embedding fallbacks", "mode",
+    lambda: dict(rag.retrieval_counts),
+    kind="counter",
+)
+register_stats(
+    "ollama_in_flight", "Requests in flight per Ollama endpoint", "endpoint",
+    lambda: {url: e["in_flight"] for url, e in (rag.ollama_pool.stats() if rag.ollama_pool else {}).items()},
+)
+register_stats(
+    "ollama_breaker_open", "1 while an Ollama endpoint's circuit breaker is open", "endpoint",
+    lambda: {url: float(e["state"] == "open") for url, e in (rag.ollama_pool.stats() if rag.ollama_pool else {}).items()},
+)
+register_stats(
+    "admission_running", "Requests holding an admission slot", "endpoint",
+    lambda: {name: e["running"] for name, e in executor.stats()["endpoints"].items()},
+)
+register_stats(
+    "admission_waiting", "Requests waiting for an admission slot", "endpoint",
+    lambda: {name: e["waiting"] for name, e in executor.stats()["endpoints"].items()},
+)
+register_stats(
+    "queue_depth", "Items waiting in internal queues", "queue",
+    lambda: {
+        "image_batching": image_engine.stats()["queue_depth"],
+        "video_jobs": job_queue.depth()["queued"],
+        "audit": audit_writer.stats()["buffered"],
+    },
+)
+
+register_stats(
+    "audit_records_dropped_total", "Audit records dropped after repeated write failures or buffer overflow", "writer",
+    lambda: {"audit": audit_writer.stats()["dropped"]},
+    kind="counter",
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of stage timings, batch sizes, caches and queues."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/analytics")
+def analytics(
+    type: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    granularity: Literal["hour", "day"] = "hour",
+):
+    """FAKE/REAL rates and confidence histograms per media type and time bucket."""
+    return analytics_query(engine, kind=type, since=since, until=until, granularity=granularity)
+
+
+def _model_id(kind: str) -> str:
+    """Result-cache identity of the face detector plus `kind`'s classifier, as loaded."""
+    return f"{face_identity}-{registry.identity(kind)}"
+
+
 @app.post("/predict-image")
-async def predict_image(session: SessionDep, file: UploadFile = File(...)):
+async def predict_image(file: UploadFile = File(...)):
+    start = time.perf_counter()
     uid = uuid.uuid4().hex
     ext = Path(file.filename).suffix
-    filename = f"{uid}{ext}"
-    image_path = UPLOAD_DIR / filename
-    with open(image_path, "wb") as f:
-        f.write(await file.read())
+    model_id = _model_id("image")
 
     try:
-        result = guess_image(
-            image_path=str(image_path),
-            device=device,
-            model=image_model,
-            face_detector=face_detector,          # <-- correct name
-        )
-        audit = Auditing(
-            id=uid,
-            type="image",
-            classification=result.get("prediction") or "NaN",
-            ext=ext,
-            confidence=result.get("confidence") or "NaN",
-        )
-        session.add(audit)
-        session.commit()
+        upload = await read_upload(file, MAX_IMAGE_BYTES)
+        result = await executor.run_io(result_cache.get, "image", model_id, upload.digest)
+        if result is None:
+            async with executor.slot("image"):
+                face = await executor.run(
+                    prepare_image,
+                    upload.data,
+                    face_detector=face_detector,
+                )
+                result = format_prediction(await image_engine.submit(face))
+            await executor.run_io(result_cache.put, "image", model_id, upload.digest, result)
+        audit_writer.write(prediction_record(
+            "image", result, id=uid, ext=ext, latency_ms=(time.perf_counter() - start) * 1000.0,
+        ))
 
         return {
             "prediction": result.get("prediction"),
@@ -97,61 +304,429 @@ async def predict_image(session: SessionDep, file: UploadFile = File(...)):
             "probability": result.get("probability"),
         }
 
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    finally:
+        file.file.close()
+
+
+# --------------------------------------------------------------------------- #
+#  Batch endpoints
+# --------------------------------------------------------------------------- #
+def _item_error(index: int, exc: Exception, **fields) -> dict:
+    detail = exc.detail if isinstance(exc, HTTPException) else str(exc)
+    return {"index": index, **fields, "error": detail}
+
+
+def _batch_response(kind: str, results: list[dict], start: float) -> dict:
+    """Queues one Auditing row per successful item; they are flushed together."""
+    # per-item latency is the batch's wall time spread over its items
+    latency_ms = (time.perf_counter() - start) * 1000.0 / max(len(results), 1)
+    rows = []
+    for item in results:
+        if "error" in item:
+            continue
+        if kind == "news":
+            rows.append(record(
+                kind,
+                classification=item["classification"],
+                reason=item["reason"],
+                latency_ms=latency_ms,
+            ))
+        else:
+            rows.append(prediction_record(
+                kind, item, ext=Path(item["filename"] or "").suffix, latency_ms=latency_ms,
+            ))
+    audit_writer.write_many(rows)
+
+    failed = sum("error" in item for item in results)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+
+async def _score_images(uploads: list) -> list[dict]:
+    """
+    Per-item results for a list of (filename, Upload | Exception). Cache
+    misses are face-detected together (`prepare_images`) and classified
+    through the shared batching engine, under one image admission slot.
+    """
+    model_id = _model_id("image")
+    results: list = [None] * len(uploads)
+    misses = []
+    for i, (filename, upload) in enumerate(uploads):
+        if isinstance(upload, Exception):
+            results[i] = _item_error(i, upload, filename=filename)
+            continue
+        cached = await executor.run_io(result_cache.get, "image", model_id, upload.digest)
+        if cached is not None:
+            results[i] = {"index": i, "filename": filename, **cached}
+        else:
+            misses.append(i)
+
+    async def classify(face) -> dict | Exception:
+        if isinstance(face, Exception):
+            return face
+        try:
+            return format_prediction(await image_engine.submit(face))
+        except Exception as exc:
+            return exc
+
+    if misses:
+        async with executor.slot("image"):
+            faces = await executor.run(
+                prepare_images,
+                [uploads[i][1].data for i in misses],
+                face_detector=face_detector,
+                batch_size=IMAGE_BATCH_SIZE,
+            )
+            scored = await asyncio.gather(*(classify(face) for face in faces))
+        for i, result in zip(misses, scored):
+            filename, upload = uploads[i]
+            if isinstance(result, Exception):
+                results[i] = _item_error(i, result, filename=filename)
+            else:
+                await executor.run_io(result_cache.put, "image", model_id, upload.digest, result)
+                results[i] = {"index": i, "filename": filename, **result}
+    return results
+
+
+@app.post("/predict-image/batch")
+async def predict_image_batch(files: List[UploadFile] = File(...)):
+    """
+    Several images in one multipart request. Results come back in upload
+    order; an item that fails carries an `error` instead of a prediction.
+    """
+    start = time.perf_counter()
+    if len(files) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has more than {MAX_BATCH_ITEMS} items")
+
+    uploads = []
+    try:
+        for file in files:
+            try:
+                uploads.append((file.filename, await read_upload(file, MAX_IMAGE_BYTES)))
+            except HTTPException as exc:
+                uploads.append((file.filename, exc))
+        results = await _score_images(uploads)
+        return _batch_response("image", results, start)
+
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    finally:
+        for file in files:
+            file.file.close()
+
+
+@app.post("/predict-image/archive")
+async def predict_image_archive(file: UploadFile = File(...)):
+    """Same as /predict-image/batch for the images inside one zip archive."""
+    start = time.perf_counter()
+    archive_path = UPLOAD_DIR / f"{uuid.uuid4().hex}.zip"
+    try:
+        await save_upload(file, archive_path, MAX_BATCH_BYTES)
+        uploads = await executor.run(read_archive, archive_path)
+        results = await _score_images(uploads)
+        return _batch_response("image", results, start)
+
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=501, detail=str(exc))
     finally:
         file.file.close()
-        image_path.unlink(missing_ok=True)
+        archive_path.unlink(missing_ok=True)
+
+
+def _video_model_id() -> str:
+    """Result-cache key for the video model and the scoring mode in use."""
+    mode = "-tracked" if VIDEO_TRACKING else "-adaptive" if VIDEO_ADAPTIVE else ""
+    return _model_id("video") + mode
+
+
+async def _score_video(model, path: Path) -> dict:
+    """Decodes and scores one video with the configured strategy; call inside the video slot."""
+    if VIDEO_TRACKING:
+        frames = await executor.run_decode(decode_video, str(path), TRACK_FRAMES)
+        return await executor.run(
+            classify_frames_tracked,
+            frames,
+            device=device,
+            model=model,
+            face_detector=face_detector,
+            embedding_cache=embedding_cache,
+        )
+    if VIDEO_ADAPTIVE:
+        # decoded stage by stage on the inference thread, see LazyVideo
+        return await executor.run(
+            classify_video_adaptive,
+            str(path),
+            ADAPTIVE_MAX_FRAMES,
+            device=device,
+            model=model,
+            face_detector=face_detector,
+            margin=ADAPTIVE_MARGIN,
+            embedding_cache=embedding_cache,
+        )
+    frames = await executor.run_decode(decode_video, str(path))
+    return await executor.run(
+        classify_frames,
+        frames,
+        device=device,
+        model=model,
+        face_detector=face_detector,          # <-- correct name
+        embedding_cache=embedding_cache,
+    )
 
 
 @app.post("/predict-video")
-async def predict_video(session: SessionDep, file: UploadFile = File(...)):
+async def predict_video(file: UploadFile = File(...)):
+    start = time.perf_counter()
     uid = uuid.uuid4().hex
     ext = Path(file.filename).suffix
     filename = f"{uid}{ext}"
     video_path = UPLOAD_DIR / filename
-    with open(video_path, mode="wb") as f:
-        f.write(await file.read())
+    model_id = _video_model_id()
 
     try:
-        result = guess_video(
-            video_path=str(video_path),
-            device=device,
-            model=video_model,
-            face_detector=face_detector,          # <-- correct name
-        )
-        audit = Auditing(
-            id=uid,
-            type="video",
-            classification=result.get("prediction") or "NaN",
-            ext=ext,
-            confidence=result.get("confidence") or "NaN",
-        )
-        session.add(audit)
-        session.commit()
+        upload = await save_upload(file, video_path, MAX_VIDEO_BYTES)
+        result = await executor.run_io(result_cache.get, "video", model_id, upload.digest)
+        if result is None:
+            async with executor.slot("video"):
+                embedding_cache.bind(registry.identity("video"))
+                model = await executor.run(registry.get, "video")
+                result = await _score_video(model, video_path)
+            await executor.run_io(result_cache.put, "video", model_id, upload.digest, result)
+        audit_writer.write(prediction_record(
+            "video", result, id=uid, ext=ext, latency_ms=(time.perf_counter() - start) * 1000.0,
+        ))
 
         return {
             "prediction": result.get("prediction"),
             "confidence": result.get("confidence"),
             "probability_fake": result.get("probability_fake"),
+            "frames_used": result.get("frames_used"),
+            **({"tracks": result["tracks"]} if "tracks" in result else {}),
         }
 
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=501, detail=str(exc))
     finally:
         file.file.close()
         video_path.unlink(missing_ok=True)
 
+
+@app.post("/predict-video/batch")
+async def predict_video_batch(files: List[UploadFile] = File(...)):
+    """
+    Several videos in one request, scored one after another under a single
+    video admission slot. Results come back in upload order.
+    """
+    start = time.perf_counter()
+    if len(files) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has more than {MAX_BATCH_ITEMS} items")
+
+    model_id = _video_model_id()
+    paths = [UPLOAD_DIR / f"{uuid.uuid4().hex}{Path(f.filename).suffix}" for f in files]
+    results: list = [None] * len(files)
+    try:
+        uploads = []
+        for i, (file, path) in enumerate(zip(files, paths)):
+            try:
+                upload = await save_upload(file, path, MAX_VIDEO_BYTES)
+            except HTTPException as exc:
+                results[i] = _item_error(i, exc, filename=file.filename)
+                continue
+            cached = await executor.run_io(result_cache.get, "video", model_id, upload.digest)
+            if cached is not None:
+                results[i] = {"index": i, "filename": file.filename, **cached}
+            else:
+                uploads.append((i, upload))
+
+        if uploads:
+            async with executor.slot("video"):
+                embedding_cache.bind(registry.identity("video"))
+                model = await executor.run(registry.get, "video")
+                for i, upload in uploads:
+                    filename = files[i].filename
+                    try:
+                        result = await _score_video(model, upload.path)
+                    except Exception as exc:
+                        results[i] = _item_error(i, exc, filename=filename)
+                        continue
+                    await executor.run_io(result_cache.put, "video", model_id, upload.digest, result)
+                    results[i] = {"index": i, "filename": filename, **result}
+
+        return _batch_response("video", results, start)
+
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    finally:
+        for file, path in zip(files, paths):
+            file.file.close()
+            path.unlink(missing_ok=True)
+
 @app.post("/predict-news")
-async def predict_news(session: SessionDep, request: InformationRequest):
+async def predict_news(request: InformationRequest):
+    start = time.perf_counter()
     uid = uuid.uuid4().hex
-    result: InformationResponse = guess_news(request.text)
-    audit = Auditing(
+    async with executor.slot("news"):
+        result: InformationResponse = await executor.run(guess_news, request.text)
+    audit_writer.write(record(
+        "news",
         id=uid,
-        type="news",
         classification=result.classification,
         reason=result.reason,
-    )
-    session.add(audit)
-    session.commit()
-    return result
\ No newline at end of file
+        latency_ms=(time.perf_counter() - start) * 1000.0,
+    ))
+    return result
+
+
+@app.post("/predict-news/batch")
+async def predict_news_batch(request: InformationBatchRequest):
+    """
+    A list of claims, checked `NEWS_BATCH_CONCURRENCY` at a time, each
+    under its own news admission slot. Results come back in input order
+    with the fields of /predict-news; a claim that cannot get a slot
+    carries the 429/503 detail as its `error`.
+    """
+    start = time.perf_counter()
+    if len(request.claims) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has more than {MAX_BATCH_ITEMS} items")
+
+    gate = asyncio.Semaphore(NEWS_BATCH_CONCURRENCY)
+
+    async def check(i: int, claim: str) -> dict:
+        async with gate:
+            try:
+                async with executor.slot("news"):
+                    result: InformationResponse = await executor.run(guess_news, claim)
+            except Exception as exc:
+                return _item_error(i, exc)
+        if result.classification == "ERROR":
+            return {"index": i, "error": result.reason}
+        return {"index": i, **result.model_dump()}
+
+    results = await asyncio.gather(*(check(i, c) for i, c in enumerate(request.claims)))
+    return _batch_response("news", list(results), start)
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes `stack` once it is done sending, however
+    it ends: a client that disconnects before the body is iterated never
+    runs the generator's own `finally`.
+    """
+
+    def __init__(self, content, stack: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.stack = stack
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.stack.aclose()
+
+
+@app.post("/predict-news/stream")
+async def predict_news_stream(request: InformationRequest):
+    """
+    NDJSON stream of `progress` events, an early `verdict` event and a
+    final `result` carrying the same fields as /predict-news.
+    """
+    start = time.perf_counter()
+    uid = uuid.uuid4().hex
+    # take the admission slot up front so saturation is still a 429/503
+    stack = AsyncExitStack()
+    await stack.enter_async_context(executor.slot("news"))
+
+    async def events():
+        result = None
+        try:
+            async for event in iterate_in_threadpool(stream_news(request.text)):
+                if event["event"] == "result":
+                    result = event
+                yield json.dumps(event) + "\n"
+        finally:
+            await stack.aclose()
+
+        if result is not None:
+            audit_writer.write(record(
+                "news",
+                id=uid,
+                classification=result["classification"],
+                reason=result["reason"],
+                latency_ms=(time.perf_counter() - start) * 1000.0,
+            ))
+
+    return ReleasingStreamingResponse(events(), stack, media_type="application/x-ndjson")
+
+
+# --------------------------------------------------------------------------- #
+#  Video jobs
+# --------------------------------------------------------------------------- #
+@app.post("/jobs/video", status_code=202)
+async def submit_video_job(file: UploadFile = File(...)):
+    """
+    Queues a video for the job workers and returns its id at once. Poll
+    GET /jobs/{job_id} for progress and the result.
+    """
+    if job_queue.depth()["queued"] >= JOB_MAX_QUEUED:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many queued video jobs",
+            headers={"Retry-After": "30"},
+        )
+
+    job_id = uuid.uuid4().hex
+    ext = Path(file.filename).suffix
+    path = JOB_DIR / f"{job_id}{ext}"
+    model_id = _video_model_id()
+    try:
+        upload = await save_upload(file, path, MAX_VIDEO_BYTES)
+        result = await executor.run_io(result_cache.get, "video", model_id, upload.digest)
+        if result is not None:
+            path.unlink(missing_ok=True)
+        job = job_queue.submit(
+            path, digest=upload.digest, model_id=model_id, ext=ext, result=result, job_id=job_id,
+        )
+        return view(job, job_queue)
+
+    except HTTPException:
+        path.unlink(missing_ok=True)
+        raise
+    except Exception as exc:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=501, detail=str(exc))
+    finally:
+        file.file.close()
+
+
+@app.get("/jobs")
+def job_depth():
+    """Queue depth per status, e.g. for autoscaling the workers."""
+    return {**job_queue.depth(), **job_workers.stats()}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0):
+    """Job status; with `wait` > 0, long-polls up to that many seconds for a change."""
+    job = await job_queue.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return view(job, job_queue)
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return view(job, job_queue)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+import bisect
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# === CONFIG ===
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# also emit an OpenTelemetry span per stage (exported over OTLP, see setup_tracing)
+METRICS_OTEL = os.getenv("METRICS_OTEL", "0") == "1"
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "deepfake-detection")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+TOKEN_BUCKETS = (64, 128, 256, 384, 512, 768, 1024, 2048, 4096)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str, quote: bool = True) -> str:
+    """Text-format escaping: backslash and newline, plus `"` in label values."""
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+
+def _fmt_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Exposition lines, one per sample."""
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {_escape(self.help, quote=False)}\n# TYPE {self.name} {self.kind}\n"
+        return head + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """In-flight gauge: +1 for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._values: Dict[Labels, Tuple[list, list]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][i] += 1
+            entry[1][0] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(total))) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, c in zip((*self.buckets, "+Inf"), counts):
+                cumulative += c
+                le = 'le="%s"' % (bound if bound == "+Inf" else _fmt_value(bound))
+                yield f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(total[0])}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cumulative}"
+
+
+class CallbackMetric(_Metric):
+    """
+    Values read at scrape time from `fn() -> {label values: number}`, so
+    counters that components already keep cost nothing on the hot path.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], fn: Callable[[], Dict[Labels, float]], kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self) -> Iterator[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return
+        for key, v in sorted(values.items()):
+            if v is not None:
+                yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(m.render() for m in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "pipeline_stage_seconds", "Wall time per pipeline stage", ["stage"],
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "model_batch_size", "Items per model forward pass", ["model"], buckets=BATCH_BUCKETS,
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_seconds", "HTTP request latency by route", ["method", "route", "status"],
+))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "llm_prompt_tokens", "Estimated prompt tokens per fact-check LLM call", buckets=TOKEN_BUCKETS,
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ["method"],
+))
+
+
+# --------------------------------------------------------------------------- #
+#  Stage timing
+# --------------------------------------------------------------------------- #
+_tracer = None
+
+
+def setup_tracing() -> None:
+    """
+    Installs an OTLP-exporting tracer provider when METRICS_OTEL is set.
+    The exporter honours the standard OTEL_EXPORTER_OTLP_* variables.
+    """
+    global _tracer
+    if not METRICS_OTEL:
+        return
+    from opentelemetry import trace
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(OTEL_SERVICE_NAME)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times a block into `pipeline_stage_seconds{stage=name}` (and a span)."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    if _tracer is not None:
+        with _tracer.start_as_current_span(name):
+            try:
+                yield
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+        return
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    """For stages that cannot be wrapped in `stage`, e.g. spanning generator yields."""
+    if METRICS_ENABLED:
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def observe_batch(model: str, size: int) -> None:
+    if METRICS_ENABLED:
+        BATCH_SIZE.observe(size, model=model)
+
+
+def observe_prompt(tokens: int) -> None:
+    if METRICS_ENABLED:
+        PROMPT_TOKENS.observe(tokens)
+
+
+def register_stats(name: str, help: str, label: str, fn: Callable[[], Dict[str, Optional[float]]], kind: str = "gauge") -> None:
+    """Exposes one number per key of a component's `stats()`-style dict."""
+    REGISTRY.register(CallbackMetric(
+        name, help, [label], lambda: {(k,): v for k, v in fn().items()}, kind,
+    ))
+
+
+# --------------------------------------------------------------------------- #
+#  HTTP
+# --------------------------------------------------------------------------- #
+class MetricsMiddleware:
+    """Request latency per route template and in-flight requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        with IN_FLIGHT.track(method=method):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                REQUEST_SECONDS.observe(
+                    time.perf_counter() - start,
+                    method=method,
+                    # the template, not the raw path, keeps label cardinality bounded
+                    route=getattr(route, "path", "unmatched"),
+                    status=str(status),
+                )
@@ -1,19 +1,36 @@
 from __future__ import annotations
+import threading
+import time
 import cv2
 import numpy as np
 import torch
 import torch.nn as nn
 import torchvision.models as models
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Optional, Sequence, Tuple
 from ultralytics import YOLO
 
+from backends import INFERENCE_BACKEND, apply_backend
+from cache import weights_identity
+from embeddings import EmbeddingCache, embed_faces
+from metrics import observe_batch, stage
+from sampling import (
+    FRAME_SAMPLER,
+    STRATEGIES,
+    choose_strategy,
+    keyframes_for,
+    sample_frames,
+    sample_indices,
+    uniform_indices,
+)
+from tracking import TRACK_DETECT_EVERY, TRACK_MAX_TRACKS, TRACK_MIN_LEN, build_tracks
+
 
 class Backbone(nn.Module):
     def __init__(self, pretrained: bool = True):
         super().__init__()
         self.model = models.efficientnet_v2_l(
-            weights=models.EfficientNet_V2_L_Weights.DEFAULT
+            weights=models.EfficientNet_V2_L_Weights.DEFAULT if pretrained else None
         )
         self.out_features = 1280
         self.model.classifier = nn.Identity()
@@ -42,26 +59,32 @@ class Temporal(nn.Module):
 
 
 class VideoClassifier(nn.Module):
-    def __init__(self):
+    def __init__(self, pretrained: bool = True):
         super().__init__()
-        self.backbone = Backbone(pretrained=True)
+        self.backbone = Backbone(pretrained=pretrained)
         self.temporal = Temporal(input_dim=self.backbone.out_features)
         self.fc = nn.Linear(128, 1)
 
+    def extract_features(self, x: torch.Tensor) -> torch.Tensor:
+        return self.backbone(x)                  # (N, C, H, W) -> (N, 1280)
+
+    def classify_features(self, feats: torch.Tensor) -> torch.Tensor:
+        x = self.temporal(feats)                 # (B, T, 1280) -> (B, 128)
+        x = self.fc(x)                           # (B, 1)
+        return x
+
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         B, T, C, H, W = x.shape
         x = x.view(B * T, C, H, W)                # (B*T, C, H, W)
-        feats = self.backbone(x)                 # (B*T, 1280)
+        feats = self.extract_features(x)         # (B*T, 1280)
         feats = feats.view(B, T, -1)              # (B, T, 1280)
-        x = self.temporal(feats)                 # (B, 128)
-        x = self.fc(x)                           # (B, 1)
-        return x
+        return self.classify_features(feats)
 
 
 class ImageClassifier(nn.Module):
-    def __init__(self, dropout: float = 0.3):
+    def __init__(self, dropout: float = 0.3, pretrained: bool = True):
         super().__init__()
-        self.backbone = Backbone(pretrained=True)
+        self.backbone = Backbone(pretrained=pretrained)
         self.dropout = nn.Dropout(dropout)
         self.fc1 = nn.Linear(self.backbone.out_features, 512)
         self.fc2 = nn.Linear(512, 256)
@@ -78,60 +101,333 @@ class ImageClassifier(nn.Module):
         return x
 
 
+# --------------------------------------------------------------------------- #
+#  Model registry
+# --------------------------------------------------------------------------- #
+MODEL_CLASSES = {"video": VideoClassifier, "image": ImageClassifier}
+
+
+def _build_from_checkpoint(
+    cls: type[nn.Module],
+    path: str | Path,
+    device: torch.device | str,
+) -> nn.Module:
+    """
+    Builds `cls` without ImageNet weights on the meta device and assigns
+    the checkpoint tensors directly. On CPU the parameters stay backed by
+    the mmap'd file, so pages are shared between worker processes.
+    """
+    state = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    with torch.device("meta"):
+        model = cls(pretrained=False)
+    model.load_state_dict(state, assign=True)
+    return model.to(device).eval()
+
+
+def share_identical_tensors(src: nn.Module, dst: nn.Module) -> Tuple[int, int]:
+    """
+    Points every parameter/buffer of `dst` that is bit-identical to the one
+    with the same name in `src` at the `src` tensor. Returns (count, bytes)
+    of tensors now shared.
+    """
+    src_tensors = dict(src.named_parameters())
+    src_tensors.update(src.named_buffers())
+
+    shared = nbytes = 0
+    for name, tensor in [*dst.named_parameters(), *dst.named_buffers()]:
+        other = src_tensors.get(name)
+        if (
+            other is None
+            or other is tensor
+            or other.shape != tensor.shape
+            or other.dtype != tensor.dtype
+            or not torch.equal(other, tensor)
+        ):
+            continue
+
+        prefix, _, leaf = name.rpartition(".")
+        owner = dst.get_submodule(prefix)
+        if leaf in owner._parameters:
+            owner._parameters[leaf] = other
+        else:
+            owner._buffers[leaf] = other
+        shared += 1
+        nbytes += tensor.numel() * tensor.element_size()
+    return shared, nbytes
+
+
+class ModelRegistry:
+    """
+    Lazily loads the classifiers on first request (thread-safe) and, once
+    both are resident, shares any backbone tensors the two checkpoints
+    have in common. Non-eager `backend`s (see `backends.py`) are CPU only
+    and replace the eager module, so nothing is shared for them.
+    `preloaded` models (e.g. handed over by `serve.py`) are used as is.
+    Each model's weights identity is taken once, see `identity`.
+    """
+
+    def __init__(
+        self,
+        device: torch.device | str,
+        video_path: str = "models/video_model.pt",
+        image_path: str = "models/image_model.pt",
+        backend: str = INFERENCE_BACKEND,
+        preloaded: Optional[dict[str, nn.Module]] = None,
+    ):
+        if backend != "eager" and torch.device(device).type != "cpu":
+            raise ValueError(f"Inference backend {backend!r} only runs on CPU")
+        self.device = device
+        self.backend = backend
+        self.paths = {"video": video_path, "image": image_path}
+        self._models: dict[str, nn.Module] = dict(preloaded or {})
+        self._preloaded = sorted(self._models)
+        self._identities: dict[str, str] = {}
+        self._load_seconds: dict[str, float] = {}
+        self._shared = (0, 0)
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> nn.Module:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                start = time.perf_counter()
+                model = _build_from_checkpoint(MODEL_CLASSES[name], self.paths[name], self.device)
+                self._models[name] = apply_backend(model, name, self.backend, identity=self.identity(name))
+                self._load_seconds[name] = time.perf_counter() - start
+                if self.backend == "eager" and len(self._models) == len(MODEL_CLASSES):
+                    self._shared = share_identical_tensors(
+                        self._models["image"].backbone, self._models["video"].backbone
+                    )
+            return self._models[name]
+
+    def identity(self, name: str) -> str:
+        """
+        `weights_identity` of the checkpoint behind `name`, taken the first
+        time it is asked for or loaded and then kept: the resident model
+        never reloads, so later changes on disk do not apply to it.
+        """
+        identity = self._identities.get(name)
+        if identity is None:
+            identity = self._identities.setdefault(name, weights_identity(self.paths[name]))
+        return identity
+
+    def stats(self) -> dict:
+        count, nbytes = self._shared
+        return {
+            "backend": self.backend,
+            "loaded": sorted(self._models),
+            "preloaded": self._preloaded,
+            "load_seconds": {k: round(v, 3) for k, v in self._load_seconds.items()},
+            "shared_backbone_tensors": count,
+            "shared_backbone_mb": round(nbytes / 2**20, 1),
+        }
+
+
 def load_models(
     device: torch.device | str,
     video_path: str = "models/video_model.pt",
     image_path: str = "models/image_model.pt",
+    backend: str = INFERENCE_BACKEND,
 ) -> Tuple[VideoClassifier, ImageClassifier]:
     """Load both models and put them in eval mode."""
-    video_model = VideoClassifier().to(device)
-    video_model.load_state_dict(torch.load(video_path, map_location=device))
-    video_model.eval()
+    registry = ModelRegistry(device, video_path=video_path, image_path=image_path, backend=backend)
+    return registry.get("video"), registry.get("image")
 
-    image_model = ImageClassifier().to(device)
-    image_model.load_state_dict(torch.load(image_path, map_location=device))
-    image_model.eval()
 
-    return video_model, image_model
+class SerializedDetector:
+    """
+    A YOLO model shared by several threads. Ultralytics predictors keep
+    per-call state on the model and are not thread-safe, so calls take a
+    lock; everything else is passed through to the wrapped model.
+    """
 
+    def __init__(self, model: YOLO):
+        self.model = model
+        self._lock = threading.Lock()
 
-def extract_face(
-    frame_rgb: np.ndarray,
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self.model(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self.model, name)
+
+
+def extract_faces(
+    frames_rgb: Sequence[np.ndarray] | np.ndarray,
     img_size: int = 160,
     *,
     face_detector: YOLO,
+    out: Optional[np.ndarray] = None,
+    found: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
-    Returns a pre-processed face (float32, [-1, 1]) or a resized fallback.
+    Batched face extraction: one YOLO call for all frames, then the largest
+    box per frame is cropped and resized into a (T, H, W, C) float32 array
+    in [-1, 1]. Frames without a usable face fall back to the resized frame.
+    Pass `out` to have the result written into a preallocated buffer, and
+    a bool array as `found` to receive which frames had a face.
     """
-    results = face_detector(frame_rgb, verbose=False, conf=0.5)
+    frames = list(frames_rgb)
+    n = len(frames)
+    if out is None:
+        out = np.empty((n, img_size, img_size, 3), dtype=np.float32)
+    elif out.shape[0] < n or out.shape[1:] != (img_size, img_size, 3):
+        raise ValueError(f"Output buffer {out.shape} too small for {n} frames of {img_size}px")
+    if n == 0:
+        return out[:0]
+
+    with stage("faces.detect"):
+        results = face_detector(frames, verbose=False, conf=0.5)
+
+    # largest box per frame, selected over all detections at once
+    per_frame = [
+        r.boxes.xyxy.cpu().numpy() if r.boxes is not None else np.empty((0, 4), np.float32)
+        for r in results
+    ]
+    counts = np.array([len(b) for b in per_frame])
+    has_face = counts > 0
+    best = np.zeros((n, 4), dtype=np.float32)
+    if has_face.any():
+        boxes = np.concatenate(per_frame)
+        frame_ids = np.repeat(np.arange(n), counts)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        order = np.lexsort((areas, frame_ids))        # by frame, then area
+        last = np.cumsum(counts) - 1                  # largest area per frame
+        best[has_face] = boxes[order[last[has_face]]]
+
+    # clamp to image bounds
+    best = best.astype(int)
+    sizes = np.array([f.shape[:2] for f in frames])   # (n, 2) -> h, w
+    best[:, [0, 2]] = np.clip(best[:, [0, 2]], 0, sizes[:, 1:2])
+    best[:, [1, 3]] = np.clip(best[:, [1, 3]], 0, sizes[:, 0:1])
+    has_face &= (best[:, 2] > best[:, 0]) & (best[:, 3] > best[:, 1])
+    if found is not None:
+        found[:n] = has_face
+
+    return crop_faces(frames, best, has_face, img_size, out=out)
+
+
+def crop_faces(
+    frames_rgb: Sequence[np.ndarray],
+    boxes: np.ndarray,
+    valid: np.ndarray,
+    img_size: int = 160,
+    *,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Crops integer, in-bounds (n, 4) xyxy `boxes` where `valid` (whole frame
+    elsewhere) and resizes them into a (n, H, W, C) float32 array in [-1, 1].
+    """
+    n = len(frames_rgb)
+    if out is None:
+        out = np.empty((n, img_size, img_size, 3), dtype=np.float32)
+
+    with stage("faces.crop"):
+        crops = np.empty((n, img_size, img_size, 3), dtype=np.uint8)
+        for i, frame in enumerate(frames_rgb):
+            if valid[i]:
+                x1, y1, x2, y2 = boxes[i]
+                frame = frame[y1:y2, x1:x2]
+            cv2.resize(frame, (img_size, img_size), dst=crops[i])
 
-    if results and results[0].boxes is not None:
-        boxes = results[0].boxes.xyxy.cpu().numpy()
-        if len(boxes) > 0:
-            areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
-            x1, y1, x2, y2 = boxes[np.argmax(areas)].astype(int)
-            # clamp to image bounds
-            h, w = frame_rgb.shape[:2]
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(w, x2), min(h, y2)
+        target = out[:n]
+        np.divide(crops, np.float32(127.5), out=target)
+        target -= 1.0
+    return target
 
-            face = frame_rgb[y1:y2, x1:x2]
-            if face.size > 0:
-                face = cv2.resize(face, (img_size, img_size))
-                return (face.astype(np.float32) / 127.5) - 1.0
 
-    fallback = cv2.resize(frame_rgb, (img_size, img_size))
-    return (fallback.astype(np.float32) / 127.5) - 1.0
+def extract_face(
+    frame_rgb: np.ndarray,
+    img_size: int = 160,
+    *,
+    face_detector: YOLO,
+) -> np.ndarray:
+    """
+    Returns a pre-processed face (float32, [-1, 1]) or a resized fallback.
+    """
+    return extract_faces([frame_rgb], img_size, face_detector=face_detector)[0]
 
 
 # --------------------------------------------------------------------------- #
 #  Image inference
 # --------------------------------------------------------------------------- #
+def decode_image(image: str | Path | bytes) -> np.ndarray:
+    """Reads an image from disk or straight from an in-memory buffer as RGB."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        img = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        source = "<buffer>"
+    else:
+        img = cv2.imread(str(image))
+        source = image
+    if img is None:
+        raise ValueError(f"Cannot read image: {source}")
+
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def prepare_image(
+    image: str | Path | bytes,
+    img_size: int = 160,
+    *,
+    face_detector: YOLO,
+) -> np.ndarray:
+    """
+    Reads an image (path or encoded bytes) and returns its pre-processed
+    face as (H, W, C) float32.
+    """
+    rgb = decode_image(image)
+    return extract_face(rgb, img_size, face_detector=face_detector)
+
+
+def prepare_images(
+    images: Sequence[str | Path | bytes],
+    img_size: int = 160,
+    *,
+    face_detector: YOLO,
+    batch_size: int = 16,
+) -> list[np.ndarray | Exception]:
+    """
+    Batch counterpart of `prepare_image`, one detector call per `batch_size`
+    images. Returns one entry per input, in order: its (H, W, C) face or
+    the exception decoding it raised.
+    """
+    results: list[np.ndarray | Exception | None] = [None] * len(images)
+    for start in range(0, len(images), batch_size):
+        decoded = []
+        for i in range(start, min(start + batch_size, len(images))):
+            try:
+                with stage("image.decode"):
+                    decoded.append((i, decode_image(images[i])))
+            except Exception as exc:
+                results[i] = exc
+        if decoded:
+            faces = extract_faces([rgb for _, rgb in decoded], img_size, face_detector=face_detector)
+            for (i, _), face in zip(decoded, faces):
+                results[i] = face
+    return results
+
+
+def format_prediction(prob_fake: float, prob_key: str = "probability") -> dict:
+    """Turns a fake-probability into the response dict shared by all endpoints."""
+    prediction = "FAKE" if prob_fake >= 0.5 else "REAL"
+    confidence = prob_fake if prediction == "FAKE" else (1 - prob_fake)
+
+    return {
+        "prediction": prediction,
+        "confidence": f"{confidence:.2%}",
+        prob_key: f"{prob_fake:.4f}",
+    }
+
+
 def guess_image(
     *,
     model: ImageClassifier,
-    image_path: str | Path,
+    image_path: str | Path | bytes,
     device: torch.device | str,
     face_detector: YOLO,
     img_size: int = 160,
@@ -145,12 +441,7 @@ def guess_image(
         }
     """
     model.eval()
-    img = cv2.imread(str(image_path))
-    if img is None:
-        raise ValueError(f"Cannot read image: {image_path}")
-
-    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    face = extract_face(rgb, img_size, face_detector=face_detector)
+    face = prepare_image(image_path, img_size, face_detector=face_detector)
 
     tensor = (
         torch.from_numpy(face)
@@ -160,88 +451,460 @@ def guess_image(
         .to(device)
     )
 
-    with torch.no_grad():
+    with torch.no_grad(), stage("image.forward"):
         logit = model(tensor)                     # (1, 1)
         prob_fake = torch.sigmoid(logit).item()
 
-    prediction = "FAKE" if prob_fake >= 0.5 else "REAL"
-    confidence = prob_fake if prediction == "FAKE" else (1 - prob_fake)
+    return format_prediction(prob_fake)
 
-    return {
-        "prediction": prediction,
-        "confidence": f"{confidence:.2%}",
-        "probability": f"{prob_fake:.4f}",
-    }
+
+def guess_images(
+    images: Sequence[str | Path | bytes],
+    *,
+    model: ImageClassifier,
+    device: torch.device | str,
+    face_detector: YOLO,
+    img_size: int = 160,
+    batch_size: int = 16,
+) -> list[dict | Exception]:
+    """
+    Batch counterpart of `guess_image`: images are decoded, face-detected
+    and classified `batch_size` at a time. Returns one entry per input, in
+    order, holding either the prediction dict or the exception that item
+    raised, so one bad file does not fail the batch.
+    """
+    model.eval()
+    results: list[dict | Exception | None] = [None] * len(images)
+
+    for start in range(0, len(images), batch_size):
+        decoded = []
+        for i in range(start, min(start + batch_size, len(images))):
+            try:
+                with stage("image.decode"):
+                    decoded.append((i, decode_image(images[i])))
+            except Exception as exc:
+                results[i] = exc
+        if not decoded:
+            continue
+
+        faces = extract_faces([rgb for _, rgb in decoded], img_size, face_detector=face_detector)
+        tensor = torch.from_numpy(faces).permute(0, 3, 1, 2).float().to(device)
+        observe_batch("image-bulk", len(decoded))
+        with torch.no_grad(), stage("image.forward"):
+            probs = torch.sigmoid(model(tensor)).view(-1).tolist()     # (B,)
+
+        for (i, _), prob_fake in zip(decoded, probs):
+            results[i] = format_prediction(prob_fake)
+
+    return results
 
 
 # --------------------------------------------------------------------------- #
 #  Video inference
 # --------------------------------------------------------------------------- #
-def guess_video(
+def decode_video(
+    video_path: str | Path,
+    num_frames: int = 20,
+    max_seq_len: int = 400,
+    sampler: str = FRAME_SAMPLER,
+) -> list[np.ndarray]:
+    """
+    Samples up to `num_frames` RGB frames from a video. Module-level and
+    model-free so it can run in a decode process pool.
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    try:
+        with stage("video.decode"):
+            keyframes = keyframes_for(video_path, cap, num_frames, max_seq_len, sampler)
+            frames = sample_frames(cap, num_frames, max_seq_len, strategy=sampler, keyframes=keyframes)
+        if not frames:
+            raise ValueError(f"No decodable frames in video: {video_path}")
+        return [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for _, frame in frames]
+
+    finally:
+        cap.release()          # <-- **critical** for Windows file-lock
+
+
+class LazyVideo:
+    """
+    The uniform `num_frames` sample of `decode_video`, decoded a subset at
+    a time through `take`, so early-exit scoring only decodes the stages it
+    reaches. The first subset uses the chosen sampler; later ones seek,
+    to the keyframe before each target when keyframes are known. Clips
+    without a usable frame count are decoded up front. Close it (or use it
+    as a context manager) to release the capture.
+    """
+
+    def __init__(
+        self,
+        video_path: str | Path,
+        num_frames: int = 20,
+        max_seq_len: int = 400,
+        sampler: str = FRAME_SAMPLER,
+    ):
+        if sampler not in STRATEGIES:
+            raise ValueError(f"Unknown frame sampler: {sampler!r}")
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(str(video_path))
+        if not self.cap.isOpened():
+            raise ValueError(f"Cannot open video: {video_path}")
+
+        self._frames: Optional[list[np.ndarray]] = None
+        self._stages = 0
+        with stage("video.decode"):
+            self.keyframes = keyframes_for(video_path, self.cap, num_frames, max_seq_len, sampler)
+            self.strategy = (
+                choose_strategy(self.cap, num_frames, max_seq_len, self.keyframes) if sampler == "auto" else sampler
+            )
+            total = min(int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)), max_seq_len)
+            if self.strategy == "timestamp" or total <= 0:
+                sampled = sample_frames(self.cap, num_frames, max_seq_len, strategy="timestamp")
+                self._frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for _, frame in sampled]
+                self.indices = np.arange(len(self._frames))
+            else:
+                self.indices = uniform_indices(total, num_frames)
+        if not len(self.indices):
+            self.close()
+            raise ValueError(f"No decodable frames in video: {video_path}")
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __enter__(self) -> "LazyVideo":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.cap.release()
+
+    def take(self, subset: np.ndarray) -> Tuple[np.ndarray, list[np.ndarray]]:
+        """RGB frames at the sorted sample positions `subset`, and the positions that decoded."""
+        if self._frames is not None:
+            return subset, [self._frames[i] for i in subset]
+
+        targets = self.indices[subset]
+        with stage("video.decode"):
+            if self._stages == 0:
+                frames = sample_indices(self.cap, targets, self.strategy, self.keyframes)
+            elif self.keyframes is not None:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                frames = sample_indices(self.cap, targets, "keyframe", self.keyframes)
+            else:
+                frames = sample_indices(self.cap, targets, "seek")
+        self._stages += 1
+
+        by_idx = dict(frames)
+        kept = np.array([i for i, t in zip(subset, targets) if int(t) in by_idx], dtype=subset.dtype)
+        if self._stages == 1 and not kept.size:
+            raise ValueError(f"No decodable frames in video: {self.video_path}")
+        return kept, [cv2.cvtColor(by_idx[int(self.indices[i])], cv2.COLOR_BGR2RGB) for i in kept]
+
+
+def classify_frames(
+    frames_rgb: Sequence[np.ndarray],
     *,
     model: VideoClassifier,
-    video_path: str | Path,
     device: torch.device | str,
     face_detector: YOLO,
     img_size: int = 160,
     num_frames: int = 20,
-    max_seq_len: int = 400,
+    embedding_cache: Optional[EmbeddingCache] = None,
+    progress: Optional[Callable[..., None]] = None,
 ) -> dict:
     """
-    Uniformly samples `num_frames` from the video, extracts faces,
-    runs the temporal model and returns the same dict shape as image.
+    Extracts faces from decoded frames and runs the temporal model. With an
+    `embedding_cache` the backbone and temporal head run as two stages and
+    repeated faces reuse their cached backbone features. `progress` is
+    called with keyword counters (e.g. `faces_found`) as stages complete.
     """
     model.eval()
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
-        raise ValueError(f"Cannot open video: {video_path}")
+    arr = np.empty((num_frames, img_size, img_size, 3), dtype=np.float32)
+    found = np.zeros(num_frames, dtype=bool)
+    faces = extract_faces(frames_rgb[:num_frames], img_size, face_detector=face_detector, out=arr, found=found)
+    if progress is not None:
+        progress(faces_found=int(found.sum()))
 
-    try:
-        total_frames = min(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), max_seq_len)
-        if total_frames <= 0:
-            return None
-
-        # uniform indices
-        indices = np.linspace(0, total_frames - 1, num_frames, dtype=int)
-
-        faces: list[np.ndarray] = []
-        for idx in indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-            ok, frame = cap.read()
-            if not ok:
-                continue
+    # pad with last face if we missed any
+    arr[len(faces):] = faces[-1]
+
+    skipped = 0
+    with torch.no_grad():
+        if embedding_cache is not None and hasattr(model, "extract_features"):
+            with stage("video.backbone"):
+                feats, skipped = embed_faces(arr, model, device, embedding_cache)
+            with stage("video.temporal"):
+                logit = model.classify_features(feats.unsqueeze(0))    # (1, 1)
+        else:
+            # (T, H, W, C) → (1, T, C, H, W)
+            tensor = (
+                torch.from_numpy(arr)
+                .permute(0, 3, 1, 2)
+                .unsqueeze(0)
+                .float()
+                .to(device)
+            )
+            observe_batch("video", num_frames)
+            with stage("video.model"):
+                logit = model(tensor)                     # (1, 1)
+        prob_fake = torch.sigmoid(logit).item()
 
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face = extract_face(rgb, img_size, face_detector=face_detector)
-            faces.append(face)
-
-        # pad with last face if we missed any
-        while len(faces) < num_frames:
-            faces.append(faces[-1])
-
-        # stack → (T, H, W, C) → (1, T, C, H, W)
-        arr = np.stack(faces[:num_frames])
-        tensor = (
-            torch.from_numpy(arr)
-            .permute(0, 3, 1, 2)
-            .unsqueeze(0)
-            .float()
-            .to(device)
+    return {
+        **format_prediction(prob_fake, "probability_fake"),
+        "frames_processed": num_frames,
+        "frames_used": num_frames,
+        "backbone_skipped": skipped,
+    }
+
+
+def adaptive_stages(total: int, initial: int, step: int) -> list[np.ndarray]:
+    """
+    Splits `total` time-ordered frame indices into coarse-to-fine stages of
+    `initial`, then `step` frames. Indices are visited in bit-reversed
+    (van der Corput) order, so every prefix is spread evenly over the clip.
+    """
+    bits = max(1, int(np.ceil(np.log2(max(total, 2)))))
+    idx = np.arange(total)
+    rev = np.zeros(total, dtype=np.int64)
+    for b in range(bits):
+        rev |= ((idx >> b) & 1) << (bits - 1 - b)
+    order = idx[np.argsort(rev, kind="stable")]
+
+    cuts = [*range(initial, total, step)]
+    return [np.sort(s) for s in np.split(order, cuts) if s.size]
+
+
+def classify_frames_adaptive(
+    frames_rgb: Sequence[np.ndarray],
+    *,
+    model: VideoClassifier,
+    device: torch.device | str,
+    face_detector: YOLO,
+    img_size: int = 160,
+    initial_frames: int = 8,
+    step: int = 8,
+    margin: float = 0.3,
+    embedding_cache: Optional[EmbeddingCache] = None,
+    progress: Optional[Callable[..., None]] = None,
+) -> dict:
+    """
+    Early-exit variant of `classify_frames`. Scores a small uniform subset
+    first and only adds frames (up to all of `frames_rgb`) while the
+    probability stays within `margin` of the 0.5 decision boundary. The
+    temporal head pools over time, so it accepts any number of frames.
+    Backbone features are computed once per frame and carried across stages.
+    With a `LazyVideo` as `frames_rgb`, only the stages reached are decoded.
+    """
+    if hasattr(frames_rgb, "take") and not hasattr(model, "extract_features"):
+        frames_rgb = frames_rgb.take(np.arange(len(frames_rgb)))[1]
+    if not hasattr(model, "extract_features"):
+        # exported / wrapped models cannot be split into stages
+        return classify_frames(
+            frames_rgb, model=model, device=device, face_detector=face_detector,
+            img_size=img_size, num_frames=len(frames_rgb), progress=progress,
         )
 
+    model.eval()
+    total = len(frames_rgb)
+    feats = torch.empty(total, model.backbone.out_features, device=device)
+    done = np.zeros(total, dtype=bool)
+    found = np.zeros(total, dtype=bool)
+    skipped = 0
+    prob_fake = 0.5
+
+    for subset in adaptive_stages(total, initial_frames, step):
+        if hasattr(frames_rgb, "take"):
+            subset, stage_frames = frames_rgb.take(subset)
+            if not subset.size:
+                continue
+        else:
+            stage_frames = [frames_rgb[i] for i in subset]
+        subset_found = np.zeros(len(subset), dtype=bool)
+        faces = extract_faces(stage_frames, img_size, face_detector=face_detector, found=subset_found)
+        found[subset] = subset_found
         with torch.no_grad():
-            logit = model(tensor)                     # (1, 1)
-            prob_fake = torch.sigmoid(logit).item()
+            with stage("video.backbone"):
+                if embedding_cache is not None:
+                    new, n_skipped = embed_faces(faces, model, device, embedding_cache)
+                    skipped += n_skipped
+                else:
+                    observe_batch("video-backbone", len(subset))
+                    batch = torch.from_numpy(faces).permute(0, 3, 1, 2).float().to(device)
+                    new = model.extract_features(batch)
+            feats[subset] = new
+            done[subset] = True
+
+            seq = feats[torch.from_numpy(np.flatnonzero(done))].unsqueeze(0)  # (1, k, 1280)
+            with stage("video.temporal"):
+                prob_fake = torch.sigmoid(model.classify_features(seq)).item()
+
+        if progress is not None:
+            progress(faces_found=int(found.sum()), frames_scored=int(done.sum()))
+        if abs(prob_fake - 0.5) >= margin:
+            break
+
+    used = int(done.sum())
+    return {
+        **format_prediction(prob_fake, "probability_fake"),
+        "frames_processed": used,
+        "frames_used": used,
+        "backbone_skipped": skipped,
+    }
 
-        prediction = "FAKE" if prob_fake >= 0.5 else "REAL"
-        confidence = prob_fake if prediction == "FAKE" else (1 - prob_fake)
 
-        return {
-            "prediction": prediction,
-            "confidence": f"{confidence:.2%}",
-            "probability_fake": f"{prob_fake:.4f}",
-            "frames_processed": len(faces),
-        }
+def classify_video_adaptive(
+    video_path: str | Path,
+    max_frames: int = 32,
+    max_seq_len: int = 400,
+    sampler: str = FRAME_SAMPLER,
+    **kwargs,
+) -> dict:
+    """`classify_frames_adaptive` over a `LazyVideo` of `video_path`."""
+    with LazyVideo(video_path, max_frames, max_seq_len, sampler) as frames:
+        return classify_frames_adaptive(frames, **kwargs)
 
-    finally:
-        cap.release()          # <-- **critical** for Windows file-lock
\ No newline at end of file
+
+def classify_frames_tracked(
+    frames_rgb: Sequence[np.ndarray],
+    *,
+    model: VideoClassifier,
+    device: torch.device | str,
+    face_detector: YOLO,
+    img_size: int = 160,
+    detect_every: int = TRACK_DETECT_EVERY,
+    min_len: int = TRACK_MIN_LEN,
+    max_tracks: int = TRACK_MAX_TRACKS,
+    embedding_cache: Optional[EmbeddingCache] = None,
+    progress: Optional[Callable[..., None]] = None,
+) -> dict:
+    """
+    Multi-face variant of `classify_frames`. Faces are detected on
+    keyframes only and followed in between (see `tracking.py`), so every
+    temporal sequence holds one identity. The `max_tracks` longest tracks
+    of at least `min_len` frames are scored and the video takes the most
+    fake one. Without any usable track the whole frames are scored.
+    """
+    model.eval()
+    tracks, detector_frames = build_tracks(frames_rgb, face_detector=face_detector, detect_every=detect_every)
+    scored = sorted((t for t in tracks if len(t) >= min_len), key=len, reverse=True)[:max_tracks]
+    if progress is not None:
+        covered = set().union(*(t.boxes for t in tracks)) if tracks else set()
+        progress(faces_found=len(covered), tracks=len(scored))
+
+    h, w = frames_rgb[0].shape[:2]
+    sequences, spans = [], []
+    for track in scored:
+        idx, boxes = track.span()
+        boxes = boxes.astype(int)
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, w)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, h)
+        valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        sequences.append(crop_faces([frames_rgb[i] for i in idx], boxes, valid, img_size))
+        spans.append(idx)
+    if not sequences:
+        n = len(frames_rgb)
+        sequences.append(crop_faces(frames_rgb, np.zeros((n, 4), int), np.zeros(n, bool), img_size))
+
+    skipped = 0
+    probs = []
+    with torch.no_grad():
+        if hasattr(model, "extract_features"):
+            # one backbone pass over every track's faces
+            faces = np.concatenate(sequences)
+            with stage("video.backbone"):
+                if embedding_cache is not None:
+                    feats, skipped = embed_faces(faces, model, device, embedding_cache)
+                else:
+                    observe_batch("video-backbone", len(faces))
+                    feats = model.extract_features(torch.from_numpy(faces).permute(0, 3, 1, 2).float().to(device))
+            with stage("video.temporal"):
+                for seq in torch.split(feats, [len(s) for s in sequences]):
+                    probs.append(torch.sigmoid(model.classify_features(seq.unsqueeze(0))).item())
+        else:
+            for seq in sequences:
+                tensor = torch.from_numpy(seq).permute(0, 3, 1, 2).unsqueeze(0).float().to(device)
+                observe_batch("video", len(seq))
+                with stage("video.model"):
+                    probs.append(torch.sigmoid(model(tensor)).item())
+
+    used = sum(len(s) for s in sequences)
+    if progress is not None:
+        progress(frames_scored=used)
+    return {
+        **format_prediction(max(probs), "probability_fake"),
+        "frames_processed": len(frames_rgb),
+        "frames_used": used,
+        "backbone_skipped": skipped,
+        "detector_frames": detector_frames,
+        "tracks": [
+            {
+                "track": track.id,
+                "first_frame": int(idx[0]),
+                "last_frame": int(idx[-1]),
+                "frames": len(idx),
+                **format_prediction(prob, "probability_fake"),
+            }
+            for track, idx, prob in zip(scored, spans, probs)
+        ],
+    }
+
+
+def guess_video(
+    *,
+    model: VideoClassifier,
+    video_path: str | Path,
+    device: torch.device | str,
+    face_detector: YOLO,
+    img_size: int = 160,
+    num_frames: int = 20,
+    max_seq_len: int = 400,
+    sampler: str = FRAME_SAMPLER,
+    adaptive: bool = False,
+    tracking: bool = False,
+    max_frames: int = 32,
+) -> dict:
+    """
+    Uniformly samples `num_frames` from the video (see `sampling.py` for
+    the decode strategies), extracts faces, runs the temporal model and
+    returns the same dict shape as image. With `adaptive`, up to
+    `max_frames` are decoded and scored coarse-to-fine, stage by stage,
+    with early exit. With `tracking` (which takes precedence),
+    `num_frames` is ignored: `max_frames` frames are decoded (the API
+    passes TRACK_FRAMES) and each face track is scored. No embedding
+    cache is used on any path here; `main._score_video` passes one.
+    """
+    if tracking:
+        frames = decode_video(video_path, max_frames, max_seq_len, sampler)
+        return classify_frames_tracked(
+            frames,
+            model=model,
+            device=device,
+            face_detector=face_detector,
+            img_size=img_size,
+        )
+
+    if adaptive:
+        return classify_video_adaptive(
+            video_path,
+            max_frames,
+            max_seq_len,
+            sampler,
+            model=model,
+            device=device,
+            face_detector=face_detector,
+            img_size=img_size,
+        )
+
+    frames = decode_video(video_path, num_frames, max_seq_len, sampler)
+    return classify_frames(
+        frames,
+        model=model,
+        device=device,
+        face_detector=face_detector,
+        img_size=img_size,
+        num_frames=num_frames,
+    )
@@ -1,19 +1,33 @@
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 import chromadb
 from chromadb.utils import embedding_functions
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from ddgs import DDGS
-from langchain_ollama import OllamaLLM, OllamaEmbeddings
 import os
 import re
+import time
+from pathlib import Path
+from clients import OllamaPool, PooledOllamaEmbeddings, PooledOllamaLLM
+from context import PROMPT_BODY, PROMPT_PREFIX, assemble, prompt_tokens
+from facts import FACTS_COLLECTION, fact_id, ingest_facts
+from lexical import LexicalIndex, ensure_synced, rrf
+from metrics import observe_prompt, observe_stage, stage
+from search import DDGSProvider, NewsRetriever
 from structures import InformationResponse
+from verdict_cache import VerdictCache
 
 # === CONFIG ONLY ===
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen3:0.6b")
 EMBEDDINGS = os.getenv("EMBEDDINGS", "nomic-embed-text:latest")
-MAX_WEB_RESULTS = int(os.getenv("MAX_WEB_RESULTS", "10"))
+# load both models on every Ollama endpoint at startup (see clients.OllamaPool.warm_up)
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./database")
+# trusted-facts retrieval: "hybrid" (BM25 + vectors, fused by RRF), "dense" or "lexical"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+FACTS_K = int(os.getenv("FACTS_K", "2"))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "10"))
+# read timeout per attempt for a claim embedding; on failure retrieval falls back to lexical-only
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "3"))
 
 TRUSTED_FACTS = [
     "Private credit markets have seen high-profile collapses like First Brands and Tricolor in 2025.",
@@ -27,63 +41,110 @@ collection = None
 llm = None
 prompt = None
 chain = None
+verdict_cache = None
+lexical_index = None
+ollama_pool = None
+# which rankings returned candidates; "none" when neither did
+retrieval_counts = {"hybrid": 0, "dense": 0, "lexical": 0, "none": 0, "embed_fallbacks": 0}
+# swap for NewsRetriever(StubSearchProvider(...)) to run without the network
+retriever = NewsRetriever(DDGSProvider())
 
-def init_mcp_resources(device: str = "cpu"):
-    """Initialize all MCP resources. Call ONCE during startup."""
-    global embeddings, vectorstore, collection, llm, prompt, chain
+def init_mcp_resources(
+    device: str = "cpu",
+    llm_override=None,
+    embeddings_override=None,
+    persist_dir=None,
+    seed: bool = True,
+):
+    """
+    Initialize all MCP resources. Call ONCE during startup.
+
+    `llm_override` / `embeddings_override` replace the Ollama models, e.g.
+    with LangChain's `FakeStreamingListLLM` / `DeterministicFakeEmbedding`
+    to exercise the chain without a model server; `persist_dir` points
+    Chroma somewhere other than CHROMA_PERSIST_DIR. With `seed=False` the
+    facts and lexical index are only read: `seed_facts` already ran once
+    elsewhere (serve.py's parent).
+    """
+    global embeddings, vectorstore, collection, llm, prompt, chain, verdict_cache, lexical_index, ollama_pool
+
+    if embeddings_override is None or llm_override is None:
+        # one keep-alive, health-checked client for every Ollama call
+        ollama_pool = OllamaPool()
+        if OLLAMA_WARMUP:
+            for url, status in ollama_pool.warm_up(
+                OLLAMA_MODEL if llm_override is None else None,
+                EMBEDDINGS if embeddings_override is None else None,
+            ).items():
+                print(f"{'✓' if status == 'ok' else '✗'} Ollama warm-up {url}: {status}")
+    embeddings = embeddings_override or PooledOllamaEmbeddings(ollama_pool, EMBEDDINGS, query_timeout=EMBED_TIMEOUT)
+    persist_dir = persist_dir or CHROMA_PERSIST_DIR
+    chroma_client = chromadb.PersistentClient(path=persist_dir)
 
-    embeddings = OllamaEmbeddings(model=EMBEDDINGS)
-    chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
-    
     # Create or get collection with embedding function
     collection = chroma_client.get_or_create_collection(
-        name="trusted_facts",
+        name=FACTS_COLLECTION,
         metadata={"hnsw:space": "cosine"}
     )
-
-    # Seed facts if empty
-    if collection.count() == 0:
-        # Generate embeddings for trusted facts
-        fact_embeddings = [embeddings.embed_query(fact) for fact in TRUSTED_FACTS]
-        
-        collection.add(
-            documents=TRUSTED_FACTS,
-            embeddings=fact_embeddings,
-            ids=[f"fact_{i}" for i in range(len(TRUSTED_FACTS))],
-            metadatas=[{"source": "verified", "type": "baseline"} for _ in TRUSTED_FACTS]
-        )
-        print("✓ Seeded trusted facts into Chroma")
+    if seed:
+        seed_facts(collection, embeddings, persist_dir)
+    lexical_index = LexicalIndex(Path(persist_dir) / "lexical")
 
     vectorstore = collection  # Keep reference for compatibility
+    verdict_cache = VerdictCache(chroma_client)
 
-    llm = OllamaLLM(model=OLLAMA_MODEL, temperature=0.0)
-
-    prompt_template = PromptTemplate.from_template(
-        """You are a news fact-checker. Analyze the claim against retrieved information from the web.
+    llm = llm_override or PooledOllamaLLM(pool=ollama_pool, model=OLLAMA_MODEL, temperature=0.0)
 
-WEB ARTICLES:
-{web_context}
+    # static instructions first, so every prompt shares a cacheable prefix (see context.py)
+    prompt_template = PromptTemplate.from_template(PROMPT_PREFIX + PROMPT_BODY)
 
-TRUSTED FACTS:
-{static_context}
-
-CLAIM TO VERIFY:
-{claim}
+    chain = prompt_template | llm | StrOutputParser()
 
-Rules:
-1. If web articles from credible sources confirm the claim with specific details, return REAL
-2. If web articles contradict the claim, if the claim is absurd/impossible, or if no credible sources found for a significant claim, return FAKE
-3. If there is insufficient information to verify, return UNVERIFIED
-4. Be especially skeptical of sensational claims about celebrities, disasters, or unlikely events
-5. Consider the plausibility of the claim itself
 
-Respond ONLY in this format:
-VERDICT: [REAL/FAKE/UNVERIFIED]
-REASON: [One sentence explanation with source if available]
-"""
-    )
+def seed_facts(collection=None, embeddings_override=None, persist_dir=None) -> None:
+    """
+    Seeds the baseline trusted facts and brings the lexical index in line
+    with the collection. Writes to Chroma and rewrites the index directory,
+    so run it from one process only: `init_mcp_resources` does for a
+    single API process, serve.py once before spawning its workers.
+    """
+    persist_dir = persist_dir or CHROMA_PERSIST_DIR
+    pool = None
+    if embeddings_override is None:
+        pool = ollama_pool or OllamaPool()
+    try:
+        fact_embeddings = embeddings_override or PooledOllamaEmbeddings(pool, EMBEDDINGS)
+        if collection is None:
+            collection = chromadb.PersistentClient(path=persist_dir).get_or_create_collection(
+                name=FACTS_COLLECTION,
+                metadata={"hnsw:space": "cosine"}
+            )
+        lexical = LexicalIndex(Path(persist_dir) / "lexical")
 
-    chain = prompt_template | llm | StrOutputParser()
+        # Seed the baseline facts; incremental, so only new / edited ones are embedded.
+        # Larger corpora are loaded with `python -m facts ingest`.
+        collection.delete(ids=[f"fact_{i}" for i in range(len(TRUSTED_FACTS))])   # pre-hash ids
+        seeded = ingest_facts(
+            collection,
+            fact_embeddings,
+            [
+                {"id": fact_id(f, "baseline"), "text": f, "delete": False, "metadata": {"source": "verified", "type": "baseline"}}
+                for f in TRUSTED_FACTS
+            ],
+            dataset="baseline",
+            # scoped like the ids, so sync also drops facts stored under unscoped ids
+            version=fact_id("\n".join(TRUSTED_FACTS), "baseline").removeprefix("fact_"),
+            sync=True,
+            lexical=lexical,
+        )
+        if seeded["embedded"]:
+            print(f"✓ Seeded {seeded['embedded']} trusted facts into Chroma")
+        # e.g. first start with an existing collection, or facts loaded without the index
+        if ensure_synced(lexical, collection):
+            print(f"✓ Rebuilt lexical index ({len(lexical)} facts)")
+    finally:
+        if pool is not None and pool is not ollama_pool:
+            pool.close()
 
 
 def extract_keywords(text: str) -> str:
@@ -96,100 +157,151 @@ def extract_keywords(text: str) -> str:
 
 def fetch_news_multi_source(query: str) -> List[Dict]:
     """Fetch from multiple news sources covering various topics"""
-    results = []
-    
-    # General news sources for diverse topics
-    sources = [
-        "site:deccanherald.com OR site:news.google.com OR site:thehindu.com"
-        "site:timesofindia.indiatimes.com OR site:hindustantimes.com OR site:indianexpress.com",
-        "site:reuters.com OR site:bbc.com OR site:apnews.com OR site:theguardian.com",
-        "site:cnn.com OR site:nbcnews.com OR site:abcnews.go.com OR site:cbsnews.com",
-        
-    ]
-    
-    try:
-        with DDGS() as ddgs:
-            for source_group in sources:
-                try:
-                    search_results = ddgs.text(
-                        f"{query} {source_group}", 
-                        max_results=MAX_WEB_RESULTS // len(sources)
-                    )
-                    for r in search_results:
-                        results.append({
-                            "title": r.get("title", ""),
-                            "snippet": r.get("body", ""),
-                            "url": r.get("href", ""),
-                            "source": r.get("href", "").split("/")[2] if "/" in r.get("href", "") else "unknown"
-                        })
-                except Exception:
-                    continue
-                
-                if len(results) >= 3:  # If we have some results, stop
-                    break
-            
-            # Second try: general search without site restrictions if no results
-            if not results:
-                try:
-                    search_results = ddgs.text(query, max_results=MAX_WEB_RESULTS)
-                    for r in search_results:
-                        results.append({
-                            "title": r.get("title", ""),
-                            "snippet": r.get("body", ""),
-                            "url": r.get("href", ""),
-                            "source": r.get("href", "").split("/")[2] if "/" in r.get("href", "") else "unknown"
-                        })
-                except Exception:
-                    pass
-                    
-    except Exception as e:
-        print(f"⚠ Web search error: {e}")
-    
-    return results[:MAX_WEB_RESULTS]
+    return retriever.fetch(query)
 
 
-def rag_classify(claim: str) -> InformationResponse:
-    """Main RAG classification with web scraping"""
-    keywords = extract_keywords(claim)
-    web_articles = fetch_news_multi_source(keywords)
-    
-    if web_articles:
-        web_context = "\n".join([
-            f"[{a['source']}] {a['title']}: {a['snippet'][:200]}"
-            for a in web_articles[:5]  # Top 5 most relevant
-        ])
-    else:
-        web_context = "No recent web articles found."
-    
-    # Query ChromaDB directly with embeddings
-    claim_embedding = embeddings.embed_query(claim)
-    results = collection.query(
-        query_embeddings=[claim_embedding],
-        n_results=2
-    )
-    
-    # Extract documents from results
-    static_context = "\n".join(results['documents'][0]) if results['documents'] else ""
-    
-    try:
-        raw_output = chain.invoke({
-            "web_context": web_context,
-            "static_context": static_context,
-            "claim": claim
-        })
-        
-        lines = raw_output.strip().split('\n')
-        verdict_line = next((l for l in lines if 'VERDICT:' in l.upper()), "")
-        reason_line = next((l for l in lines if 'REASON:' in l.upper()), "")
-        
-        classification = verdict_line.split(':', 1)[1].strip().upper() if ':' in verdict_line else "UNVERIFIED"
-        reason = reason_line.split(':', 1)[1].strip() if ':' in reason_line else raw_output[:200]
-        
+class VerdictParser:
+    """
+    Incremental parser for the `VERDICT:` / `REASON:` reply format. Feed it
+    streamed chunks; each field is read as soon as its line is complete.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self._pending = ""
+        self.verdict_line: Optional[str] = None
+        self.reason_line: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.verdict_line is not None and self.reason_line is not None
+
+    def _line(self, line: str) -> None:
+        if self.verdict_line is None and 'VERDICT:' in line.upper():
+            self.verdict_line = line
+        elif self.reason_line is None and 'REASON:' in line.upper():
+            self.reason_line = line
+
+    def feed(self, chunk: str) -> "VerdictParser":
+        self.raw += chunk
+        self._pending += chunk
+        *lines, self._pending = self._pending.split('\n')
+        for line in lines:
+            self._line(line)
+        return self
+
+    def finish(self) -> "VerdictParser":
+        if self._pending:
+            self._line(self._pending)
+            self._pending = ""
+        return self
+
+    @property
+    def classification(self) -> str:
+        line = self.verdict_line or ""
+        return line.split(':', 1)[1].strip().upper() if ':' in line else "UNVERIFIED"
+
+    def response(self) -> InformationResponse:
+        line = self.reason_line or ""
+        classification = self.classification
+        reason = line.split(':', 1)[1].strip() if ':' in line else self.raw[:200]
+
         if classification not in ["REAL", "FAKE", "UNVERIFIED"]:
             classification = "UNVERIFIED"
             reason = f"Unable to verify: {reason}"
-        
+
         return InformationResponse(classification=classification, reason=reason)
+
+
+def parse_verdict(raw_output: str) -> InformationResponse:
+    return VerdictParser().feed(raw_output).finish().response()
+
+
+def embed_claim(claim: str) -> Optional[List[float]]:
+    """
+    Claim embedding, or None in lexical mode or when the embedding service
+    errors or times out (EMBED_TIMEOUT is the pool's read timeout for this
+    call; retrieval then falls back to the lexical index and the verdict
+    cache is skipped).
+    """
+    if RETRIEVAL_MODE == "lexical":
+        return None
+    with stage("news.embed"):
+        try:
+            return embeddings.embed_query(claim)
+        except Exception:
+            retrieval_counts["embed_fallbacks"] += 1
+            return None
+
+
+def retrieve_facts(claim: str, claim_embedding: Optional[List[float]], k: int = FACTS_K) -> List[str]:
+    """
+    Nearest trusted facts: BM25 and vector candidates fused by reciprocal
+    rank, or whichever of the two is available / configured.
+    """
+    rankings, sources, documents = [], [], {}
+    if claim_embedding is not None and RETRIEVAL_MODE != "lexical":
+        with stage("news.chroma"):
+            results = collection.query(query_embeddings=[claim_embedding], n_results=RETRIEVAL_CANDIDATES)
+        if results["ids"] and results["ids"][0]:
+            rankings.append(results["ids"][0])
+            sources.append("dense")
+            documents.update(zip(results["ids"][0], results["documents"][0]))
+    if lexical_index is not None and RETRIEVAL_MODE != "dense":
+        with stage("news.lexical"):
+            lexical_index.refresh()         # pick up `facts ingest` / `lexical rebuild` runs
+            hits = [doc_id for doc_id, _ in lexical_index.search(claim, RETRIEVAL_CANDIDATES)]
+        if hits:
+            rankings.append(hits)
+            sources.append("lexical")
+
+    mode = "hybrid" if len(sources) == 2 else sources[0] if sources else "none"
+    retrieval_counts[mode] += 1
+    top = rrf(rankings)[:k]
+    missing = [doc_id for doc_id in top if doc_id not in documents]
+    if missing:
+        found = collection.get(ids=missing, include=["documents"])
+        documents.update(zip(found["ids"], found["documents"]))
+    return [documents[doc_id] for doc_id in top if doc_id in documents]
+
+
+def build_context(claim: str, claim_embedding: Optional[List[float]]) -> Tuple[Dict[str, str], int]:
+    """
+    Web articles and nearest trusted facts as prompt variables, deduplicated,
+    ranked and packed into the context token budget; plus prompt tokens.
+    """
+    keywords = extract_keywords(claim)
+    with stage("news.search"):
+        web_articles = fetch_news_multi_source(keywords)
+
+    facts = retrieve_facts(claim, claim_embedding)
+    with stage("news.context"):
+        variables, _ = assemble(claim, web_articles, facts)
+    tokens = prompt_tokens(variables)
+    observe_prompt(tokens)
+    return variables, tokens
+
+
+def rag_classify(claim: str) -> InformationResponse:
+    """Main RAG classification with web scraping"""
+    claim_embedding = embed_claim(claim)
+
+    # A near-identical claim answered recently short-circuits everything below
+    with stage("news.verdict_cache"):
+        cached = verdict_cache.lookup(claim_embedding) if verdict_cache and claim_embedding else None
+    if cached is not None:
+        return cached
+
+    context, tokens = build_context(claim, claim_embedding)
+    
+    try:
+        with stage("news.llm"):
+            raw_output = chain.invoke(context)
+        response = parse_verdict(raw_output)
+        response.prompt_tokens = tokens
+        if verdict_cache and claim_embedding:
+            verdict_cache.store(claim, claim_embedding, response)
+        return response
     
     except Exception as e:
         return InformationResponse(
@@ -198,6 +310,57 @@ def rag_classify(claim: str) -> InformationResponse:
         )
 
 
+def rag_stream(claim: str) -> Iterator[Dict]:
+    """
+    Streaming variant of `rag_classify`. Yields progress events for each
+    retrieval phase, a `verdict` event as soon as the VERDICT line is
+    complete, and a final `result`. Generation is stopped as soon as both
+    fields are parsed: leaving the `chain.stream` loop closes the
+    generator and with it the LLM request.
+    """
+    yield {"event": "progress", "stage": "embedding"}
+    claim_embedding = embed_claim(claim)
+
+    with stage("news.verdict_cache"):
+        cached = verdict_cache.lookup(claim_embedding) if verdict_cache and claim_embedding else None
+    if cached is not None:
+        yield {"event": "result", **cached.model_dump()}
+        return
+
+    yield {"event": "progress", "stage": "retrieval"}
+    context, tokens = build_context(claim, claim_embedding)
+
+    yield {"event": "progress", "stage": "generation", "prompt_tokens": tokens}
+    parser = VerdictParser()
+    sent_verdict = False
+    try:
+        start = time.perf_counter()
+        stream = chain.stream(context)
+        try:
+            for chunk in stream:
+                parser.feed(chunk)
+                if not sent_verdict and parser.verdict_line is not None:
+                    sent_verdict = True
+                    yield {"event": "verdict", "classification": parser.classification}
+                if parser.done:
+                    break
+        finally:
+            stream.close()
+            observe_stage("news.llm", time.perf_counter() - start)
+        response = parser.finish().response()
+        response.prompt_tokens = tokens
+        if verdict_cache and claim_embedding:
+            verdict_cache.store(claim, claim_embedding, response)
+
+    except Exception as e:
+        response = InformationResponse(
+            classification="ERROR",
+            reason=f"Processing error: {str(e)[:100]}"
+        )
+
+    yield {"event": "result", **response.model_dump()}
+
+
 def guess_news(text: str) -> InformationResponse:
     """
     Fact-check news claims using RAG + live web scraping.
@@ -215,4 +378,17 @@ def guess_news(text: str) -> InformationResponse:
             reason="Claim too short to verify (minimum 10 characters)"
         )
     
-    return rag_classify(text.strip())
\ No newline at end of file
+    return rag_classify(text.strip())
+
+
+def stream_news(text: str) -> Iterator[Dict]:
+    """Event stream counterpart of `guess_news` (see `rag_stream`)."""
+    if not text or len(text.strip()) < 10:
+        error = InformationResponse(
+            classification="ERROR",
+            reason="Claim too short to verify (minimum 10 characters)"
+        )
+        yield {"event": "result", **error.model_dump()}
+        return
+
+    yield from rag_stream(text.strip())
@@ -0,0 +1,257 @@
+from __future__ import annotations
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# === CONFIG ===
+FRAME_SAMPLER = os.getenv("FRAME_SAMPLER", "auto")
+# "auto" probes keyframes (an extra demux pass) only when sampled frames are at
+# least this many apart; closer targets mean GOPs under half that for seeking to win
+KEYFRAME_PROBE_MIN_GAP = int(os.getenv("KEYFRAME_PROBE_MIN_GAP", "8"))
+
+STRATEGIES = ("auto", "seek", "sequential", "keyframe", "timestamp")
+
+Frames = List[Tuple[int, np.ndarray]]
+
+
+def uniform_indices(total_frames: int, num_frames: int) -> np.ndarray:
+    return np.linspace(0, total_frames - 1, num_frames, dtype=int)
+
+
+def probe_keyframes(video_path: str, max_seq_len: int) -> Optional[np.ndarray]:
+    """
+    Indices of the keyframes among the first `max_seq_len` frames, read
+    from packet flags without decoding anything (FFmpeg raw mode). None
+    when the backend cannot report them.
+    """
+    cap = cv2.VideoCapture(str(video_path), cv2.CAP_FFMPEG)
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return None
+        keyframes = []
+        pos = 0
+        while pos < max_seq_len and cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(pos)
+            pos += 1
+    finally:
+        cap.release()
+    return np.asarray(keyframes, dtype=int) if keyframes else None
+
+
+def keyframes_for(
+    video_path: str,
+    cap: cv2.VideoCapture,
+    num_frames: int,
+    max_seq_len: int,
+    sampler: str,
+) -> Optional[np.ndarray]:
+    """
+    `probe_keyframes` when `sampler` can use the result: always for
+    "keyframe", for "auto" only when the clip is long enough relative to
+    `num_frames` that `choose_strategy` could pick seeking.
+    """
+    if sampler == "keyframe":
+        return probe_keyframes(video_path, max_seq_len)
+    if sampler != "auto":
+        return None
+    span = min(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), max_seq_len)
+    if span / max(num_frames, 1) < KEYFRAME_PROBE_MIN_GAP:
+        return None
+    return probe_keyframes(video_path, max_seq_len)
+
+
+def choose_strategy(
+    cap: cv2.VideoCapture,
+    num_frames: int,
+    max_seq_len: int,
+    keyframes: Optional[Sequence[int]] = None,
+) -> str:
+    """
+    Pick a sampling strategy from what the container reports about itself.
+    Seeking only pays when the gap between targets spans at least two
+    keyframe intervals, i.e. a seek skips at least one whole GOP.
+    """
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if frame_count <= 0:
+        return "timestamp"
+    if keyframes is None or len(keyframes) < 2:
+        return "sequential"
+
+    span = min(frame_count, max_seq_len)
+    interval = float(np.median(np.diff(keyframes)))
+    if span / max(num_frames, 1) >= 2 * interval:
+        return "keyframe"
+    return "sequential"
+
+
+# --------------------------------------------------------------------------- #
+#  Strategies
+# --------------------------------------------------------------------------- #
+def _sample_seek(cap: cv2.VideoCapture, indices: np.ndarray) -> Frames:
+    """One seek per target (the original behaviour); kept for comparison."""
+    frames: Frames = []
+    for idx in indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        ok, frame = cap.read()
+        if ok:
+            frames.append((int(idx), frame))
+    return frames
+
+
+def _sample_sequential(cap: cv2.VideoCapture, indices: np.ndarray) -> Frames:
+    """
+    Single forward pass: `grab()` every frame, `retrieve()` only the targets.
+    Duplicate indices (short clips) reuse the retrieved frame.
+    """
+    frames: Frames = []
+    targets = np.unique(indices)
+    last = int(targets[-1]) if len(targets) else -1
+    t = 0
+    pos = 0
+    while pos <= last:
+        if not cap.grab():
+            break
+        if pos == targets[t]:
+            ok, frame = cap.retrieve()
+            if ok:
+                frames.append((pos, frame))
+            t += 1
+        pos += 1
+    return _expand(frames, indices)
+
+
+def _sample_keyframe(
+    cap: cv2.VideoCapture,
+    indices: np.ndarray,
+    keyframes: Sequence[int],
+) -> Frames:
+    """
+    Decode forward while targets are close together; across a gap, seek
+    to the last keyframe at or before the next target and decode from
+    there, so each seek lands on a real keyframe and never re-decodes
+    frames already passed.
+    """
+    frames: Frames = []
+    targets = np.unique(indices)
+    keyframes = np.asarray(keyframes)
+    pos = 0
+    for idx in targets:
+        idx = int(idx)
+        k = int(keyframes[np.searchsorted(keyframes, idx, side="right") - 1]) if keyframes[0] <= idx else 0
+        if k > pos:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, k)
+            pos = k
+        while pos < idx:
+            if not cap.grab():
+                return _expand(frames, indices)
+            pos += 1
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append((idx, frame))
+        pos += 1
+    return _expand(frames, indices)
+
+
+def _sample_timestamp(
+    cap: cv2.VideoCapture,
+    num_frames: int,
+    max_seq_len: int,
+) -> Frames:
+    """
+    For containers whose CAP_PROP_FRAME_COUNT is missing or wrong: decode
+    forward once, keeping an evenly strided reservoir (the stride doubles
+    each time it fills up) tagged with each frame's presentation time, then
+    pick the frames closest to uniformly spaced timestamps over what was
+    actually decodable (up to `max_seq_len` frames). Using POS_MSEC rather
+    than frame numbers keeps variable-frame-rate clips evenly covered.
+    """
+    stride = 1
+    kept: Frames = []
+    stamps: list[float] = []
+    first_ms = last_ms = 0.0
+    pos = 0
+    while pos < max_seq_len:
+        if not cap.grab():
+            break
+        last_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if pos == 0:
+            first_ms = last_ms
+        if pos % stride == 0:
+            ok, frame = cap.retrieve()
+            if ok:
+                kept.append((pos, frame))
+                stamps.append(last_ms)
+            if len(kept) >= 2 * num_frames:
+                kept, stamps = kept[::2], stamps[::2]
+                stride *= 2
+        pos += 1
+
+    if not kept:
+        return kept
+    decoded = np.asarray(stamps)
+    if last_ms <= first_ms:
+        # backend reports no timestamps: fall back to decode order
+        decoded = np.array([idx for idx, _ in kept], dtype=float)
+        first_ms, last_ms = 0.0, float(pos - 1)
+    wanted = np.linspace(first_ms, last_ms, num_frames)
+    picks = np.abs(decoded[None, :] - wanted[:, None]).argmin(axis=1)
+    return [kept[i] for i in picks]
+
+
+def _expand(frames: Frames, indices: np.ndarray) -> Frames:
+    """Map decoded unique targets back onto the (possibly repeating) indices."""
+    by_idx = dict(frames)
+    return [(int(i), by_idx[int(i)]) for i in indices if int(i) in by_idx]
+
+
+# --------------------------------------------------------------------------- #
+#  Entry point
+# --------------------------------------------------------------------------- #
+def sample_frames(
+    cap: cv2.VideoCapture,
+    num_frames: int = 20,
+    max_seq_len: int = 400,
+    strategy: str = FRAME_SAMPLER,
+    keyframes: Optional[Sequence[int]] = None,
+) -> Frames:
+    """
+    Returns up to `num_frames` (index, BGR frame) pairs sampled uniformly
+    from the first `max_seq_len` frames of an opened capture. `keyframes`
+    (see `probe_keyframes`) enables the keyframe strategy; without them
+    it decodes sequentially.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown frame sampler: {strategy!r}")
+    if strategy == "auto":
+        strategy = choose_strategy(cap, num_frames, max_seq_len, keyframes)
+
+    if strategy == "timestamp":
+        return _sample_timestamp(cap, num_frames, max_seq_len)
+
+    total_frames = min(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), max_seq_len)
+    if total_frames <= 0:
+        return _sample_timestamp(cap, num_frames, max_seq_len)
+
+    return sample_indices(cap, uniform_indices(total_frames, num_frames), strategy, keyframes)
+
+
+def sample_indices(
+    cap: cv2.VideoCapture,
+    indices: np.ndarray,
+    strategy: str,
+    keyframes: Optional[Sequence[int]] = None,
+) -> Frames:
+    """
+    (index, BGR frame) pairs for sorted frame `indices` with a concrete
+    index-based strategy. The sequential and keyframe strategies expect
+    the capture at frame 0.
+    """
+    if strategy == "seek":
+        return _sample_seek(cap, indices)
+    if strategy == "keyframe" and keyframes is not None and len(keyframes):
+        return _sample_keyframe(cap, indices, keyframes)
+    return _sample_sequential(cap, indices)
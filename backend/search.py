@@ -0,0 +1,211 @@
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Protocol, Sequence
+
+from cachetools import TTLCache
+
+from clients import BackendUnavailable, CircuitBreaker
+
+# === CONFIG ===
+MAX_WEB_RESULTS = int(os.getenv("MAX_WEB_RESULTS", "10"))
+SEARCH_CALL_TIMEOUT = float(os.getenv("SEARCH_CALL_TIMEOUT", "4"))
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "6"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))
+
+# General news sources for diverse topics
+SOURCE_GROUPS = [
+    "site:deccanherald.com OR site:news.google.com OR site:thehindu.com",
+    "site:timesofindia.indiatimes.com OR site:hindustantimes.com OR site:indianexpress.com",
+    "site:reuters.com OR site:bbc.com OR site:apnews.com OR site:theguardian.com",
+    "site:cnn.com OR site:nbcnews.com OR site:abcnews.go.com OR site:cbsnews.com",
+]
+
+
+class SearchProvider(Protocol):
+    """Anything with a DDGS-style `text` search."""
+
+    def text(self, query: str, max_results: int) -> List[Dict]: ...
+
+
+class DDGSProvider:
+    """
+    DuckDuckGo via `ddgs`. Each search thread keeps its own `DDGS`
+    instance, so the engines' HTTP sessions (and their connections) are
+    reused across calls. A circuit breaker fails calls fast while the
+    service keeps erroring.
+    """
+
+    def __init__(self, timeout: float = SEARCH_CALL_TIMEOUT, breaker: Optional[CircuitBreaker] = None):
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            from ddgs import DDGS
+
+            session = self._local.session = DDGS(timeout=max(1, int(self.timeout)))
+        return session
+
+    def text(self, query: str, max_results: int) -> List[Dict]:
+        if not self.breaker.allow():
+            raise BackendUnavailable("Search provider unavailable (circuit open)")
+        try:
+            results = list(self._session().text(query, max_results=max_results) or [])
+        except Exception as exc:
+            if "no results" in str(exc).lower():      # ddgs raises on an empty result set
+                self.breaker.success()
+                return []
+            self.breaker.failure()
+            self._local.session = None        # start the next call on a fresh session
+            raise
+        self.breaker.success()
+        return results
+
+
+class StubSearchProvider:
+    """
+    Local stand-in for tests and benchmarks: answers from a fixed result
+    list after an optional per-call delay, and records every query.
+    """
+
+    def __init__(self, results: Optional[List[Dict]] = None, delay: float = 0.0):
+        self.results = results or []
+        self.delay = delay
+        self.queries: List[str] = []
+
+    def text(self, query: str, max_results: int) -> List[Dict]:
+        self.queries.append(query)
+        if self.delay:
+            time.sleep(self.delay)
+        return self.results[:max_results]
+
+
+def normalize_query(keywords: str) -> str:
+    """Cache key for an `extract_keywords` output: order/case/dupes ignored."""
+    return " ".join(sorted(set(keywords.lower().split())))
+
+
+def to_article(r: Dict) -> Dict:
+    href = r.get("href", "")
+    return {
+        "title": r.get("title", ""),
+        "snippet": r.get("body", ""),
+        "url": href,
+        "source": href.split("/")[2] if href.count("/") >= 2 else "unknown",
+    }
+
+
+class NewsRetriever:
+    """
+    Fans a query out to every source group at once, each call bounded by
+    `call_timeout` and the whole fan-out by `deadline`, so latency tracks
+    the slowest source instead of their sum. Results are cached per
+    normalised keyword set for `cache_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        provider: SearchProvider,
+        *,
+        sources: Sequence[str] = SOURCE_GROUPS,
+        max_results: int = MAX_WEB_RESULTS,
+        call_timeout: float = SEARCH_CALL_TIMEOUT,
+        deadline: float = SEARCH_DEADLINE,
+        cache_ttl: float = SEARCH_CACHE_TTL,
+        cache_size: int = SEARCH_CACHE_SIZE,
+    ):
+        self.provider = provider
+        self.sources = list(sources)
+        self.max_results = max_results
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self._cache: TTLCache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._lock = threading.Lock()
+        # own pool rather than the loop default: a hung provider call must
+        # not hold up asyncio.run() shutting down in `fetch`
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(self.sources), thread_name_prefix="search")
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def _call(self, query: str, max_results: int) -> List[Dict]:
+        try:
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._pool, self.provider.text, query, max_results),
+                self.call_timeout,
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+        except Exception:
+            self.errors += 1
+        return []
+
+    async def afetch(self, query: str) -> List[Dict]:
+        key = normalize_query(query)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                return list(cached)
+            self.misses += 1
+
+        start = time.monotonic()
+        per_group = max(1, self.max_results // len(self.sources))
+        tasks = [
+            asyncio.ensure_future(self._call(f"{query} {group}", per_group))
+            for group in self.sources
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for t in pending:
+            t.cancel()
+        self.timeouts += len(pending)
+
+        # keep source-group order, drop duplicate URLs
+        results, seen = [], set()
+        for t in tasks:
+            if t in done:
+                for r in t.result():
+                    article = to_article(r)
+                    if article["url"] not in seen:
+                        seen.add(article["url"])
+                        results.append(article)
+
+        # Second try: general search without site restrictions if no results
+        remaining = self.deadline - (time.monotonic() - start)
+        if not results and remaining > 0:
+            try:
+                general = await asyncio.wait_for(self._call(query, self.max_results), remaining)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                general = []
+            results = [to_article(r) for r in general]
+
+        results = results[:self.max_results]
+        if results:
+            with self._lock:
+                self._cache[key] = list(results)
+        return results
+
+    def fetch(self, query: str) -> List[Dict]:
+        """Blocking entry point for callers outside an event loop."""
+        return asyncio.run(self.afetch(query))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cache_size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
@@ -0,0 +1,285 @@
+"""
+Multi-worker deployment: the classifiers are loaded once, in this
+supervisor process, and handed to N spawned uvicorn workers through
+shared memory, so every worker maps the same weight pages instead of
+loading its own copy. The workers accept on one shared listening socket
+and split the machine's cores between them.
+
+The supervisor also does what must happen exactly once: the one-off
+startup steps (tables, rollups, fact seeding, lexical index) before any
+worker starts, and the video job consumers with queue recovery, so a
+restarted worker never requeues jobs that are still running.
+
+    cd backend
+    python serve.py --workers 4 --port 8000
+    python serve.py --setup-only        # before `uvicorn main:app --workers N`
+
+Workers are spawned, not forked: a fork after torch has run any parallel
+op (loading already does, see `share_identical_tensors`) deadlocks the
+child's OpenMP pool.
+"""
+from __future__ import annotations
+import argparse
+import os
+import signal
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import torch
+import torch.multiprocessing as mp
+import torch.nn as nn
+import uvicorn
+
+from backends import INFERENCE_BACKEND
+from jobs import JobQueue, WorkerPool
+from pytorch import MODEL_CLASSES, ModelRegistry
+
+# === CONFIG ===
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "2"))
+# cores split between the workers
+SERVE_CPUS = int(os.getenv("SERVE_CPUS", str(os.cpu_count() or 1)))
+# 0: every worker loads its own models, like `uvicorn --workers N`
+SERVE_SHARE_MODELS = os.getenv("SERVE_SHARE_MODELS", "1") == "1"
+# video job consumers run by the supervisor
+SERVE_JOB_WORKERS = int(os.getenv("SERVE_JOB_WORKERS", "1"))
+# same variables as main.py, so the shared models match its cache identities
+# and the job consumers score like the API does
+DB_URL = "sqlite:///database/audit.db"
+FACE_WEIGHTS = os.getenv("FACE_WEIGHTS", "models/yolov8n-face.pt")
+IMAGE_WEIGHTS = os.getenv("IMAGE_WEIGHTS", "models/image_model.pt")
+VIDEO_WEIGHTS = os.getenv("VIDEO_WEIGHTS", "models/video_model.pt")
+VIDEO_ADAPTIVE = os.getenv("VIDEO_ADAPTIVE", "0") == "1"
+ADAPTIVE_MAX_FRAMES = int(os.getenv("ADAPTIVE_MAX_FRAMES", "32"))
+ADAPTIVE_MARGIN = float(os.getenv("ADAPTIVE_MARGIN", "0.3"))
+VIDEO_TRACKING = os.getenv("VIDEO_TRACKING", "0") == "1"
+TRACK_FRAMES = int(os.getenv("TRACK_FRAMES", "48"))
+
+
+# --------------------------------------------------------------------------- #
+#  Threads
+# --------------------------------------------------------------------------- #
+def thread_budget(workers: int, cpus: int = SERVE_CPUS) -> int:
+    """Intra-op threads per worker so that all workers together use `cpus` cores."""
+    return max(1, cpus // max(1, workers))
+
+
+def thread_env(threads: int) -> Dict[str, str]:
+    """
+    Environment for a worker with `threads` cores: OpenMP/MKL and ONNX
+    Runtime pools of that size, and no more concurrent inference calls
+    than cores. Values already set by the operator win.
+    """
+    defaults = {
+        "OMP_NUM_THREADS": str(threads),
+        "MKL_NUM_THREADS": str(threads),
+        "ORT_INTRA_OP_THREADS": str(threads),
+        "INFERENCE_THREADS": str(min(4, threads)),
+    }
+    return {var: os.environ.get(var, value) for var, value in defaults.items()}
+
+
+def limit_threads(threads: int) -> None:
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+
+# --------------------------------------------------------------------------- #
+#  Shared models
+# --------------------------------------------------------------------------- #
+def pack_shared(modules: List[nn.Module]) -> int:
+    """
+    Copies every parameter and buffer of `modules` into one shared-memory
+    buffer per dtype and points the tensors at views of it. Tensors the
+    modules have in common are copied once. Returns the bytes packed.
+
+    `nn.Module.share_memory()` would give each tensor its own segment, i.e.
+    ~1,500 file descriptors per process for the two classifiers.
+    """
+    tensors: Dict[int, torch.Tensor] = {}
+    for module in modules:
+        for t in [*module.parameters(), *module.buffers()]:
+            tensors.setdefault(id(t), t)
+
+    by_dtype: Dict[torch.dtype, List[torch.Tensor]] = {}
+    for t in tensors.values():
+        by_dtype.setdefault(t.dtype, []).append(t)
+
+    nbytes = 0
+    with torch.no_grad():
+        for dtype, group in by_dtype.items():
+            flat = torch.empty(sum(t.numel() for t in group), dtype=dtype).share_memory_()
+            offset = 0
+            for t in group:
+                view = flat[offset:offset + t.numel()].view(t.shape)
+                view.copy_(t)
+                t.data = view
+                offset += t.numel()
+            nbytes += flat.numel() * flat.element_size()
+    return nbytes
+
+
+def share_models(video_path: str = VIDEO_WEIGHTS, image_path: str = IMAGE_WEIGHTS) -> Dict[str, nn.Module]:
+    """Loads both classifiers on CPU (eager backend) into shared memory."""
+    registry = ModelRegistry("cpu", video_path=video_path, image_path=image_path, backend="eager")
+    models = {name: registry.get(name) for name in MODEL_CLASSES}
+    nbytes = pack_shared(list(models.values()))
+    print(f"✓ Shared {', '.join(models)} classifiers ({nbytes / 2**20:.0f} MB)")
+    return models
+
+
+# --------------------------------------------------------------------------- #
+#  Run-once work
+# --------------------------------------------------------------------------- #
+def setup(db_url: str = DB_URL) -> None:
+    """
+    The startup steps that write shared state (audit table migration,
+    tables and rollup backfill, baseline facts, lexical index), run here once instead of
+    concurrently in every worker, which then start with STARTUP_SETUP=0.
+    """
+    from sqlmodel import SQLModel, create_engine
+
+    import rag
+    from analytics import ensure_rollups
+    from audit import configure_sqlite, migrate
+
+    engine = configure_sqlite(create_engine(db_url))
+    migrated = migrate(engine)
+    if migrated:
+        print(f"✓ Migrated {migrated} audit rows to the current schema")
+    SQLModel.metadata.create_all(engine)
+    ensure_rollups(engine)
+    rag.seed_facts()
+    engine.dispose()
+    print("✓ Startup setup done")
+
+
+def start_job_workers(n: int, models: Dict[str, nn.Module], db_url: str = DB_URL) -> WorkerPool:
+    """Recovers the job queue and starts its consumers; this process owns all of them."""
+    from sqlmodel import create_engine
+
+    JobQueue(create_engine(db_url)).recover()
+    pool = WorkerPool(
+        n,
+        db_url,
+        face_weights=FACE_WEIGHTS,
+        video_weights=VIDEO_WEIGHTS,
+        adaptive=VIDEO_ADAPTIVE,
+        max_frames=ADAPTIVE_MAX_FRAMES,
+        margin=ADAPTIVE_MARGIN,
+        tracking=VIDEO_TRACKING,
+        track_frames=TRACK_FRAMES,
+        models=models,
+    )
+    pool.start()
+    return pool
+
+
+# --------------------------------------------------------------------------- #
+#  Workers
+# --------------------------------------------------------------------------- #
+def run_worker(
+    index: int,
+    config: uvicorn.Config,
+    sockets: list,
+    models: Dict[str, nn.Module],
+    threads: int,
+) -> None:
+    """One uvicorn worker; setup and job consumers are the supervisor's."""
+    config.configure_logging()      # not inherited across spawn
+    limit_threads(threads)
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["STARTUP_SETUP"] = "0"
+
+    import main
+
+    main.shared_models.update(models)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+class Supervisor:
+    """Starts `n` workers, restarts any that exit, and stops them on SIGINT/SIGTERM."""
+
+    def __init__(self, n: int, config: uvicorn.Config, models: Dict[str, nn.Module], threads: int):
+        self.ctx = mp.get_context("spawn")
+        self.config = config
+        self.models = models
+        self.threads = threads
+        self.sockets = [config.bind_socket()]
+        self.processes: List[Optional[mp.Process]] = [None] * n
+        self.stopping = False
+
+    def _spawn(self, index: int) -> None:
+        p = self.ctx.Process(
+            target=run_worker,
+            args=(index, self.config, self.sockets, self.models, self.threads),
+            name=f"serve-worker-{index}",
+        )
+        p.start()
+        self.processes[index] = p
+
+    def run(self) -> None:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: setattr(self, "stopping", True))
+        for i in range(len(self.processes)):
+            self._spawn(i)
+
+        while not self.stopping:
+            time.sleep(1.0)
+            for i, p in enumerate(self.processes):
+                if not self.stopping and not p.is_alive():
+                    print(f"✗ Worker {i} (pid {p.pid}) exited with {p.exitcode}, restarting")
+                    self._spawn(i)
+
+        for p in self.processes:
+            p.terminate()
+        deadline = time.monotonic() + 30.0
+        for p in self.processes:
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.kill()
+        for sock in self.sockets:
+            sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API in several worker processes sharing one copy of the models")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--cpus", type=int, default=SERVE_CPUS, help="cores to split between the workers")
+    parser.add_argument("--no-share", action="store_true", help="load the models in every worker instead")
+    parser.add_argument("--job-workers", type=int, default=SERVE_JOB_WORKERS, help="video job consumers")
+    parser.add_argument("--setup-only", action="store_true", help="run the one-off startup steps and exit")
+    args = parser.parse_args()
+
+    setup()
+    if args.setup_only:
+        return
+
+    threads = thread_budget(args.workers, args.cpus)
+    # inherited by the spawned workers, read by torch/ORT/executor at import
+    os.environ.update(thread_env(threads))
+    print(f"✓ {args.workers} workers x {threads} threads on {args.cpus} cores")
+
+    models: Dict[str, nn.Module] = {}
+    if args.no_share or not SERVE_SHARE_MODELS:
+        print("✓ Model sharing off; every worker loads its own models")
+    elif INFERENCE_BACKEND != "eager" or torch.cuda.is_available():
+        # quantised / ONNX modules and CUDA tensors are built per process
+        print(f"✗ Model sharing needs the eager backend on CPU; each worker loads its own ({INFERENCE_BACKEND})")
+    else:
+        models = share_models()
+
+    job_workers = start_job_workers(args.job_workers, models)
+    config = uvicorn.Config("main:app", host=args.host, port=args.port)
+    try:
+        Supervisor(args.workers, config, models, threads).run()
+    finally:
+        job_workers.stop()
+
+
+if __name__ == "__main__":
+    main()
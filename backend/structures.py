@@ -1,15 +1,22 @@
 from pydantic import BaseModel
-from typing import Optional
-from sqlmodel import Field, SQLModel
+from typing import List, Optional
+from sqlmodel import Field, Index, SQLModel
 
 class Auditing(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_auditing_type_classification_created_at", "type", "classification", "created_at"),
+    )
+
     id: str | None = Field(default=None, primary_key=True, index=True, description="Universal identifier")
     type: str | None = Field(default=None, description="Which method is called", nullable=True)
     classification: str | None = Field(default=None, description="FAKE or REAL", nullable=True)
     reason: str | None = Field(default=None, description="Classification reason", nullable=True)
 
     ext: str | None = Field(default=None, description="While file format", nullable=True)
-    confidence: str | None = Field(default=None, description="Deep learning confidence", nullable=True)
+    confidence: float | None = Field(default=None, description="Confidence in the classification, 0-1", nullable=True)
+    probability: float | None = Field(default=None, description="Model probability of FAKE, 0-1", nullable=True)
+    latency_ms: float | None = Field(default=None, description="Request handling time", nullable=True)
+    created_at: float | None = Field(default=None, index=True, description="Unix time of the request", nullable=True)
 
 
 class ImageResponse(BaseModel):
@@ -25,6 +32,46 @@ class VideoResponse(BaseModel):
 class InformationRequest(BaseModel):
     text: str
 
+class InformationBatchRequest(BaseModel):
+    claims: List[str]
+
 class InformationResponse(BaseModel):
     classification: str
-    reason: Optional[str]
\ No newline at end of file
+    reason: Optional[str]
+    cached: bool = False
+    similarity: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+
+class PredictionCache(SQLModel, table=True):
+    key: str = Field(primary_key=True, description="kind:weights-identity:content-hash")
+    kind: str = Field(index=True, description="image or video")
+    model_id: str = Field(index=True, description="Identity of the weights that produced the result")
+    result: str = Field(description="JSON encoded prediction dict")
+    created_at: float = Field(description="Unix time the entry was written")
+
+class Job(SQLModel, table=True):
+    id: str = Field(primary_key=True, description="Job identifier returned to the client")
+    kind: str = Field(default="video", description="What the job analyses")
+    status: str = Field(index=True, description="queued, running, done, failed or cancelled")
+    path: str = Field(description="Upload on disk, removed once the job is finished")
+    ext: str | None = Field(default=None, description="Uploaded file format", nullable=True)
+    digest: str = Field(description="Content hash of the upload")
+    model_id: str = Field(description="Result cache identity the job scores against")
+    cancel_requested: bool = Field(default=False, description="Set by DELETE while running")
+    attempts: int = Field(default=0, description="How many times a worker picked the job up")
+    worker: str | None = Field(default=None, description="Worker that holds the job", nullable=True)
+    progress: str = Field(default="{}", description="JSON encoded progress counters")
+    result: str | None = Field(default=None, description="JSON encoded prediction dict", nullable=True)
+    error: str | None = Field(default=None, nullable=True)
+    created_at: float = Field(index=True, description="Unix time the job was queued")
+    started_at: float | None = Field(default=None, nullable=True)
+    finished_at: float | None = Field(default=None, nullable=True)
+
+class AuditRollup(SQLModel, table=True):
+    bucket: int = Field(primary_key=True, description="Unix time the bucket starts, 0 for rows without a timestamp")
+    type: str = Field(primary_key=True, description="image, video or news")
+    classification: str = Field(primary_key=True, description="Classification, '' when missing")
+    conf_bin: int = Field(primary_key=True, description="Confidence decile 0-9, -1 when missing")
+    count: int = Field(default=0)
+    latency_sum: float = Field(default=0.0, description="Sum of latency_ms over rows that have one")
+    latency_count: int = Field(default=0)
@@ -0,0 +1,11 @@
+"""
+Run from backend/:
+
+    python -m pytest -q tests
+"""
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+# modules are imported flat, as the API does when started from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
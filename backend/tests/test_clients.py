@@ -0,0 +1,125 @@
+from __future__ import annotations
+import time
+
+import httpx
+import pytest
+
+from benchmarks.bench_clients import StubOllama
+from clients import BackendUnavailable, OllamaPool
+
+
+@pytest.fixture
+def stubs():
+    started = []
+
+    def make(**kwargs) -> StubOllama:
+        started.append(StubOllama(**kwargs))
+        return started[-1]
+
+    yield make
+    for stub in started:
+        stub.close()
+
+
+@pytest.fixture
+def pools():
+    opened = []
+
+    def make(urls, **kwargs) -> OllamaPool:
+        opened.append(OllamaPool(urls, **kwargs))
+        return opened[-1]
+
+    yield make
+    for pool in opened:
+        pool.close()
+
+
+def test_fails_over_to_a_healthy_endpoint(stubs, pools):
+    bad, good = stubs(status=503), stubs()
+    pool = pools([bad.url, good.url], retries=1)
+    for _ in range(4):
+        assert len(pool.embed("m", ["a"])[0]) == 8
+    stats = pool.stats()
+    assert stats[good.url]["errors"] == 0
+    assert stats[bad.url]["errors"] >= 1
+
+
+def test_breaker_opens_and_fails_fast(stubs, pools):
+    bad = stubs(status=503)
+    pool = pools([bad.url], retries=0, breaker_failures=2, breaker_reset=60)
+    for _ in range(2):
+        with pytest.raises(BackendUnavailable):
+            pool.embed("m", ["a"])
+    assert pool.stats()[bad.url]["state"] == "open"
+
+    seen = bad.requests
+    with pytest.raises(BackendUnavailable):
+        pool.embed("m", ["a"])
+    assert bad.requests == seen
+
+
+def test_half_open_trial_closes_the_breaker(stubs, pools):
+    stub = stubs(status=503)
+    pool = pools([stub.url], retries=0, breaker_failures=1, breaker_reset=0.1)
+    with pytest.raises(BackendUnavailable):
+        pool.embed("m", ["a"])
+    time.sleep(0.15)
+    stub.status = 200
+    pool.embed("m", ["a"])
+    assert pool.stats()[stub.url]["state"] == "closed"
+
+
+def test_read_timeout_bounds_a_stalled_endpoint(stubs, pools):
+    slow = stubs(delay=1.0)
+    pool = pools([slow.url], retries=0, read_timeout=0.2)
+    start = time.perf_counter()
+    with pytest.raises(BackendUnavailable):
+        pool.embed("m", ["a"])
+    assert time.perf_counter() - start < 0.9
+
+
+def test_per_call_read_timeout(stubs, pools):
+    slow = stubs(delay=0.5)
+    pool = pools([slow.url], retries=0, read_timeout=5)
+    with pytest.raises(BackendUnavailable):
+        pool.embed("m", ["a"], read_timeout=0.1)
+    assert len(pool.embed("m", ["a"])[0]) == 8
+
+
+def test_local_pool_timeout_does_not_open_the_breaker(stubs, pools, monkeypatch):
+    stub = stubs()
+    pool = pools([stub.url], retries=0, breaker_failures=1)
+
+    def exhausted(*args, **kwargs):
+        raise httpx.PoolTimeout("no free connection")
+
+    monkeypatch.setattr(pool.client, "post", exhausted)
+    with pytest.raises(BackendUnavailable):
+        pool.embed("m", ["a"])
+    stats = pool.stats()[stub.url]
+    assert (stats["state"], stats["errors"]) == ("closed", 0)
+
+
+@pytest.mark.parametrize("outcome", ["closed stream", "4xx"])
+def test_half_open_trial_is_not_left_claimed(stubs, pools, outcome):
+    stub = stubs(status=503)
+    pool = pools([stub.url], retries=0, breaker_failures=1, breaker_reset=0.1)
+    with pytest.raises(BackendUnavailable):
+        list(pool.generate_stream("m", "p"))
+    time.sleep(0.15)
+
+    if outcome == "closed stream":
+        stub.status = 200
+        tokens = pool.generate_stream("m", "p")
+        next(tokens)
+        tokens.close()          # client went away mid-stream
+    else:
+        stub.status = 404
+        with pytest.raises(httpx.HTTPStatusError):
+            list(pool.generate_stream("m", "p"))
+
+    endpoint = pool.endpoints[0]
+    assert endpoint.in_flight == 0
+    stub.status = 200
+    assert "".join(pool.generate_stream("m", "p"))       # a new trial is allowed
+    assert endpoint.breaker.state == "closed"
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import chromadb
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from facts import delete_facts, fact_id, ingest_facts
+from lexical import LexicalIndex
+
+
+def record(text: str, delete: bool = False) -> dict:
+    return {"id": fact_id(text), "text": text, "delete": delete, "metadata": {"source": "test"}}
+
+
+@pytest.fixture
+def collection(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    return client.get_or_create_collection(name="facts_test", metadata={"hnsw:space": "cosine"})
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+def texts(collection) -> set[str]:
+    return set(collection.get(include=["documents"])["documents"])
+
+
+def test_reingest_only_embeds_new_facts(collection, embeddings):
+    first = ingest_facts(collection, embeddings, [record("a cat"), record("a dog")], dataset="d")
+    assert (first["embedded"], first["unchanged"]) == (2, 0)
+
+    second = ingest_facts(collection, embeddings, [record("a cat"), record("a  dog"), record("a bird")], dataset="d")
+    assert (second["embedded"], second["unchanged"]) == (1, 2)
+    assert texts(collection) == {"a cat", "a dog", "a bird"}
+
+
+def test_delete_after_add_in_a_later_chunk_wins(collection, embeddings):
+    records = [record("a cat"), record("a dog"), record("a cat", delete=True)]
+    stats = ingest_facts(collection, embeddings, records, dataset="d", batch_size=1, concurrency=2)
+    assert stats["deleted"] == 1
+    assert texts(collection) == {"a dog"}
+
+
+def test_last_record_in_a_chunk_wins(collection, embeddings):
+    records = [record("a cat", delete=True), record("a cat")]
+    ingest_facts(collection, embeddings, records, dataset="d")
+    assert texts(collection) == {"a cat"}
+
+
+def test_sync_removes_missing_facts_of_its_dataset_only(collection, embeddings):
+    ingest_facts(collection, embeddings, [record("shared"), record("only a")], dataset="a")
+    ingest_facts(collection, embeddings, [record("shared")], dataset="b")
+
+    stats = ingest_facts(collection, embeddings, [record("new in a")], dataset="a", sync=True)
+    assert stats["deleted"] == 2
+    rows = collection.get(include=["documents", "metadatas"])
+    assert sorted((m["dataset"], d) for d, m in zip(rows["documents"], rows["metadatas"])) == [
+        ("a", "new in a"), ("b", "shared"),
+    ]
+
+
+def test_lexical_index_follows_ingest_and_delete(tmp_path, collection, embeddings):
+    writer = LexicalIndex(tmp_path / "lexical")
+    reader = LexicalIndex(tmp_path / "lexical")
+
+    ingest_facts(collection, embeddings, [record("tariffs raise costs"), record("equities fall")], dataset="d", lexical=writer)
+    assert reader.refresh()
+    assert [doc for doc, _ in reader.search("tariffs")] == [fact_id("tariffs raise costs", "d")]
+
+    delete_facts(collection, dataset="d", lexical=writer)
+    assert reader.refresh()
+    assert reader.search("tariffs") == []
+    assert len(reader) == 0 and collection.count() == 0
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from metrics import stage
+
+# === CONFIG ===
+# run the face detector on every Nth sampled frame; boxes are propagated in between
+TRACK_DETECT_EVERY = int(os.getenv("TRACK_DETECT_EVERY", "4"))
+# minimum IoU for a keyframe detection to continue an existing track
+TRACK_IOU = float(os.getenv("TRACK_IOU", "0.3"))
+# keyframes a track may go undetected before it is closed
+TRACK_MAX_MISSED = int(os.getenv("TRACK_MAX_MISSED", "1"))
+# shorter tracks (in frames) are not scored
+TRACK_MIN_LEN = int(os.getenv("TRACK_MIN_LEN", "4"))
+# only the longest tracks are scored
+TRACK_MAX_TRACKS = int(os.getenv("TRACK_MAX_TRACKS", "4"))
+# shift boxes by sparse optical flow between keyframes (else hold them still)
+TRACK_FLOW = os.getenv("TRACK_FLOW", "1") == "1"
+
+# longest side of the grayscale frames optical flow runs on
+FLOW_SIZE = 320
+
+
+@dataclass
+class Track:
+    id: int
+    # frame index -> float xyxy box in frame coordinates
+    boxes: Dict[int, np.ndarray] = field(default_factory=dict)
+    last_hit: int = 0
+    missed: int = 0
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def span(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Time-ordered frame indices and their (k, 4) boxes."""
+        idx = np.array(sorted(self.boxes))
+        return idx, np.stack([self.boxes[i] for i in idx])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (n, 4) and (m, 4) xyxy boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(iou: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """(row, col) pairs, best IoU first, each row and column used once."""
+    pairs = []
+    if iou.size == 0:
+        return pairs
+    rows, cols = np.unravel_index(np.argsort(-iou, axis=None), iou.shape)
+    used_r, used_c = set(), set()
+    for r, c in zip(rows, cols):
+        if iou[r, c] < threshold:
+            break
+        if r in used_r or c in used_c:
+            continue
+        used_r.add(r)
+        used_c.add(c)
+        pairs.append((int(r), int(c)))
+    return pairs
+
+
+def _flow_gray(frame: np.ndarray) -> Tuple[np.ndarray, float]:
+    h, w = frame.shape[:2]
+    scale = min(1.0, FLOW_SIZE / max(h, w))
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+def propagate(prev: np.ndarray, cur: np.ndarray, box: np.ndarray, scale: float) -> np.ndarray:
+    """
+    Shifts a box from `prev` to `cur` (downscaled grayscale frames) by the
+    median Lucas-Kanade flow of corners inside it. Keeps the box in place
+    when there is too little texture to track.
+    """
+    h, w = prev.shape
+    x1, y1, x2, y2 = np.clip((box * scale).astype(int), 0, [w, h, w, h])
+    if x2 - x1 < 4 or y2 - y1 < 4:
+        return box
+    pts = cv2.goodFeaturesToTrack(prev[y1:y2, x1:x2], maxCorners=20, qualityLevel=0.01, minDistance=3)
+    if pts is None:
+        return box
+    pts = pts + np.float32([x1, y1])
+    nxt, status, _ = cv2.calcOpticalFlowPyrLK(prev, cur, pts, None, winSize=(15, 15), maxLevel=3)
+    ok = status.ravel() == 1
+    if ok.sum() < 3:
+        return box
+    dx, dy = np.median((nxt - pts).reshape(-1, 2)[ok], axis=0) / scale
+    return box + np.array([dx, dy, dx, dy], dtype=box.dtype)
+
+
+def build_tracks(
+    frames_rgb: Sequence[np.ndarray],
+    *,
+    face_detector,
+    detect_every: int = TRACK_DETECT_EVERY,
+    iou_threshold: float = TRACK_IOU,
+    max_missed: int = TRACK_MAX_MISSED,
+    flow: bool = TRACK_FLOW,
+) -> Tuple[List[Track], int]:
+    """
+    Per-identity face tracks over time-ordered frames. The detector runs
+    once, batched, on every `detect_every`-th frame (and the last); boxes
+    are carried to the frames in between by optical flow. Keyframe
+    detections extend the track they overlap most (IoU) or start a new
+    one; a track missing `max_missed` + 1 keyframes in a row is closed.
+    Returns the tracks and the number of frames the detector ran on.
+    """
+    n = len(frames_rgb)
+    if n == 0:
+        return [], 0
+    step = max(1, detect_every)
+    keyframes = sorted({*range(0, n, step), n - 1})
+
+    with stage("faces.detect"):
+        results = face_detector([frames_rgb[i] for i in keyframes], verbose=False, conf=0.5)
+    detections = {
+        i: r.boxes.xyxy.cpu().numpy().astype(np.float32) if r.boxes is not None else np.empty((0, 4), np.float32)
+        for i, r in zip(keyframes, results)
+    }
+
+    tracks: List[Track] = []
+    active: List[Track] = []
+    prev_gray = scale = None
+    with stage("faces.track"):
+        for t in range(n):
+            if flow and active:
+                gray, scale = _flow_gray(frames_rgb[t])
+                if prev_gray is not None and prev_gray.shape == gray.shape:
+                    for track in active:
+                        track.boxes[t] = propagate(prev_gray, gray, track.boxes[t - 1], scale)
+                prev_gray = gray
+            else:
+                prev_gray = None
+            for track in active:
+                track.boxes.setdefault(t, track.boxes[t - 1])
+
+            dets = detections.get(t)
+            if dets is not None:
+                current = np.stack([track.boxes[t] for track in active]) if active else np.empty((0, 4))
+                matched_tracks, matched_dets = set(), set()
+                for r, c in greedy_match(iou_matrix(current, dets), iou_threshold):
+                    track = active[r]
+                    track.boxes[t] = dets[c]
+                    track.last_hit, track.missed = t, 0
+                    matched_tracks.add(r)
+                    matched_dets.add(c)
+
+                survivors = []
+                for r, track in enumerate(active):
+                    if r not in matched_tracks:
+                        track.missed += 1
+                        if track.missed > max_missed:
+                            # boxes carried past the last sighting are guesses
+                            for i in [i for i in track.boxes if i > track.last_hit]:
+                                del track.boxes[i]
+                            continue
+                    survivors.append(track)
+                active = survivors
+
+                for c in range(len(dets)):
+                    if c not in matched_dets:
+                        track = Track(id=len(tracks), boxes={t: dets[c]}, last_hit=t)
+                        tracks.append(track)
+                        active.append(track)
+                        if flow and prev_gray is None:
+                            prev_gray, scale = _flow_gray(frames_rgb[t])
+
+    return tracks, len(keyframes)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import List, Optional
+
+import xxhash
+
+from structures import InformationResponse
+
+# === CONFIG ===
+VERDICT_CACHE_COLLECTION = os.getenv("VERDICT_CACHE_COLLECTION", "verdict_cache")
+VERDICT_CACHE_SIMILARITY = float(os.getenv("VERDICT_CACHE_SIMILARITY", "0.95"))
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", str(6 * 3600)))
+VERDICT_CACHE_MAX = int(os.getenv("VERDICT_CACHE_MAX", "50000"))
+# nearest cached claims considered per lookup, so an expired nearest one
+# does not hide a fresh one just behind it
+VERDICT_CACHE_CANDIDATES = int(os.getenv("VERDICT_CACHE_CANDIDATES", "4"))
+# run the expiry / size sweep once every this many stores
+VERDICT_CACHE_PRUNE_EVERY = int(os.getenv("VERDICT_CACHE_PRUNE_EVERY", "100"))
+
+CACHEABLE = {"REAL", "FAKE", "UNVERIFIED"}
+
+
+def claim_id(claim: str) -> str:
+    return xxhash.xxh3_64_hexdigest(" ".join(claim.lower().split()).encode())
+
+
+class VerdictCache:
+    """
+    Semantic answer cache for /predict-news, stored in its own Chroma
+    collection next to `trusted_facts`. A claim reuses the verdict of the
+    nearest of its `candidates` nearest cached claims that is at least
+    `threshold` cosine-similar and younger than `ttl` seconds, skipping
+    web search and the LLM.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        name: str = VERDICT_CACHE_COLLECTION,
+        threshold: float = VERDICT_CACHE_SIMILARITY,
+        ttl: float = VERDICT_CACHE_TTL,
+        max_entries: int = VERDICT_CACHE_MAX,
+        prune_every: int = VERDICT_CACHE_PRUNE_EVERY,
+        candidates: int = VERDICT_CACHE_CANDIDATES,
+    ):
+        self.collection = client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": "cosine"},
+        )
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.candidates = max(1, candidates)
+
+        self._lock = threading.Lock()
+        self._stores = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def lookup(self, embedding: List[float]) -> Optional[InformationResponse]:
+        count = self.collection.count()
+        if count == 0:
+            self._count("misses")
+            return None
+
+        res = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=min(self.candidates, count),
+            include=["metadatas", "distances"],
+        )
+        ids = res["ids"][0] if res["ids"] else []
+        expired = []
+        hit = None
+        now = time.time()
+        for id_, meta, distance in zip(ids, res["metadatas"][0], res["distances"][0]):
+            similarity = 1.0 - distance
+            if similarity < self.threshold:
+                break           # nearest first: the rest are further away
+            if now - meta["created_at"] > self.ttl:
+                expired.append(id_)
+                continue
+            hit = (meta, similarity)
+            break
+
+        if expired:
+            self.collection.delete(ids=expired)
+            self._count("stale", len(expired))
+        if hit is None:
+            self._count("misses")
+            return None
+
+        meta, similarity = hit
+        self._count("hits")
+        return InformationResponse(
+            classification=meta["classification"],
+            reason=meta.get("reason") or None,
+            cached=True,
+            similarity=round(similarity, 4),
+        )
+
+    def store(self, claim: str, embedding: List[float], response: InformationResponse) -> None:
+        if response.classification not in CACHEABLE:
+            return
+
+        self.collection.upsert(
+            ids=[claim_id(claim)],
+            embeddings=[embedding],
+            documents=[claim],
+            metadatas=[{
+                "classification": response.classification,
+                "reason": response.reason or "",
+                "created_at": time.time(),
+            }],
+        )
+        with self._lock:
+            self._stores += 1
+            due = self._stores % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drops expired entries, then the oldest ones beyond `max_entries`."""
+        expired = self.collection.get(
+            where={"created_at": {"$lt": time.time() - self.ttl}},
+            include=[],
+        )["ids"]
+        if expired:
+            self.collection.delete(ids=expired)
+            self._count("evictions", len(expired))
+
+        overflow = self.collection.count() - self.max_entries
+        if overflow > 0:
+            rows = self.collection.get(include=["metadatas"])
+            oldest = sorted(zip(rows["ids"], rows["metadatas"]), key=lambda r: r[1]["created_at"])
+            doomed = [i for i, _ in oldest[:overflow]]
+            self.collection.delete(ids=doomed)
+            self._count("evictions", len(doomed))
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        """Lookups run on request threads; `+=` on an attribute is not atomic."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses, stale, evictions = self.hits, self.misses, self.stale, self.evictions
+        lookups = hits + misses
+        return {
+            "size": self.collection.count(),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "stale": stale,
+            "evictions": evictions,
+        }